@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""! @file api_cache.py
+@brief Persistent SQLite cache of the government company API responses.
+@author Marie Challet
+@organization Formasup Auvergne
+
+Company, IDCC and OPCO data change rarely, so RateLimitedAPI stores the GET
+responses of these APIs in a local SQLite file and serves them again on the
+next runs:
+- entries are keyed by endpoint (host and path) and normalized parameters;
+- each endpoint has its own TTL, "not found" answers (404 or an empty result
+  list) are kept for a shorter negative TTL;
+- the oldest entries are evicted beyond a maximum number of entries;
+- in cache-only mode misses are never sent to the network, which lets the
+  enrichment be replayed offline.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# Only these statuses are stored; throttling and server errors are retried instead
+CACHEABLE_STATUSES = (200, 404)
+
+# Entries inserted between two eviction passes
+EVICTION_INTERVAL = 500
+
+
+class CachedResponse:
+    """! @brief Response served from the cache, exposing the subset of
+    requests.Response used by the enrichment code.
+    """
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers: Dict[str, str]):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = True
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+def cache_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """! @brief Builds the cache key of a request.
+    @param method HTTP method.
+    @param url Requested URL, possibly with a query string.
+    @param params Query parameters passed separately.
+    @return Tuple (endpoint, key): 'host/path' and a digest of the normalized request.
+    @note Parameter names are sorted and values stripped, so equivalent
+          requests share one entry whatever their spelling order.
+    """
+    parts = urlsplit(url)
+    endpoint = f"{(parts.hostname or '').lower()}{parts.path.rstrip('/')}"
+    items = parse_qsl(parts.query, keep_blank_values=True)
+    for name, value in (params or {}).items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        items.extend((name, str(v)) for v in values)
+    normalized = sorted((name.strip(), value.strip()) for name, value in items)
+    digest = hashlib.sha256(
+        json.dumps([method.upper(), endpoint, normalized]).encode("utf-8")
+    ).hexdigest()
+    return endpoint, digest
+
+
+def is_negative(status_code: int, content: bytes) -> bool:
+    """! @brief Tells whether a response means "not found".
+    @param status_code HTTP status.
+    @param content Response body.
+    @return True for a 404 or a JSON body without any result.
+    """
+    if status_code == 404:
+        return True
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return False
+    if isinstance(data, list):
+        return not data
+    if isinstance(data, dict):
+        for field in ("results", "data"):
+            if field in data:
+                return not data[field]
+    return False
+
+
+class ResponseCache:
+    """! @brief Thread-safe SQLite store of API responses.
+
+    One connection is shared by the API workers and guarded by a lock; the
+    database runs in WAL mode so a concurrent reader never blocks on a write.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float,
+        negative_ttl: float,
+        max_entries: int,
+        endpoint_ttls: Optional[Dict[str, float]] = None,
+        cache_only: bool = False,
+        clock=time.time,
+    ):
+        """! @brief Opens (and creates if needed) the cache file.
+        @param path SQLite file, ':memory:' for a private in-memory cache.
+        @param ttl Default lifetime of an entry, in seconds.
+        @param negative_ttl Lifetime of a "not found" entry, in seconds.
+        @param max_entries Entries kept before the oldest are evicted.
+        @param endpoint_ttls Lifetimes overriding ttl, by host or 'host/path' prefix.
+        @param cache_only When True, lookups never fall back to the network.
+        @param clock Time source (seconds since the epoch).
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.endpoint_ttls = dict(endpoint_ttls or {})
+        self.cache_only = cache_only
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inserted = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS api_response (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    content BLOB NOT NULL,
+                    content_type TEXT,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS api_response_fetched_at ON api_response (fetched_at)"
+            )
+
+    def endpoint_ttl(self, endpoint: str, negative: bool) -> float:
+        """! @brief Returns the lifetime of an entry of an endpoint.
+        @param endpoint 'host/path' of the request.
+        @param negative True for a "not found" answer.
+        @return Lifetime in seconds; the longest matching prefix wins.
+        """
+        ttl = self.ttl
+        matched = ""
+        for prefix, value in self.endpoint_ttls.items():
+            if endpoint.startswith(prefix) and len(prefix) > len(matched):
+                matched, ttl = prefix, value
+        return min(ttl, self.negative_ttl) if negative else ttl
+
+    def get(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[CachedResponse]:
+        """! @brief Looks up a fresh response.
+        @param method HTTP method.
+        @param url Requested URL.
+        @param params Query parameters.
+        @return The cached response, or None on a miss or an expired entry.
+        """
+        _, key = cache_key(method, url, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, content, content_type FROM api_response "
+                "WHERE key = ? AND expires_at > ?",
+                (key, self._clock()),
+            ).fetchone()
+        if row is None:
+            return None
+        headers = {"Content-Type": row[3]} if row[3] else {}
+        return CachedResponse(row[0], row[1], bytes(row[2]), headers)
+
+    def put(self, method: str, url: str, params: Optional[Dict[str, Any]], response: Any) -> bool:
+        """! @brief Stores a response if its status is cacheable.
+        @param method HTTP method.
+        @param url Requested URL.
+        @param params Query parameters.
+        @param response requests.Response received from the API.
+        @return True if the response was stored.
+        """
+        status = getattr(response, "status_code", None)
+        content = getattr(response, "content", None)
+        if status not in CACHEABLE_STATUSES or not isinstance(content, (bytes, bytearray)):
+            return False
+        endpoint, key = cache_key(method, url, params)
+        now = self._clock()
+        expires = now + self.endpoint_ttl(endpoint, is_negative(status, content))
+        content_type = (getattr(response, "headers", None) or {}).get("Content-Type")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO api_response "
+                "(key, endpoint, url, status, content, content_type, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, url, status, bytes(content), content_type, now, expires),
+            )
+            self._inserted += 1
+            if self._inserted % EVICTION_INTERVAL == 0:
+                self._evict(now)
+        return True
+
+    def _evict(self, now: float) -> None:
+        """! @brief Drops expired entries, then the oldest ones beyond max_entries.
+        @note Called with the lock held, inside a transaction.
+        """
+        self._conn.execute("DELETE FROM api_response WHERE expires_at <= ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM api_response").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM api_response WHERE key IN "
+                "(SELECT key FROM api_response ORDER BY fetched_at LIMIT ?)",
+                (excess,),
+            )
+            logging.getLogger("migration").info(f"API cache: {excess} oldest entries evicted")
+
+    def evict(self) -> None:
+        """! @brief Runs an eviction pass immediately."""
+        with self._lock, self._conn:
+            self._evict(self._clock())
+
+    def close(self) -> None:
+        """! @brief Evicts what exceeds the limits and closes the file."""
+        self.evict()
+        with self._lock:
+            self._conn.close()
@@ -1,48 +1,304 @@
 #!/usr/bin/env python3
 """
-Client API avec gestion de limitation de débit pour les API externes.
+API client with rate limiting for external APIs.
 """
 
+import asyncio
+import bisect
+import email.utils
 import logging
+import math
+import random
 import threading
 import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 
 import requests # type: ignore
 from requests.adapters import HTTPAdapter # type: ignore
 from urllib3.util.retry import Retry # type: ignore
 
+from api_cache import ResponseCache
+
+# Upper bounds (ms) of the request latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+# Latency percentiles reported in the run report
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+# Latencies kept for the percentiles (uniform sample beyond that)
+LATENCY_SAMPLE_SIZE = 20000
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every caller of one host.
+
+    A caller reserves a token under the lock and sleeps outside of it, so
+    concurrent callers are spaced at exactly `rate` requests per second after
+    an initial burst of `capacity` requests.
+
+    Attributes:
+        rate: Tokens added per second
+        capacity: Maximum number of tokens (burst size)
+    """
+
+    def __init__(self, rate: float, capacity: int = 1, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        # Time at which _tokens is valid; in the future while the host is paused
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take one token.
+
+        Returns:
+            Seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            deficit = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(0.0, self._updated - now) + deficit
+
+    def pause(self, delay: float) -> None:
+        """
+        Stop handing out tokens for `delay` seconds (e.g. after a 429).
+
+        Args:
+            delay: Pause duration in seconds
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            resume = now + delay
+            if resume > self._updated:
+                self._updated = resume
+                self._tokens = min(self._tokens, 1.0)
+
+
+class ApiMetrics:
+    """
+    Thread-safe counters of a RateLimitedAPI client.
+
+    Attributes:
+        requests: HTTP requests sent
+        throttled_waits: Requests delayed by a token bucket
+        throttled_responses: 429 responses received
+        retries: Requests sent again after a 429
+        errors: Requests that failed with a RequestException
+        cache_hits: Responses served by the response cache
+        cache_misses: Responses absent from the cache in cache-only mode
+        latency_buckets: Request counts per latency bucket (LATENCY_BUCKETS_MS, then overflow)
+        latency_samples_ms: Request latencies, a reservoir sample of LATENCY_SAMPLE_SIZE
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled_waits = 0
+        self.throttled_responses = 0
+        self.retries = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_samples_ms: List[float] = []
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_latency(self, seconds: float) -> None:
+        index = bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            self.requests += 1
+            self.latency_buckets[index] += 1
+            if len(self.latency_samples_ms) < LATENCY_SAMPLE_SIZE:
+                self.latency_samples_ms.append(seconds * 1000)
+            else:
+                slot = self._random.randrange(self.requests)
+                if slot < LATENCY_SAMPLE_SIZE:
+                    self.latency_samples_ms[slot] = seconds * 1000
+
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Returns:
+            Latency percentiles in ms (nearest rank), keyed 'p50', 'p90'...; empty without requests
+        """
+        with self._lock:
+            samples = sorted(self.latency_samples_ms)
+        if not samples:
+            return {}
+        return {
+            f"p{p}": round(samples[max(0, math.ceil(p / 100 * len(samples)) - 1)], 1)
+            for p in LATENCY_PERCENTILES
+        }
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Returns:
+            Copy of the counters, with the histogram keyed by bucket label
+        """
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        percentiles = self.percentiles()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled_waits": self.throttled_waits,
+                "throttled_responses": self.throttled_responses,
+                "retries": self.retries,
+                "errors": self.errors,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "latency_ms": dict(zip(labels, self.latency_buckets)),
+                "latency_percentiles_ms": percentiles,
+            }
+
 
 class RateLimitedAPI:
     """
-    Client API avec limitation de débit pour éviter les erreurs 429 (too many requests).
+    API client with rate limiting to avoid 429 (too many requests) errors.
+
+    Each host gets its own token bucket, so recherche-entreprises, siret2idcc
+    and the data.gouv Tabular API do not share a budget.
 
     Attributes:
-        requests_per_second: Nombre maximum de requêtes par seconde
-        min_interval: Intervalle minimum entre deux requêtes (en secondes)
-        last_request_time: Horodatage de la dernière requête effectuée
-        session: Session HTTP réutilisable avec stratégie de réessai
-        lock: Verrou pour synchroniser les requêtes en multithreading
+        requests_per_second: Default maximum number of requests per second and per host
+        min_interval: Minimum interval between two requests to a host (in seconds)
+        last_request_time: Timestamp of the last request sent
+        burst: Requests a host may receive at once after being idle
+        host_rates: Requests per second overriding the default for given hosts
+        session: Reusable HTTP session with retry strategy
+        pool_size: Connections kept per host (concurrent callers)
+        metrics: Request counters and latency histogram
+        cache: Optional ResponseCache serving GET requests
+        lock: Lock protecting the per-host buckets
     """
 
-    def __init__(self, requests_per_second, retries: int = 3, backoff_factor: int = 1):
+    def __init__(
+        self,
+        requests_per_second,
+        retries: int = 3,
+        backoff_factor: int = 1,
+        pool_size: int = 10,
+        burst: int = 1,
+        host_rates: Optional[Dict[str, float]] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self.requests_per_second = requests_per_second
         self.min_interval = 1.0 / requests_per_second
         self.last_request_time = 0
         self.retries = retries
         self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.burst = burst
+        self.host_rates = dict(host_rates or {})
         self.session = self._create_session()
+        self.metrics = ApiMetrics()
+        self.cache = cache
         self.lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
 
     def _create_session(self):
         """Creates an HTTP session with automatic retry strategy"""
         session = requests.Session()
+        # 429 is handled by request() so that Retry-After pauses the whole host
         retry_strategy = Retry(
-            total=self.retries, status_forcelist=[429, 500, 502, 503, 504], backoff_factor=self.backoff_factor
+            total=self.retries, status_forcelist=[500, 502, 503, 504], backoff_factor=self.backoff_factor
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # One pooled connection per concurrent caller
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=self.pool_size)
         session.mount("https://", adapter)
         return session
 
+    def bucket(self, url: str) -> TokenBucket:
+        """
+        Returns the token bucket of the host of `url`, creating it on first use.
+        """
+        host = urlsplit(url).hostname or ""
+        with self.lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate = self.host_rates.get(host, self.requests_per_second)
+                bucket = self._buckets[host] = TokenBucket(rate, self.burst)
+            return bucket
+
+    def _send(self, method, url, kwargs):
+        """Sends one HTTP request and records its latency. Returns None on error."""
+        self.last_request_time = time.time()
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.metrics.increment("errors")
+            logging.getLogger("migration").error(f"API request error: {e}")
+            return None
+        self.metrics.record_latency(time.perf_counter() - start)
+        return response
+
+    def _retry_delay(self, bucket: TokenBucket, url: str, response, attempt: int) -> Optional[float]:
+        """
+        Decides whether a response must be sent again.
+
+        On 429, the host bucket is paused for the Retry-After delay (or an
+        exponential backoff when the header is missing) so that every caller
+        of that host backs off, not only the one that was throttled.
+
+        Returns:
+            Pause applied in seconds, or None if the response is final
+        """
+        if response is None or response.status_code != 429:
+            return None
+        self.metrics.increment("throttled_responses")
+        if attempt >= self.retries:
+            return None
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            delay = self.backoff_factor * (2 ** attempt)
+        bucket.pause(delay)
+        self.metrics.increment("retries")
+        logging.getLogger("migration").warning(
+            f"API throttled by {urlsplit(url).hostname}, pausing {delay:.1f}s"
+        )
+        return delay
+
+    def _from_cache(self, method, url, kwargs):
+        """
+        Looks a GET request up in the response cache.
+
+        Returns:
+            Tuple (found, response); in cache-only mode a miss is found with a None response
+        """
+        if self.cache is None or method.upper() != "GET" or kwargs.get("stream"):
+            return False, None
+        response = self.cache.get(method, url, kwargs.get("params"))
+        if response is not None:
+            self.metrics.increment("cache_hits")
+            return True, response
+        if self.cache.cache_only:
+            self.metrics.increment("cache_misses")
+            return True, None
+        return False, None
+
+    def _to_cache(self, method, url, kwargs, response):
+        # Streamed downloads are consumed by the caller and never cached
+        if (
+            self.cache is not None and response is not None
+            and method.upper() == "GET" and not kwargs.get("stream")
+        ):
+            self.cache.put(method, url, kwargs.get("params"), response)
+        return response
+
     def request(self, method, url, **kwargs):
         """
         Perform an HTTP request with rate limiting.
@@ -55,19 +311,69 @@ class RateLimitedAPI:
         Returns:
             HTTP response or None in case of error
         """
-        with self.lock:
-            current_time = time.time()
-            elapsed = current_time - self.last_request_time
-            if elapsed < self.min_interval:
-                time.sleep(self.min_interval - elapsed)
+        found, response = self._from_cache(method, url, kwargs)
+        if found:
+            return response
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            wait = bucket.reserve()
+            if wait > 0:
+                self.metrics.increment("throttled_waits")
+                time.sleep(wait)
+            response = self._send(method, url, kwargs)
+            if self._retry_delay(bucket, url, response, attempt) is None:
+                return self._to_cache(method, url, kwargs, response)
+            attempt += 1
+
+    async def arequest(self, method, url, **kwargs):
+        """
+        Asynchronous variant of request().
 
-            self.last_request_time = time.time()
+        Waits for a token with asyncio.sleep and runs the blocking HTTP call in
+        the default executor. Shares buckets and counters with request(), so
+        threads and coroutines can use the same client.
 
-        try:
-            response = self.session.request(method, url, **kwargs)
-            # If we receive a 429 code, the session's retry strategy handles the timeout
+        Returns:
+            HTTP response or None in case of error
+        """
+        found, response = self._from_cache(method, url, kwargs)
+        if found:
             return response
-        except requests.exceptions.RequestException as e:
-            logging.getLogger("migration").error(f"API request error: {e}")
-            time.sleep(2)
-            return None
+        loop = asyncio.get_running_loop()
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            wait = bucket.reserve()
+            if wait > 0:
+                self.metrics.increment("throttled_waits")
+                await asyncio.sleep(wait)
+            response = await loop.run_in_executor(None, self._send, method, url, kwargs)
+            if self._retry_delay(bucket, url, response, attempt) is None:
+                return self._to_cache(method, url, kwargs, response)
+            attempt += 1
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Parses a Retry-After header.
+
+    Args:
+        value: Header value, in seconds or as an HTTP date
+
+    Returns:
+        Delay in seconds, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - time.time())
@@ -8,15 +8,23 @@ This module provides functionalities to enrich company data using French governm
 It includes SIRET validation, company data retrieval, and OPCO enrichment.
 """
 
+import csv
+import io
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 import psycopg2  # type: ignore
 import pymysql  # type: ignore
+from psycopg2.extras import execute_values  # type: ignore
 
+from api_cache import ResponseCache
 from api_client import RateLimitedAPI
 from database import transaction
-from config import Config
+from loader import COPY_FLUSH_ROWS, CopyLoader
+from config import Config, parse_cache_ttls, parse_host_rates
+from reference_data import ReferenceData
+from run_report import get_run_report
 
 
 def is_valid_luhn(number: str) -> bool:
@@ -214,9 +222,9 @@ def get_idcc_from_siret2idcc_api(siret: str, api_client: RateLimitedAPI) -> str:
 
     try:
         url = f"https://siret2idcc.fabrique.social.gouv.fr/api/v2/{siret}"
-        response = api_client.get(url)
+        response = api_client.request("GET", url, headers={"Accept": "application/json"})
 
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             data = response.json()
             if data and isinstance(data, list) and len(data) > 0:
                 siret_data = data[0]
@@ -347,6 +355,33 @@ def find_type_id(
         return 0
 
 
+def create_api_client(cfg: Config) -> RateLimitedAPI:
+    """! @brief Builds the rate-limited API client used by the enrichment.
+    @param cfg Configuration with API and cache settings.
+    @return Client with per-host rate limits and, unless API_CACHE_MODE=off,
+            a persistent response cache.
+    """
+    cache = None
+    if cfg.api_cache_mode != "off":
+        cache = ResponseCache(
+            cfg.api_cache_file,
+            ttl=cfg.api_cache_ttl_hours * 3600,
+            negative_ttl=cfg.api_cache_negative_ttl_hours * 3600,
+            max_entries=cfg.api_cache_max_entries,
+            endpoint_ttls=parse_cache_ttls(cfg.api_cache_ttls),
+            cache_only=cfg.api_cache_mode == "cache-only",
+        )
+    return RateLimitedAPI(
+        cfg.requests_per_second,
+        retries=cfg.api_retries,
+        backoff_factor=cfg.api_backoff_factor,
+        pool_size=cfg.api_workers,
+        burst=cfg.api_burst,
+        host_rates=parse_host_rates(cfg.api_host_rates),
+        cache=cache,
+    )
+
+
 def api_enrich_companies(
     conn_pg: psycopg2.extensions.connection,
     cfg: Config,
@@ -379,11 +414,7 @@ def api_enrich_companies(
     laposte_sirets = []
 
     # Create a reusable API client instance
-    api_client = RateLimitedAPI(
-        cfg.requests_per_second,
-        retries=cfg.api_retries,
-        backoff_factor=cfg.api_backoff_factor
-    )
+    api_client = create_api_client(cfg)
 
     try:
         # Retrieve SIRETs to process
@@ -423,29 +454,10 @@ def api_enrich_companies(
             logger.info("No valid SIRETs to process")
             return stats
 
-        # Process valid SIRETs
-        for siret in valid_sirets:
-            stats["processed"] += 1
-
-            try:
-                # Retrieve and process data for a SIRET
-                if _process_single_siret(
-                    conn_pg, cfg, siret, api_client, laposte_sirets
-                ):
-                    stats["inserted"] += 1
-                else:
-                    stats["errors"] += 1
-                    error_sirets.append(siret)
-            except Exception as e:
-                logger.error(f"Error while processing SIRET {siret}: {e}")
-                stats["errors"] += 1
-                error_sirets.append(siret)
-
-            # Progress log
-            if stats["processed"] % 50 == 0:
-                logger.info(
-                    f"Progress: {stats['processed']}/{len(valid_sirets)} processed"
-                )
+        # Fetch API data concurrently, write results in batches
+        error_sirets = _enrich_valid_sirets(
+            conn_pg, cfg, valid_sirets, api_client, laposte_sirets, stats
+        )
 
     except Exception as e:
         logger.exception(f"Error during company enrichment: {e}")
@@ -469,9 +481,17 @@ def api_enrich_companies(
         stats["opco_from_deadline_not_found"] = opco_stats_deadline.get("not_found", 0)
         stats["opco_from_deadline_errors"] = opco_stats_deadline.get("errors", 0)
 
-        # Second pass: Use API for companies without OPCO (only if needed)
-        logger.info("=== OPCO Enrichment from API (Second Pass) ===")
-        opco_stats_api = enrich_companies_with_opco(conn_pg, cfg, api_client, only_missing=True)
+        # Second pass: local index of the OPCO resource, or the API per company
+        opco_stats_api = None
+        if cfg.opco_source == "index":
+            logger.info("=== OPCO Enrichment from Local Index (Second Pass) ===")
+            if refresh_opco_index(conn_pg, cfg, api_client):
+                opco_stats_api = enrich_companies_with_opco_from_index(conn_pg, cfg, only_missing=True)
+            else:
+                logger.warning("OPCO index unavailable, falling back to the Tabular API")
+        if opco_stats_api is None:
+            logger.info("=== OPCO Enrichment from API (Second Pass) ===")
+            opco_stats_api = enrich_companies_with_opco(conn_pg, cfg, api_client, only_missing=True)
         stats["opco_api_updated"] = opco_stats_api.get("updated", 0)
         stats["opco_api_not_found"] = opco_stats_api.get("not_found", 0)
         stats["opco_api_errors"] = opco_stats_api.get("errors", 0)
@@ -483,6 +503,12 @@ def api_enrich_companies(
     else:
         logger.info("OPCO enrichment disabled in configuration (ENABLE_OPCO_ENRICHMENT=false)")
 
+    api_metrics = api_client.metrics.snapshot()
+    logger.info(f"API client metrics: {api_metrics}")
+    if report := get_run_report():
+        report.add_api_metrics("company", api_metrics)
+    if api_client.cache is not None:
+        api_client.cache.close()
     return stats
 
 
@@ -608,6 +634,7 @@ def _attempt_siret_corrections(
         correct_invalid_sirets_batch,
         write_correction_report
     )
+    from sirene_stock import load_sirene_stock
 
     # Filter to only Luhn errors (format errors cannot be corrected)
     correctable_sirets = [
@@ -622,12 +649,19 @@ def _attempt_siret_corrections(
     logger.info(f"Searching corrections for {len(correctable_sirets)} SIRETs with Luhn errors")
 
     # Attempt to find corrections (suggestions only, no database modification)
-    corrections, uncorrected = correct_invalid_sirets_batch(
-        correctable_sirets,
-        conn_maria,
-        api_client,
-        max_distance=2
-    )
+    stock = load_sirene_stock(cfg)
+    try:
+        corrections, uncorrected = correct_invalid_sirets_batch(
+            correctable_sirets,
+            conn_maria,
+            api_client,
+            max_distance=2,
+            workers=cfg.api_workers,
+            stock=stock
+        )
+    finally:
+        if stock is not None:
+            stock.close()
 
     # Write correction report for manual review
     write_correction_report(corrections, uncorrected, "siret_corrections.txt")
@@ -645,164 +679,222 @@ def _attempt_siret_corrections(
     return [], invalid_sirets
 
 
-def _process_single_siret(
+def _enrich_valid_sirets(
     conn_pg: psycopg2.extensions.connection,
     cfg: Config,
-    siret: str,
+    valid_sirets: List[str],
     api_client: RateLimitedAPI,
     laposte_sirets: list,
-) -> bool:
-    """! @brief Processes an individual SIRET.
+    stats: Dict[str, int],
+) -> List[str]:
+    """! @brief Enriches valid SIRETs with a bounded pool of API workers.
+
+    Up to cfg.api_workers SIRETs are fetched at the same time; the shared
+    api_client keeps each API within its rate limit. Workers only perform HTTP
+    calls: the results are resolved against the preloaded reference data and
+    written from this thread, in batches of cfg.enrichment_batch_size
+    companies per UPDATE.
+
     @param conn_pg Active PostgreSQL connection.
-    @param cfg Configuration with schema information.
-    @param siret SIRET to process.
-    @param api_client API client with rate limiting.
+    @param cfg Configuration with schema information and API settings.
+    @param valid_sirets SIRETs to enrich.
+    @param api_client API client with rate limiting, shared by the workers.
     @param laposte_sirets List of La Poste SIRETs for categorization.
-    @return True if processing was successful, False otherwise.
+    @param stats Statistics dictionary updated in place (processed, inserted, errors).
+    @return List of SIRETs in error.
     """
     logger = logging.getLogger("migration")
+    reference = ReferenceData(conn_pg, cfg)
+    error_sirets: List[str] = []
+    pending: List[tuple] = []
 
-    # Retrieve API data
-    api_data = get_api_company_data(siret, api_client)
-    if not api_data:
-        logger.error(f"ERROR SIRET: {siret} - No data retrieved from API")
-        return False
-
-    try:
-        # Retrieve the corresponding company ID
-        with conn_pg.cursor() as cur:
-            cur.execute(
-                f"SELECT id FROM {cfg.pg_schema}.company WHERE siret = %s;",
-                (siret,),
+    def flush() -> None:
+        if not pending:
+            return
+        try:
+            reference.refresh()
+            updated = _write_enrichment_batch(
+                conn_pg, cfg, [_resolve_reference_ids(row, reference) for row in pending]
             )
-            company_result = cur.fetchone()
+        except Exception as e:
+            logger.error(f"Error while writing {len(pending)} enriched companies: {e}")
+            updated = set()
+        for row in pending:
+            siret, name = row[0], row[1]
+            if siret in updated:
+                stats["inserted"] += 1
+                siret_type = "La Poste" if siret in laposte_sirets else "Standard"
+                logger.info(f"Inserted ({siret_type}): {siret} - {name or 'N/A'}")
+            else:
+                logger.warning(f"No entry found in company for SIRET {siret}")
+                stats["errors"] += 1
+                error_sirets.append(siret)
+        pending.clear()
 
-            if not company_result:
-                logger.warning(
-                    f"No entry found in company for SIRET {siret}"
-                )
-                return False
+    with ThreadPoolExecutor(max_workers=cfg.api_workers) as executor:
+        futures = {
+            executor.submit(_fetch_company_enrichment, siret, api_client, reference): siret
+            for siret in valid_sirets
+        }
+        for future in as_completed(futures):
+            siret = futures[future]
+            stats["processed"] += 1
+            try:
+                row = future.result()
+            except Exception as e:
+                logger.error(f"Error while processing SIRET {siret}: {e}")
+                row = None
 
-            company_id = company_result[0]
+            if row is None:
+                stats["errors"] += 1
+                error_sirets.append(siret)
+            else:
+                pending.append(row)
+                if len(pending) >= cfg.enrichment_batch_size:
+                    flush()
 
-        # Extract SIREN
-        siren = siret[:9]
+            # Progress log
+            if stats["processed"] % 50 == 0:
+                logger.info(
+                    f"Progress: {stats['processed']}/{len(valid_sirets)} processed"
+                )
+    flush()
 
-        # Retrieve necessary data
-        idcc_id, first_idcc = _get_idcc_info(
-            conn_pg, cfg, siret, siren, api_data, api_client
-        )
-        city_id = find_city_id(conn_pg, cfg, api_data.get("commune"))
-        naf_id = find_naf_id(conn_pg, cfg, api_data.get("code_naf"))
-        type_id = find_type_id(conn_pg, cfg, api_data.get("type"))
-        workforce = _convert_workforce_range(api_data.get("workforce_range"))
+    return error_sirets
 
-        # Update company table directly with enriched data
-        with transaction(conn_pg) as cur:
-            cur.execute(
-                f"""
-                UPDATE {cfg.pg_schema}.company
-                SET
-                    name = %s,
-                    naf_id = NULLIF(%s, 0),
-                    idcc_id = NULLIF(%s, 0),
-                    city_id = NULLIF(%s, 0),
-                    workforce = %s,
-                    category = %s,
-                    type_id = NULLIF(%s, 0),
-                    updated_at = NOW()
-                WHERE id = %s
-            """,
-                (
-                    api_data.get("name"),
-                    naf_id,
-                    idcc_id,
-                    city_id,
-                    workforce,
-                    api_data.get("category"),
-                    type_id,
-                    company_id,
-                ),
-            )
 
-        siret_type = "La Poste" if siret in laposte_sirets else "Standard"
-        logger.info(f"Inserted ({siret_type}): {siret} - {api_data.get('name', 'N/A')}")
-        return True
+def _fetch_company_enrichment(
+    siret: str, api_client: RateLimitedAPI, reference: ReferenceData
+) -> Optional[tuple]:
+    """! @brief Retrieves the enrichment data of a SIRET (runs in an API worker).
+    @param siret SIRET to process.
+    @param api_client API client with rate limiting.
+    @param reference Reference data, used to check the IDCC codes.
+    @return Row (siret, name, naf_code, idcc_code, commune, workforce, category,
+            type_code), or None if the API returned nothing.
+    """
+    api_data = get_api_company_data(siret, api_client)
+    if not api_data:
+        logging.getLogger("migration").error(
+            f"ERROR SIRET: {siret} - No data retrieved from API"
+        )
+        return None
 
-    except Exception as e:
-        logger.error(f"Insertion error for {siret}: {e}")
-        return False
+    return (
+        siret,
+        api_data.get("name"),
+        api_data.get("code_naf"),
+        _resolve_idcc_code(siret, api_data, api_client, reference),
+        api_data.get("commune"),
+        _convert_workforce_range(api_data.get("workforce_range")),
+        api_data.get("category"),
+        api_data.get("type"),
+    )
 
 
-def _get_idcc_info(
-    conn_pg: psycopg2.extensions.connection,
-    cfg: Config,
+def _resolve_idcc_code(
     siret: str,
-    siren: str,
     api_data: Dict[str, Any],
     api_client: RateLimitedAPI,
-) -> tuple:
-    """! @brief Retrieves IDCC information for a company.
-    @param conn_pg Active PostgreSQL connection.
-    @param cfg Configuration with schema information.
+    reference: ReferenceData,
+) -> Optional[str]:
+    """! @brief Finds the IDCC code of a company, falling back to its head office
+    and then to the siret2idcc API.
     @param siret Company SIRET.
-    @param siren Company SIREN.
     @param api_data API data already retrieved for the SIRET.
     @param api_client API client with rate limiting.
-    @return Tuple (idcc_id, first_idcc) containing the ID and code of the IDCC.
+    @param reference Reference data holding the known IDCC codes.
+    @return IDCC code present in the idcc table, or None.
     """
     logger = logging.getLogger("migration")
-    idcc_id = None
-    first_idcc = None
+    siren = siret[:9]
 
     # Attempt to retrieve IDCC via SIRET
     if api_data.get("idcc"):
         first_idcc = api_data["idcc"].split(",")[0].strip()
-        idcc_id = find_idcc_id(conn_pg, cfg, first_idcc)
         logger.debug(f"IDCC found via SIRET {siret}: {first_idcc}")
+        if reference.idcc_id(first_idcc):
+            return first_idcc
 
     # If no IDCC via SIRET, attempt via SIREN
-    if not idcc_id:
-        logger.warning(
-            f"No IDCC found for SIRET {siret}, searching via SIREN {siren}"
-        )
-
-        try:
-            api_data_siren = get_api_company_data_siege(siren, api_client)
-            if api_data_siren and api_data_siren.get("idcc"):
-                first_idcc = api_data_siren["idcc"].split(",")[0].strip()
-                idcc_id = find_idcc_id(conn_pg, cfg, first_idcc)
-                if idcc_id:
-                    logger.info(f"IDCC found via SIREN {siren}: {first_idcc}")
-        except Exception as e:
-            logger.error(f"Error searching IDCC via SIREN {siren}: {e}")
+    logger.warning(f"No IDCC found for SIRET {siret}, searching via SIREN {siren}")
+    try:
+        api_data_siren = get_api_company_data_siege(siren, api_client)
+        if api_data_siren and api_data_siren.get("idcc"):
+            first_idcc = api_data_siren["idcc"].split(",")[0].strip()
+            if reference.idcc_id(first_idcc):
+                logger.info(f"IDCC found via SIREN {siren}: {first_idcc}")
+                return first_idcc
+    except Exception as e:
+        logger.error(f"Error searching IDCC via SIREN {siren}: {e}")
 
     # Fallback to siret2idcc API if still not found
-    if not idcc_id:
-        logger.info(
-            f"Attempting fallback to siret2idcc API for SIRET {siret}"
-        )
-        try:
-            fallback_idcc = get_idcc_from_siret2idcc_api(siret, api_client)
-            if fallback_idcc:
-                first_idcc = fallback_idcc
-                idcc_id = find_idcc_id(conn_pg, cfg, first_idcc)
-                if idcc_id:
-                    logger.info(
-                        f"IDCC found via siret2idcc fallback API: {first_idcc}"
-                    )
-        except Exception as e:
-            logger.debug(f"Fallback siret2idcc API failed for SIRET {siret}: {e}")
+    logger.info(f"Attempting fallback to siret2idcc API for SIRET {siret}")
+    try:
+        fallback_idcc = get_idcc_from_siret2idcc_api(siret, api_client)
+        if reference.idcc_id(fallback_idcc):
+            logger.info(f"IDCC found via siret2idcc fallback API: {fallback_idcc}")
+            return fallback_idcc
+    except Exception as e:
+        logger.debug(f"Fallback siret2idcc API failed for SIRET {siret}: {e}")
+
+    logger.warning(f"No IDCC found for company SIREN {siren} (SIRET {siret})")
+    return None
+
+
+def _resolve_reference_ids(row: tuple, reference: ReferenceData) -> tuple:
+    """! @brief Replaces the codes of an enrichment row by reference ids.
+    @param row Row built by _fetch_company_enrichment.
+    @param reference Reference data.
+    @return Row (siret, name, naf_id, idcc_id, city_id, workforce, category,
+            type_id) for _write_enrichment_batch; unknown codes become None.
+    """
+    siret, name, naf_code, idcc_code, commune, workforce, category, type_code = row
+    return (
+        siret,
+        name,
+        reference.naf_id(naf_code),
+        reference.idcc_id(idcc_code),
+        reference.city_id(commune),
+        workforce,
+        category,
+        reference.type_id(type_code),
+    )
 
-    # Final log
-    if not idcc_id:
-        logger.warning(
-            f"No IDCC found for company SIREN {siren} (SIRET {siret})"
-        )
-    else:
-        logger.info(f"Final IDCC retained: {first_idcc} (ID: {idcc_id})")
 
-    return idcc_id, first_idcc
+def _write_enrichment_batch(
+    conn_pg: psycopg2.extensions.connection, cfg: Config, rows: List[tuple]
+) -> Set[str]:
+    """! @brief Writes a batch of enriched companies with a single UPDATE ... FROM (VALUES ...).
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration with schema information.
+    @param rows Rows built by _resolve_reference_ids.
+    @return SIRETs for which a company was updated.
+    """
+    with transaction(conn_pg) as cur:
+        updated = execute_values(
+            cur,
+            f"""
+            UPDATE {cfg.pg_schema}.company c
+            SET
+                name = v.name,
+                naf_id = v.naf_id,
+                idcc_id = v.idcc_id,
+                city_id = v.city_id,
+                workforce = v.workforce,
+                category = v.category,
+                type_id = v.type_id,
+                updated_at = NOW()
+            FROM (VALUES %s) AS v(siret, name, naf_id, idcc_id, city_id, workforce, category, type_id)
+            WHERE c.siret = v.siret
+            RETURNING v.siret
+            """,
+            rows,
+            template="(%s, %s, %s::integer, %s::integer, %s::integer, %s::integer, %s, %s::integer)",
+            page_size=len(rows),
+            fetch=True,
+        )
+    return {row[0] for row in updated}
 
 
 def _convert_workforce_range(tranche: str) -> int:
@@ -919,6 +1011,15 @@ TABULAR_API_BASE = "https://tabular-api.data.gouv.fr/api"
 # Dataset: "Public list of OPCOs and professional branches"
 SIRET_OPCO_RESOURCE_ID = "59533036-3c0b-45e6-972c-e967c0a1be17"
 
+# CSV export of a data.gouv.fr resource (redirects to the current file)
+OPCO_RESOURCE_DOWNLOAD_URL = "https://www.data.gouv.fr/fr/datasets/r/{resource_id}"
+
+# Local index of the OPCO resource, keyed by SIRET and SIREN
+OPCO_INDEX_TABLE = "opco_siret_ref"
+
+# Columns holding the OPCO name in the resource, by priority
+OPCO_FIELDS = ("OPCO_PROPRIETAIRE", "OPCO_GESTION", "opco", "nom_opco", "OPCO", "NOM_OPCO")
+
 # Mapping of normalized OPCO names (to standardize data)
 OPCO_NAMES = {
     "AFDAS": "AFDAS",
@@ -1296,6 +1397,253 @@ def enrich_companies_with_opco(
     return stats
 
 
+def ensure_opco_index_tables(conn: psycopg2.extensions.connection, cfg: Config) -> None:
+    """! @brief Creates the local OPCO index and its download state table.
+    @param conn Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    """
+    with transaction(conn) as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {cfg.pg_schema}.{OPCO_INDEX_TABLE} (
+                siret CHAR(14) NOT NULL,
+                siren CHAR(9) NOT NULL,
+                opco_name VARCHAR(255) NOT NULL
+            )
+            """
+        )
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{OPCO_INDEX_TABLE}_siret "
+            f"ON {cfg.pg_schema}.{OPCO_INDEX_TABLE} (siret)"
+        )
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{OPCO_INDEX_TABLE}_siren "
+            f"ON {cfg.pg_schema}.{OPCO_INDEX_TABLE} (siren)"
+        )
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {cfg.pg_schema}.{OPCO_INDEX_TABLE}_source (
+                resource_id VARCHAR(64) PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                row_count INTEGER NOT NULL,
+                refreshed_at TIMESTAMP DEFAULT NOW() NOT NULL
+            )
+            """
+        )
+
+
+def _iter_opco_csv_rows(response: Any) -> Iterator[Tuple[str, str, str]]:
+    """! @brief Streams (siret, siren, normalized OPCO name) rows from the resource CSV.
+    @param response Streamed HTTP response of the CSV export.
+    @return Iterator of rows; lines without a valid SIRET or an OPCO are skipped.
+    """
+    response.raw.decode_content = True
+    stream = io.TextIOWrapper(response.raw, encoding="utf-8-sig", newline="")
+    first_line = stream.readline()
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    header = [name.strip() for name in next(csv.reader([first_line], delimiter=delimiter))]
+    if "SIRET" not in header:
+        raise ValueError(f"SIRET column not found in OPCO resource (columns: {header})")
+    siret_index = header.index("SIRET")
+    opco_indexes = [header.index(field) for field in OPCO_FIELDS if field in header]
+    if not opco_indexes:
+        raise ValueError(f"OPCO column not found in OPCO resource (columns: {header})")
+
+    for record in csv.reader(stream, delimiter=delimiter):
+        if len(record) <= siret_index:
+            continue
+        siret = record[siret_index].strip()
+        if len(siret) != 14 or not siret.isdigit():
+            continue
+        opco_name = next(
+            (record[i].strip() for i in opco_indexes if i < len(record) and record[i].strip()),
+            None,
+        )
+        if opco_name:
+            yield siret, siret[:9], OPCO_NAMES.get(opco_name.upper(), opco_name)
+
+
+def refresh_opco_index(
+    conn: psycopg2.extensions.connection, cfg: Config, api_client: RateLimitedAPI
+) -> Optional[int]:
+    """! @brief Downloads the OPCO resource into the local opco_siret_ref index.
+
+    The CSV export is requested with the ETag / Last-Modified of the previous
+    download; when the resource has not changed (304) the index is kept as is.
+    Otherwise the file is streamed and bulk loaded with COPY, replacing the
+    index in a single transaction.
+
+    @param conn Active PostgreSQL connection.
+    @param cfg Configuration containing the schema and the OPCO resource id.
+    @param api_client API client with rate limiting.
+    @return Number of rows in the index, or None if it could not be refreshed.
+    """
+    logger = logging.getLogger("migration")
+    index = f"{cfg.pg_schema}.{OPCO_INDEX_TABLE}"
+    ensure_opco_index_tables(conn, cfg)
+
+    with transaction(conn) as cur:
+        cur.execute(
+            f"SELECT etag, last_modified, row_count FROM {index}_source WHERE resource_id = %s",
+            (cfg.opco_resource_id,),
+        )
+        previous = cur.fetchone()
+
+    headers = {"Accept": "text/csv"}
+    if previous:
+        if previous[0]:
+            headers["If-None-Match"] = previous[0]
+        if previous[1]:
+            headers["If-Modified-Since"] = previous[1]
+
+    url = OPCO_RESOURCE_DOWNLOAD_URL.format(resource_id=cfg.opco_resource_id)
+    response = api_client.request("GET", url, headers=headers, stream=True, timeout=300)
+    if response is None:
+        logger.error("OPCO resource download failed")
+        return None
+    try:
+        if response.status_code == 304 and previous:
+            logger.info(f"OPCO resource unchanged, index kept ({previous[2]} rows)")
+            return previous[2]
+        if response.status_code != 200:
+            logger.error(f"OPCO resource download error: {response.status_code}")
+            return None
+
+        loader = CopyLoader(conn, cfg, cfg.pg_schema, OPCO_INDEX_TABLE, ["siret", "siren", "opco_name"])
+        row_count = 0
+        try:
+            loader.cur.execute(f"TRUNCATE {index}")
+            batch: List[Tuple[str, str, str]] = []
+            for row in _iter_opco_csv_rows(response):
+                batch.append(row)
+                if len(batch) >= COPY_FLUSH_ROWS:
+                    loader.write(batch)
+                    row_count += len(batch)
+                    batch = []
+            loader.write(batch)
+            row_count += len(batch)
+            loader.cur.execute(
+                f"""
+                INSERT INTO {index}_source (resource_id, etag, last_modified, row_count, refreshed_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON CONFLICT (resource_id) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    row_count = excluded.row_count,
+                    refreshed_at = excluded.refreshed_at
+                """,
+                (
+                    cfg.opco_resource_id,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    row_count,
+                ),
+            )
+        except Exception:
+            loader.abort()
+            raise
+        # Flushes the last rows and commits the new index with its download state
+        loader.finish()
+        with transaction(conn) as cur:
+            cur.execute(f"ANALYZE {index}")
+        logger.info(f"OPCO index refreshed: {row_count} rows")
+        return row_count
+    except Exception as e:
+        logger.error(f"Error while refreshing the OPCO index: {e}")
+        return None
+    finally:
+        response.close()
+
+
+def enrich_companies_with_opco_from_index(
+    conn: psycopg2.extensions.connection, cfg: Config, only_missing: bool = True
+) -> Dict[str, int]:
+    """! @brief Sets company.opco_id from the local OPCO index in one statement.
+
+    A company takes the OPCO of its SIRET; when the SIRET is not listed, the
+    OPCO most frequent among the establishments of its SIREN. Missing OPCO
+    names are created in the opco table by the same statement.
+
+    @param conn Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @param only_missing If True, only processes companies without an OPCO.
+    @return Dictionary with statistics (total, updated, not_found, errors).
+    """
+    logger = logging.getLogger("migration")
+    stats = {"total": 0, "updated": 0, "not_found": 0, "errors": 0}
+    schema = cfg.pg_schema
+    index = f"{schema}.{OPCO_INDEX_TABLE}"
+    missing_filter = "AND c.opco_id IS NULL" if only_missing else ""
+
+    try:
+        ensure_opco_table(conn, cfg)
+        if not add_opco_fk_to_company(conn, cfg):
+            logger.error("Could not add opco_id column")
+            return stats
+
+        with transaction(conn) as cur:
+            cur.execute(
+                f"""
+                WITH targets AS (
+                    SELECT c.id, c.siret
+                    FROM {schema}.company c
+                    WHERE c.siret IS NOT NULL AND c.siret <> '' {missing_filter}
+                ),
+                by_siret AS (
+                    SELECT DISTINCT ON (t.id) t.id, r.opco_name
+                    FROM targets t
+                    JOIN {index} r ON r.siret = t.siret
+                    ORDER BY t.id, r.opco_name
+                ),
+                by_siren AS (
+                    SELECT DISTINCT ON (t.id) t.id, r.opco_name
+                    FROM targets t
+                    JOIN {index} r ON r.siren = left(t.siret, 9)
+                    WHERE NOT EXISTS (SELECT 1 FROM by_siret s WHERE s.id = t.id)
+                    GROUP BY t.id, r.opco_name
+                    ORDER BY t.id, COUNT(*) DESC, r.opco_name
+                ),
+                matched AS (
+                    SELECT id, opco_name FROM by_siret
+                    UNION ALL
+                    SELECT id, opco_name FROM by_siren
+                ),
+                created AS (
+                    INSERT INTO {schema}.opco (name, updated_at)
+                    SELECT DISTINCT m.opco_name, NOW()
+                    FROM matched m
+                    WHERE NOT EXISTS (SELECT 1 FROM {schema}.opco o WHERE o.name = m.opco_name)
+                    RETURNING id, name
+                ),
+                updated AS (
+                    UPDATE {schema}.company c
+                    SET opco_id = COALESCE(o.id, n.id)
+                    FROM matched m
+                    LEFT JOIN (
+                        SELECT name, MIN(id) AS id FROM {schema}.opco GROUP BY name
+                    ) o ON o.name = m.opco_name
+                    LEFT JOIN created n ON n.name = m.opco_name
+                    WHERE c.id = m.id
+                    RETURNING c.id
+                )
+                SELECT (SELECT COUNT(*) FROM targets), (SELECT COUNT(*) FROM updated)
+                """
+            )
+            stats["total"], stats["updated"] = cur.fetchone()
+        stats["not_found"] = stats["total"] - stats["updated"]
+    except Exception as e:
+        logger.error(f"Error during OPCO enrichment from index: {e}")
+        stats["errors"] = 1
+        return stats
+
+    logger.info(
+        f"OPCO enrichment from index finished: {stats['updated']} updated, "
+        f"{stats['not_found']} not found"
+    )
+    return stats
+
+
 def get_opco_stats(
     conn: psycopg2.extensions.connection, cfg: Config
 ) -> List[Tuple[str, int]]:
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""! @file checkpoint.py
+@brief Checkpoint journal of a migration cycle, used by --resume.
+@author Marie Challet
+@organization Formasup Auvergne
+
+Every live cycle records its progress in {pg_schema}.migration_checkpoint:
+- per table: rows loaded into the temp table, last loaded key (keyset
+  extraction only, saved every CHECKPOINT_ROWS rows once they are committed)
+  and whether the table load completed;
+- per phase (migrate, cleanup, sync, enrich, analyze): whether it completed.
+
+A cycle started without --resume clears the journal. With --resume, completed
+phases and tables are skipped and a partially loaded table continues after its
+last key; rows past that key (committed after the last checkpoint) are deleted
+first, and a table without a key is reloaded from scratch. A journal entry
+whose temp table is missing or empty (e.g. unlogged tables truncated by a
+PostgreSQL crash) is discarded together with the phase entries. The journal
+is cleared when a cycle goes through the sync step without a failed table.
+"""
+
+import json
+import logging
+from typing import Any, Dict, NamedTuple, Optional
+
+import psycopg2  # type: ignore
+
+from config import Config
+from database import transaction
+
+CHECKPOINT_TABLE = "migration_checkpoint"
+
+# Rows loaded between two table checkpoints (each one commits the load)
+CHECKPOINT_ROWS = 100000
+
+# Phases of a cycle, in execution order
+PHASES = ("migrate", "cleanup", "sync", "enrich", "analyze")
+
+
+class Checkpoint(NamedTuple):
+    """! @brief Journal entry of a table or a phase."""
+
+    kind: str
+    name: str
+    last_key: Any
+    rows_loaded: int
+    completed: bool
+
+
+def ensure_checkpoint_table(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
+    """! @brief Creates the migration_checkpoint table if it does not exist.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    """
+    with transaction(conn_pg) as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {cfg.pg_schema}.{CHECKPOINT_TABLE} (
+                kind VARCHAR(8) NOT NULL,
+                name VARCHAR(64) NOT NULL,
+                last_key TEXT,
+                rows_loaded BIGINT DEFAULT 0 NOT NULL,
+                completed BOOLEAN DEFAULT FALSE NOT NULL,
+                updated_at TIMESTAMP DEFAULT NOW() NOT NULL,
+                PRIMARY KEY (kind, name)
+            )
+            """
+        )
+
+
+def reset_checkpoints(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
+    """! @brief Clears the journal (a new cycle starts from the beginning).
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    """
+    with transaction(conn_pg) as cur:
+        cur.execute(f"DELETE FROM {cfg.pg_schema}.{CHECKPOINT_TABLE}")
+
+
+def load_checkpoints(
+    conn_pg: psycopg2.extensions.connection, cfg: Config
+) -> Dict[str, Dict[str, Checkpoint]]:
+    """! @brief Reads the journal.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @return Entries by kind ('table' or 'phase') then by name.
+    """
+    journal: Dict[str, Dict[str, Checkpoint]] = {"table": {}, "phase": {}}
+    with conn_pg.cursor() as cur:
+        cur.execute(
+            f"SELECT kind, name, last_key, rows_loaded, completed "
+            f"FROM {cfg.pg_schema}.{CHECKPOINT_TABLE}"
+        )
+        for kind, name, last_key, rows_loaded, completed in cur.fetchall():
+            key = json.loads(last_key) if last_key is not None else None
+            journal.setdefault(kind, {})[name] = Checkpoint(kind, name, key, rows_loaded, completed)
+    conn_pg.commit()
+    return journal
+
+
+def _save(
+    conn_pg: psycopg2.extensions.connection,
+    cfg: Config,
+    kind: str,
+    name: str,
+    last_key: Any,
+    rows_loaded: int,
+    completed: bool,
+) -> None:
+    with transaction(conn_pg) as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {cfg.pg_schema}.{CHECKPOINT_TABLE}
+                (kind, name, last_key, rows_loaded, completed, updated_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (kind, name) DO UPDATE SET
+                last_key = EXCLUDED.last_key,
+                rows_loaded = EXCLUDED.rows_loaded,
+                completed = EXCLUDED.completed,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (
+                kind,
+                name,
+                json.dumps(last_key, default=str) if last_key is not None else None,
+                rows_loaded,
+                completed,
+            ),
+        )
+
+
+def save_table_checkpoint(
+    conn_pg: psycopg2.extensions.connection,
+    cfg: Config,
+    table: str,
+    last_key: Any,
+    rows_loaded: int,
+    completed: bool = False,
+) -> None:
+    """! @brief Records the load progress of a table.
+    @param conn_pg Active PostgreSQL connection (the rows must already be committed).
+    @param cfg Configuration containing the schema.
+    @param table Name of the table.
+    @param last_key Key of the last committed row, None if the load cannot resume mid-table.
+    @param rows_loaded Rows committed into the temp table.
+    @param completed True once the whole table is loaded.
+    """
+    _save(conn_pg, cfg, "table", table, last_key, rows_loaded, completed)
+
+
+def complete_phase(conn_pg: psycopg2.extensions.connection, cfg: Config, phase: str) -> None:
+    """! @brief Records that a phase of the cycle completed.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @param phase One of PHASES.
+    """
+    _save(conn_pg, cfg, "phase", phase, None, 0, True)
+
+
+def prune_stale_checkpoints(
+    conn_pg: psycopg2.extensions.connection,
+    cfg: Config,
+    journal: Dict[str, Dict[str, Checkpoint]],
+) -> Dict[str, Dict[str, Checkpoint]]:
+    """! @brief Drops the table entries whose temp table lost its rows.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the temporary schema.
+    @param journal Journal read by load_checkpoints.
+    @return The usable journal; without any phase entry if a table entry was stale.
+    """
+    logger = logging.getLogger("migration")
+    stale = []
+    with conn_pg.cursor() as cur:
+        for table, checkpoint in journal["table"].items():
+            cur.execute("SELECT to_regclass(%s)", (f"{cfg.temp_schema}.{table}",))
+            if cur.fetchone()[0] is None:
+                stale.append(table)
+            elif checkpoint.rows_loaded > 0:
+                cur.execute(f"SELECT EXISTS (SELECT 1 FROM {cfg.temp_schema}.{table})")
+                if not cur.fetchone()[0]:
+                    stale.append(table)
+    conn_pg.commit()
+
+    if not stale:
+        return journal
+    logger.warning(
+        f"Temp tables missing or emptied since the last run ({', '.join(stale)}): "
+        "their checkpoints and the phase checkpoints are discarded"
+    )
+    tables = {t: c for t, c in journal["table"].items() if t not in stale}
+    return {"table": tables, "phase": {}}
+
+
+def prepare_resumed_table(
+    conn_pg: psycopg2.extensions.connection,
+    schema: str,
+    table: str,
+    key: Optional[str],
+    checkpoint: Checkpoint,
+) -> bool:
+    """! @brief Removes the rows a resumed table load will extract again.
+    @param conn_pg Active PostgreSQL connection.
+    @param schema Schema of the temp table.
+    @param table Name of the table.
+    @param key Key column of the keyset extraction.
+    @param checkpoint Journal entry of the table (not completed).
+    @return True if the load can continue after the last key, False if the
+            table was emptied and must be loaded from the start.
+    @note Rows committed after the last checkpoint are deleted, so nothing
+          is loaded twice; without a last key the table is emptied.
+    @note The rows up to the last key must still all be there: a crash of
+          PostgreSQL empties UNLOGGED temp tables, and continuing after the
+          last key would silently lose them. Otherwise the table is emptied.
+    """
+    with transaction(conn_pg) as cur:
+        if key and checkpoint.last_key is not None:
+            cur.execute(f"DELETE FROM {schema}.{table} WHERE {key} > %s", (checkpoint.last_key,))
+            cur.execute(
+                f"SELECT COUNT(*) FROM {schema}.{table} WHERE {key} <= %s",
+                (checkpoint.last_key,),
+            )
+            kept = cur.fetchone()[0]
+            if kept == checkpoint.rows_loaded:
+                return True
+            logging.getLogger("migration").warning(
+                f"{schema}.{table}: {kept} rows found up to the checkpoint, "
+                f"{checkpoint.rows_loaded} expected: reloading from the start"
+            )
+        cur.execute(f"TRUNCATE {schema}.{table}")
+    return False
+
+
+class CycleJournal:
+    """! @brief Checkpoint journal as seen by one migration cycle.
+
+    A phase is only recorded as completed while every previous phase of the
+    cycle completed, so a resumed run never skips work that depends on a
+    table that failed to load.
+    """
+
+    def __init__(
+        self,
+        conn_pg: psycopg2.extensions.connection,
+        cfg: Config,
+        enabled: bool,
+        resume: bool,
+    ):
+        """! @brief Starts a new journal, or reads the journal to resume.
+        @param conn_pg Active PostgreSQL connection.
+        @param cfg Configuration containing the schemas.
+        @param enabled False for dry runs (nothing is read or written).
+        @param resume True to resume the interrupted cycle (--resume).
+        """
+        self.conn_pg = conn_pg
+        self.cfg = cfg
+        self.enabled = enabled
+        self.clean = True
+        self.entries: Dict[str, Dict[str, Checkpoint]] = {"table": {}, "phase": {}}
+        if not enabled:
+            return
+        logger = logging.getLogger("migration")
+        ensure_checkpoint_table(conn_pg, cfg)
+        if not resume:
+            reset_checkpoints(conn_pg, cfg)
+            return
+        self.entries = prune_stale_checkpoints(conn_pg, cfg, load_checkpoints(conn_pg, cfg))
+        if not any(self.entries.values()):
+            logger.info("No checkpoint to resume: running the whole cycle")
+        else:
+            done = [t for t, c in self.entries["table"].items() if c.completed]
+            logger.info(
+                f"Resuming: phases done: {', '.join(self.entries['phase']) or 'none'}; "
+                f"tables loaded: {len(done)}, interrupted: {len(self.entries['table']) - len(done)}"
+            )
+
+    def tables(self) -> Dict[str, Checkpoint]:
+        """! @brief Returns the table entries of the resumed cycle."""
+        return self.entries["table"]
+
+    def skip(self, phase: str) -> bool:
+        """! @brief Tells whether a phase was completed by the resumed cycle.
+        @param phase One of PHASES.
+        @return True if the phase must be skipped.
+        """
+        entry = self.entries["phase"].get(phase)
+        if entry is None or not entry.completed:
+            return False
+        logging.getLogger("migration").info(f"Skipping phase {phase}: completed by the interrupted run")
+        return True
+
+    def incomplete_tables(self, tables: list) -> list:
+        """! @brief Lists the tables whose load did not complete.
+        @param tables Tables of the cycle.
+        @return Tables without a completed entry in the journal.
+        """
+        if not self.enabled:
+            return []
+        entries = load_checkpoints(self.conn_pg, self.cfg)["table"]
+        return [t for t in tables if t not in entries or not entries[t].completed]
+
+    def complete(self, phase: str, success: bool = True) -> None:
+        """! @brief Records the end of a phase.
+        @param phase One of PHASES.
+        @param success False if the phase left work undone (e.g. a failed table).
+        """
+        self.clean = self.clean and success
+        if self.enabled and self.clean:
+            complete_phase(self.conn_pg, self.cfg, phase)
+
+    def close(self) -> None:
+        """! @brief Clears the journal of a cycle that completed every phase."""
+        if self.enabled and self.clean:
+            reset_checkpoints(self.conn_pg, self.cfg)
@@ -9,37 +9,82 @@ tables before synchronization with the main tables.
 """
 
 import logging
-from typing import List, Tuple, Callable
+import time
+from typing import Callable, List, Optional, Tuple
 
 import psycopg2 # type: ignore
 
-from config import Config
+from config import Config, EXTRACTION_FILTERS
+from incremental import is_incremental
+from sync import ensure_company_indexes
 
 
-def _delete_in_batches(
+def _cleanup_chunk_size(cfg: Config) -> int:
+    """! @brief Number of rows deleted per transaction by the orphan cleanups."""
+    return max(100, min(cfg.batch_size, 5000))
+
+
+def delete_orphans(
     conn_pg: psycopg2.extensions.connection,
-    logger: logging.Logger,
-    delete_sql_template: str,
-    batch_size: int,
+    rule: str,
+    schema: str,
+    table: str,
+    alias: str,
+    condition: str,
+    chunk_size: int,
+    recheck: bool = False,
 ) -> int:
-    """Deletes rows in batches using the provided DELETE ... LIMIT query.
+    """! @brief Deletes the rows of a table matching an orphan condition.
+
+    The ids of the matching rows are computed once, by a single evaluation of
+    the (usually anti-join) condition, then deleted by chunks of consecutive
+    ids, one short transaction per chunk. The cost is linear in the number of
+    orphans, where re-running a DELETE ... LIMIT until it comes back short
+    evaluated the whole condition again for every batch.
 
-    The delete_sql_template must contain {batch_size} placeholder for the limit.
-    Using format string instead of parameter binding because psycopg2 has issues
-    with %s inside ctid subqueries. batch_size is always a trusted integer from config.
+    @param conn_pg Active PostgreSQL connection.
+    @param rule Name of the rule, used in the progress logs.
+    @param schema Schema of the table.
+    @param table Table to clean, with an integer 'id' column.
+    @param alias Alias of the table used by condition.
+    @param condition SQL condition selecting the rows to delete.
+    @param chunk_size Number of ids deleted per transaction.
+    @param recheck When True the condition is evaluated again on each chunk,
+                   for tables that may be written while the cleanup runs.
+    @return Number of rows deleted.
     """
-    total_deleted = 0
-    delete_sql = delete_sql_template.format(batch_size=int(batch_size))
-    while True:
+    logger = logging.getLogger("migration")
+    start = time.perf_counter()
+    with conn_pg.cursor() as cur:
+        cur.execute(
+            f"SELECT {alias}.id FROM {schema}.{table} {alias} WHERE {condition} ORDER BY 1"
+        )
+        ids = [row[0] for row in cur.fetchall()]
+    # End the read transaction before the deletes
+    conn_pg.commit()
+    scan_s = time.perf_counter() - start
+    logger.info(f"{rule}: {len(ids)} rows to delete from {schema}.{table} (found in {scan_s:.2f}s)")
+
+    # The DELETE has parameters: literal % of the condition must be doubled
+    guard = f" AND ({condition.replace('%', '%%')})" if recheck else ""
+    deleted = 0
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset:offset + chunk_size]
         with conn_pg.cursor() as cur:
-            cur.execute(delete_sql)
-            deleted = cur.rowcount
+            cur.execute(
+                f"DELETE FROM {schema}.{table} {alias} "
+                f"WHERE {alias}.id BETWEEN %s AND %s AND {alias}.id = ANY(%s){guard}",
+                (chunk[0], chunk[-1], chunk),
+            )
+            deleted += cur.rowcount
         conn_pg.commit()
-        total_deleted += deleted
-        if deleted < batch_size:
-            break
-        logger.debug("Deleted %d rows, continuing next batch", deleted)
-    return total_deleted
+        logger.info(f"{rule}: {offset + len(chunk)}/{len(ids)} ids processed")
+
+    logger.info(
+        f"{rule}: {deleted} rows deleted from {schema}.{table} "
+        f"in {time.perf_counter() - start:.2f}s (scan {scan_s:.2f}s)"
+    )
+    return deleted
 
 
 def cleanup_temp_apprentice_company(
@@ -52,15 +97,22 @@ def cleanup_temp_apprentice_company(
     logger = logging.getLogger("migration")
     logger.info("=== Cleaning temporary tables ===")
     schema = cfg.temp_schema
+    tables = [t for t in ("apprentice", "company") if t not in EXTRACTION_FILTERS]
+    if not tables:
+        logger.info("Temporary rows already filtered out at extraction, nothing to do.")
+        return
 
     try:
+        counts = {"apprentice": 0, "company": 0}
         with conn_pg.cursor() as cur:
-            cur.execute(f"DELETE FROM {schema}.apprentice WHERE discr LIKE '%temp%';")
-            app_cnt = cur.rowcount
-            cur.execute(f"DELETE FROM {schema}.company WHERE discr LIKE '%temp%';")
-            cmp_cnt = cur.rowcount
+            for table in tables:
+                cur.execute(f"DELETE FROM {schema}.{table} WHERE discr LIKE '%temp%';")
+                counts[table] = cur.rowcount
         conn_pg.commit()
-        logger.info("Temporary row cleanup finished: %d apprentices, %d companies.", app_cnt, cmp_cnt)
+        logger.info(
+            "Temporary row cleanup finished: %d apprentices, %d companies.",
+            counts["apprentice"], counts["company"],
+        )
     except Exception as e:
         conn_pg.rollback()
         logger.exception("Error during temporary table cleanup: %s", e)
@@ -72,89 +124,104 @@ def sync_corrected_sirets(
     """! @brief Syncs corrected SIRETs: marks staging companies as 'temp' if MariaDB has them as 'temp'.
 
     When a SIRET is corrected in MariaDB, the old record gets discr='temp'.
-    This function propagates that change to PostgreSQL staging:
-    1. Finds SIRETs that are 'temp' in temp schema but 'official' in staging
-    2. Updates references (registration, billing) to point to the correct company
-    3. Marks the old staging company as 'temp' for later deletion
+    This function propagates that change to PostgreSQL staging with a few
+    set-based statements in one transaction:
+    1. Collects the staging companies whose SIRET is 'temp' in the temp schema
+       but still 'official' in staging
+    2. Picks one replacement per SIREN (first 9 digits): the most recently
+       updated official company of that SIREN that is not itself corrected
+    3. Points registration and billing references to the replacements
+    4. Marks the old staging companies as 'temp' for later deletion
 
     @param conn_pg Active PostgreSQL connection.
     @param cfg Configuration containing schema names.
     """
     logger = logging.getLogger("migration")
     logger.info("=== Syncing corrected SIRETs from MariaDB ===")
+    schema = cfg.pg_schema
 
     try:
+        # SIREN prefix index used by the replacement lookup
+        ensure_company_indexes(conn_pg, cfg)
+
         with conn_pg.cursor() as cur:
-            # Find SIRETs that are marked as 'temp' in temp schema (from MariaDB)
-            # but still exist as 'official' in staging
             cur.execute(f"""
-                SELECT tc.siret, sc.id AS staging_id
+                DROP TABLE IF EXISTS corrected_company;
+                CREATE TEMP TABLE corrected_company ON COMMIT DROP AS
+                SELECT DISTINCT
+                    sc.id AS old_id,
+                    CASE WHEN length(tc.siret) >= 9 THEN left(tc.siret, 9) END AS siren
                 FROM {cfg.temp_schema}.company tc
-                JOIN {cfg.pg_schema}.company sc ON tc.siret = sc.siret
+                JOIN {schema}.company sc ON tc.siret = sc.siret
                 WHERE tc.discr LIKE '%temp%'
                   AND sc.discr LIKE '%official%'
                   AND tc.siret IS NOT NULL
                   AND tc.siret != '';
             """)
-            corrected_sirets = cur.fetchall()
+            cur.execute("SELECT COUNT(*) FROM corrected_company")
+            corrected = cur.fetchone()[0]
 
-            if not corrected_sirets:
+            if not corrected:
+                conn_pg.commit()
                 logger.info("No corrected SIRETs to sync.")
                 return
 
-            logger.info(f"Found {len(corrected_sirets)} SIRETs corrected in MariaDB.")
-
-            for siret, staging_id in corrected_sirets:
-                logger.info(f"Processing corrected SIRET {siret} (staging id={staging_id})")
-
-                # Check if there's a replacement company with the same SIREN (first 9 digits)
-                siren = siret[:9] if siret and len(siret) >= 9 else None
-
-                if siren:
-                    # Look for a valid replacement company with the same SIREN
-                    cur.execute(f"""
-                        SELECT sc.id
-                        FROM {cfg.pg_schema}.company sc
-                        WHERE sc.siret LIKE %s
-                          AND sc.discr LIKE '%official%'
-                          AND sc.id != %s
-                        ORDER BY sc.updated_at DESC NULLS LAST
-                        LIMIT 1;
-                    """, (siren + '%', staging_id))
-                    replacement = cur.fetchone()
-
-                    if replacement:
-                        replacement_id = replacement[0]
-                        logger.info(f"Found replacement company id={replacement_id} for SIRET {siret}")
-
-                        # Update registration references
-                        cur.execute(f"""
-                            UPDATE {cfg.pg_schema}.registration
-                            SET host_company_id = %s
-                            WHERE host_company_id = %s;
-                        """, (replacement_id, staging_id))
-                        reg_updated = cur.rowcount
-
-                        # Update billing references
-                        cur.execute(f"""
-                            UPDATE {cfg.pg_schema}.billing
-                            SET company_id = %s
-                            WHERE company_id = %s;
-                        """, (replacement_id, staging_id))
-                        bill_updated = cur.rowcount
-
-                        logger.info(f"Updated {reg_updated} registrations, {bill_updated} billings")
-
-                # Mark the old company as 'temp' so it gets deleted by cleanup
-                cur.execute(f"""
-                    UPDATE {cfg.pg_schema}.company
-                    SET discr = 'company_temp'
-                    WHERE id = %s;
-                """, (staging_id,))
-                logger.info(f"Marked staging company id={staging_id} as 'temp'")
+            logger.info(f"Found {corrected} SIRETs corrected in MariaDB.")
+
+            cur.execute(f"""
+                CREATE TEMP TABLE company_replacement ON COMMIT DROP AS
+                WITH candidates AS (
+                    SELECT
+                        left(sc.siret, 9) AS siren,
+                        sc.id,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY left(sc.siret, 9)
+                            ORDER BY sc.updated_at DESC NULLS LAST, sc.id DESC
+                        ) AS rank
+                    FROM {schema}.company sc
+                    WHERE left(sc.siret, 9) IN (
+                        SELECT siren FROM corrected_company WHERE siren IS NOT NULL
+                    )
+                      AND sc.discr LIKE '%official%'
+                      AND sc.id NOT IN (SELECT old_id FROM corrected_company)
+                )
+                SELECT cc.old_id, c.id AS new_id
+                FROM corrected_company cc
+                JOIN candidates c ON c.siren = cc.siren AND c.rank = 1;
+            """)
+            replaced = cur.rowcount
+
+            cur.execute(f"""
+                UPDATE {schema}.registration r
+                SET host_company_id = m.new_id
+                FROM company_replacement m
+                WHERE r.host_company_id = m.old_id;
+            """)
+            reg_updated = cur.rowcount
+
+            cur.execute(f"""
+                UPDATE {schema}.billing b
+                SET company_id = m.new_id
+                FROM company_replacement m
+                WHERE b.company_id = m.old_id;
+            """)
+            bill_updated = cur.rowcount
+
+            # Mark the old companies as 'temp' so they get deleted by cleanup
+            cur.execute(f"""
+                UPDATE {schema}.company c
+                SET discr = 'company_temp'
+                FROM corrected_company cc
+                WHERE c.id = cc.old_id;
+            """)
+            marked = cur.rowcount
 
         conn_pg.commit()
-        logger.info("Corrected SIRETs sync complete.")
+        logger.info(
+            f"Corrected SIRETs sync complete: {replaced} replacements, "
+            f"{reg_updated} registrations, {bill_updated} billings updated, "
+            f"{marked} companies marked as 'temp'."
+        )
 
     except Exception as e:
         conn_pg.rollback()
@@ -177,25 +244,21 @@ def cleanup_staging_temp_companies(
     schema = cfg.pg_schema
 
     try:
-        batch_size = max(100, min(cfg.batch_size, 5000))
-        delete_sql = f"""
-            DELETE FROM {schema}.company c
-            WHERE ctid IN (
-                SELECT ctid FROM {schema}.company c
-                WHERE c.discr LIKE '%temp%'
-                  AND NOT EXISTS (
-                      SELECT 1 FROM {schema}.registration r
-                      WHERE r.host_company_id = c.id
-                  )
-                  AND NOT EXISTS (
-                      SELECT 1 FROM {schema}.billing b
-                      WHERE b.company_id = c.id
-                  )
-                LIMIT {{batch_size}}
-            );
-        """
-
-        deleted = _delete_in_batches(conn_pg, logger, delete_sql, batch_size)
+        deleted = delete_orphans(
+            conn_pg, "cleanup_staging_temp_companies", schema, "company", "c",
+            f"""
+                c.discr LIKE '%temp%'
+                AND NOT EXISTS (
+                    SELECT 1 FROM {schema}.registration r
+                    WHERE r.host_company_id = c.id
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM {schema}.billing b
+                    WHERE b.company_id = c.id
+                )
+            """,
+            _cleanup_chunk_size(cfg), recheck=True,
+        )
         logger.info(f"{deleted} obsolete companies deleted from staging.")
 
     except Exception as e:
@@ -218,12 +281,10 @@ def cleanup_staging_unreferenced_companies(
     logger.info("=== Cleaning unreferenced companies from staging ===")
 
     try:
-        batch_size = max(100, min(cfg.batch_size, 5000))
-        delete_sql = f"""
-            DELETE FROM {schema}.company c
-            WHERE ctid IN (
-                SELECT ctid FROM {schema}.company c
-                WHERE NOT EXISTS (
+        deleted = delete_orphans(
+            conn_pg, "cleanup_staging_unreferenced_companies", schema, "company", "c",
+            f"""
+                NOT EXISTS (
                     SELECT 1 FROM {schema}.registration r
                     WHERE r.host_company_id = c.id
                 )
@@ -231,11 +292,9 @@ def cleanup_staging_unreferenced_companies(
                     SELECT 1 FROM {schema}.billing b
                     WHERE b.company_id = c.id
                 )
-                LIMIT {{batch_size}}
-            );
-        """
-
-        deleted = _delete_in_batches(conn_pg, logger, delete_sql, batch_size)
+            """,
+            _cleanup_chunk_size(cfg), recheck=True,
+        )
         logger.info(f"{deleted} unreferenced companies deleted from staging.")
 
     except Exception as e:
@@ -254,10 +313,15 @@ def cleanup_registration(conn_pg: psycopg2.extensions.connection, cfg: Config) -
           - have a status that contains 'double'
           - have a start_date before 2022-06-01
           - are drafts (draft = 1)
+          Nothing is done when EXTRACTION_FILTERS already drops these rows
+          while they are read from MariaDB.
     """
     logger = logging.getLogger("migration")
     schema = cfg.temp_schema
     logger.info("=== Cleaning registration table ===")
+    if "registration" in EXTRACTION_FILTERS:
+        logger.info("Invalid registrations already filtered out at extraction, nothing to do.")
+        return
     try:
         with conn_pg.cursor() as cur:
             cur.execute(f"""
@@ -330,25 +394,25 @@ def cleanup_apprentice_city(
 
 
 def cleanup_unreferenced_training(
-    conn_pg: psycopg2.extensions.connection, cfg: Config
+    conn_pg: psycopg2.extensions.connection, cfg: Config, schema: Optional[str] = None
 ) -> None:
     """! @brief Removes training records not linked to valid registrations.
     @param conn_pg Active PostgreSQL connection.
     @param cfg Configuration containing the temporary schema name.
+    @param schema Schema to clean, the temporary schema by default (staging
+                  after an incremental sync, see run_staging_cleanup).
     @note Training records are kept only if they have at least one registration
           with a signature_date after 2022-06-01.
     """
     logger = logging.getLogger("migration")
-    schema = cfg.temp_schema
+    schema = schema or cfg.temp_schema
     logger.info("=== Cleaning unreferenced training records ===")
 
     try:
-        batch_size = max(100, min(cfg.batch_size, 5000))
-        delete_sql = f"""
-            DELETE FROM {schema}.training t
-            WHERE ctid IN (
-                SELECT ctid FROM {schema}.training t
-                WHERE NOT EXISTS (
+        deleted = delete_orphans(
+            conn_pg, "cleanup_unreferenced_training", schema, "training", "t",
+            f"""
+                NOT EXISTS (
                     SELECT 1 FROM {schema}.training_course tc
                     JOIN {schema}.training_group tg ON tg.course_id = tc.id
                     JOIN {schema}.training_option topt ON topt.group_id = tg.id
@@ -357,12 +421,10 @@ def cleanup_unreferenced_training(
                       AND r.signature_date IS NOT NULL
                       AND r.signature_date > DATE '2022-06-01'
                 )
-                LIMIT {{batch_size}}
-            );
-        """
-
-        deleted_count = _delete_in_batches(conn_pg, logger, delete_sql, batch_size)
-        logger.info(f"{deleted_count} unreferenced training records deleted.")
+            """,
+            _cleanup_chunk_size(cfg), recheck=schema == cfg.pg_schema,
+        )
+        logger.info(f"{deleted} unreferenced training records deleted.")
 
     except Exception as e:
         conn_pg.rollback()
@@ -370,37 +432,35 @@ def cleanup_unreferenced_training(
 
 
 def cleanup_unreferenced_rncp(
-    conn_pg: psycopg2.extensions.connection, cfg: Config
+    conn_pg: psycopg2.extensions.connection, cfg: Config, schema: Optional[str] = None
 ) -> None:
     """! @brief Removes RNCP records that are not referenced by any training.
     @param conn_pg Active PostgreSQL connection.
     @param cfg Configuration containing the temporary schema name.
+    @param schema Schema to clean, the temporary schema by default (staging
+                  after an incremental sync, see run_staging_cleanup).
     @note RNCP records are kept only if:
           - Their id is referenced in training.rncp_id
           - OR their code matches training.rncp_number
     """
     logger = logging.getLogger("migration")
-    schema = cfg.temp_schema
+    schema = schema or cfg.temp_schema
     logger.info("=== Cleaning unreferenced RNCP records ===")
 
     try:
-        batch_size = max(100, min(cfg.batch_size, 5000))
-        delete_sql = f"""
-            DELETE FROM {schema}.rncp r
-            WHERE ctid IN (
-                SELECT ctid FROM {schema}.rncp r
-                WHERE r.id NOT IN (
+        deleted = delete_orphans(
+            conn_pg, "cleanup_unreferenced_rncp", schema, "rncp", "r",
+            f"""
+                r.id NOT IN (
                     SELECT rncp_id FROM {schema}.training WHERE rncp_id IS NOT NULL
                 )
                 AND r.code NOT IN (
                     SELECT rncp_number FROM {schema}.training WHERE rncp_number IS NOT NULL
                 )
-                LIMIT {{batch_size}}
-            );
-        """
-
-        deleted_count = _delete_in_batches(conn_pg, logger, delete_sql, batch_size)
-        logger.info(f"{deleted_count} unreferenced RNCP records deleted.")
+            """,
+            _cleanup_chunk_size(cfg), recheck=schema == cfg.pg_schema,
+        )
+        logger.info(f"{deleted} unreferenced RNCP records deleted.")
 
     except Exception as e:
         conn_pg.rollback()
@@ -408,26 +468,26 @@ def cleanup_unreferenced_rncp(
 
 
 def cleanup_obsolete_companies(
-    conn_pg: psycopg2.extensions.connection, cfg: Config
+    conn_pg: psycopg2.extensions.connection, cfg: Config, schema: Optional[str] = None
 ) -> None:
     """! @brief Removes obsolete companies (those with no registrations or billings).
     @param conn_pg Active PostgreSQL connection.
     @param cfg Configuration containing the temporary schema name.
+    @param schema Schema to clean, the temporary schema by default (staging
+                  after an incremental sync, see run_staging_cleanup).
     @note Obsolete companies are those that:
           - Have no associated registrations
           - Have no associated billings
     """
     logger = logging.getLogger("migration")
-    schema = cfg.temp_schema
+    schema = schema or cfg.temp_schema
     logger.info("=== Cleaning obsolete companies ===")
 
     try:
-        batch_size = max(100, min(cfg.batch_size, 5000))
-        delete_sql = f"""
-            DELETE FROM {schema}.company c
-            WHERE ctid IN (
-                SELECT ctid FROM {schema}.company c
-                WHERE NOT EXISTS (
+        deleted = delete_orphans(
+            conn_pg, "cleanup_obsolete_companies", schema, "company", "c",
+            f"""
+                NOT EXISTS (
                     SELECT 1 FROM {schema}.registration r
                     WHERE r.host_company_id = c.id
                 )
@@ -435,12 +495,10 @@ def cleanup_obsolete_companies(
                     SELECT 1 FROM {schema}.billing b
                     WHERE b.company_id = c.id
                 )
-                LIMIT {{batch_size}}
-            );
-        """
-
-        deleted_count = _delete_in_batches(conn_pg, logger, delete_sql, batch_size)
-        logger.info(f"{deleted_count} obsolete companies deleted.")
+            """,
+            _cleanup_chunk_size(cfg), recheck=schema == cfg.pg_schema,
+        )
+        logger.info(f"{deleted} obsolete companies deleted.")
 
     except Exception as e:
         conn_pg.rollback()
@@ -455,8 +513,7 @@ def run_specific_cleanup(conn_pg: psycopg2.extensions.connection, cfg: Config) -
           1. Uppercasing
           2. Deletion of deadlines and invoices marked as deleted
           3. Normalization of names (uppercase) and first names (first letter capitalized)
-          4. Cleaning of dimension tables to keep only entries
-          referenced in the main tables.
+    @see cleanup_unreferenced_dimensions for the cleaning of dimension tables.
     """
     logger = logging.getLogger("migration")
     schema = cfg.temp_schema
@@ -554,6 +611,25 @@ def run_specific_cleanup(conn_pg: psycopg2.extensions.connection, cfg: Config) -
             )
         conn_pg.commit()
 
+    except Exception as e:
+        conn_pg.rollback()
+        logger.exception("Specific cleanup error: %s", e)
+
+
+def cleanup_unreferenced_dimensions(
+    conn_pg: psycopg2.extensions.connection, cfg: Config, schema: Optional[str] = None
+) -> None:
+    """! @brief Keeps only the dimension rows referenced by the main tables.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the temporary schema name.
+    @param schema Schema to clean, the temporary schema by default (staging
+                  after an incremental sync, see run_staging_cleanup).
+    @note Deletes apprentices, sectors and training options/groups/courses
+          that are not referenced in the temporary tables.
+    """
+    logger = logging.getLogger("migration")
+    schema = schema or cfg.temp_schema
+    try:
         logger.info("Cleaning dimension tables...")
         # Note: training and company cleanup are handled by dedicated functions:
         # - cleanup_unreferenced_training (runs earlier)
@@ -598,7 +674,7 @@ def run_specific_cleanup(conn_pg: psycopg2.extensions.connection, cfg: Config) -
 
     except Exception as e:
         conn_pg.rollback()
-        logger.exception("Specific cleanup error: %s", e)
+        logger.exception("Dimension cleanup error: %s", e)
 
 
 # List of cleanup tasks
@@ -611,11 +687,22 @@ CLEANUP_TASKS: List[Tuple[str, Callable]] = [  # type: ignore
     ("cleanup_unreferenced_rncp", cleanup_unreferenced_rncp),
     ("cleanup_obsolete_companies", cleanup_obsolete_companies),
     ("specific_cleanup", run_specific_cleanup),
+    ("cleanup_unreferenced_dimensions", cleanup_unreferenced_dimensions),
     # Note: cleanup_staging_temp_companies is not needed since
     # cleanup_staging_unreferenced_companies removes all unreferenced companies
     ("cleanup_staging_unreferenced_companies", cleanup_staging_unreferenced_companies),
 ]
 
+# Tasks comparing whole temp tables with each other. An incremental run only
+# loads the changed rows, so they would drop rows whose references did not
+# change: it runs them on staging after sync instead (run_staging_cleanup).
+SNAPSHOT_CLEANUP_TASKS = {
+    "cleanup_unreferenced_training",
+    "cleanup_unreferenced_rncp",
+    "cleanup_obsolete_companies",
+    "cleanup_unreferenced_dimensions",
+}
+
 
 def run_cleanup(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
     """! @brief Sequentially executes all registered cleanup tasks.
@@ -624,8 +711,40 @@ def run_cleanup(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
     """
     logger = logging.getLogger("migration")
     for name, fn in CLEANUP_TASKS:
+        if name in SNAPSHOT_CLEANUP_TASKS and is_incremental(cfg):
+            logger.info("Skipping cleanup %s (incremental run)", name)
+            continue
         logger.info("Executing cleanup: %s", name)
+        start = time.perf_counter()
         try:
             fn(conn_pg, cfg)
         except Exception as e:
             logger.exception("Error in %s: %s", name, e)
+        logger.info("Cleanup %s finished in %.2fs", name, time.perf_counter() - start)
+
+
+def run_staging_cleanup(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
+    """! @brief Runs the snapshot cleanups on staging after an incremental sync.
+
+    An incremental run skips them on the temporary tables, which only hold the
+    changed rows. Once sync has merged these rows, staging holds the complete
+    data, and pruning it deletes the rows a full run would have dropped. The
+    pruned tables are reloaded in full by incremental runs (PRUNED_TABLES), so
+    a pruned row referenced again later comes back as in a full run.
+
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing schemas and other settings.
+    """
+    if not is_incremental(cfg):
+        return
+    logger = logging.getLogger("migration")
+    for name, fn in CLEANUP_TASKS:
+        if name not in SNAPSHOT_CLEANUP_TASKS:
+            continue
+        logger.info("Executing cleanup on %s: %s", cfg.pg_schema, name)
+        start = time.perf_counter()
+        try:
+            fn(conn_pg, cfg, schema=cfg.pg_schema)
+        except Exception as e:
+            logger.exception("Error in %s: %s", name, e)
+        logger.info("Cleanup %s finished in %.2fs", name, time.perf_counter() - start)
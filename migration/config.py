@@ -11,7 +11,80 @@ loading values from environment variables.
 from __future__ import annotations
 
 import os
+import re
 from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+# Supported extraction strategies for large MariaDB tables
+EXTRACT_METHODS = ("keyset", "stream", "offset")
+# Supported loading backends for the temporary tables
+LOAD_METHODS = ("copy", "insert")
+# Supported migration modes
+MIGRATION_MODES = ("full", "incremental")
+# Supported temporary table profiles: 'unlogged' (no WAL, indexes built after
+# the load) or 'logged' (legacy copy of the main tables, indexes included)
+TEMP_TABLE_PROFILES = ("unlogged", "logged")
+
+
+# Supported OPCO lookup sources: local index of the data.gouv resource, or per-company API calls
+OPCO_SOURCES = ("index", "api")
+# Supported API response cache modes (see api_cache.py)
+API_CACHE_MODES = ("off", "on", "cache-only")
+
+
+def _parse_host_values(spec: str, variable: str) -> Dict[str, float]:
+    """! @brief Parses a 'host=value,host=value' setting.
+    @param spec Value of the environment variable.
+    @param variable Name of the variable, for error messages.
+    @return Positive values by host (or host/path prefix).
+    @raises ValueError If an entry is malformed or a value is not positive.
+    """
+    values: Dict[str, float] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        host, sep, raw = entry.partition("=")
+        try:
+            value = float(raw)
+        except ValueError:
+            value = 0.0
+        if not sep or not host.strip() or value <= 0:
+            raise ValueError(f"{variable} entry must be 'host=value' with value > 0: {entry}")
+        values[host.strip().lower()] = value
+    return values
+
+
+def parse_host_rates(spec: str) -> Dict[str, float]:
+    """! @brief Parses per-host API rates written as 'host=rate,host=rate'.
+    @param spec Value of API_HOST_RATES.
+    @return Requests per second by host name.
+    @raises ValueError If an entry is malformed or a rate is not positive.
+    """
+    return _parse_host_values(spec, "API_HOST_RATES")
+
+
+def parse_departements(spec: str) -> Tuple[str, ...]:
+    """! @brief Parses a comma-separated list of departement codes ('03,15,43,63').
+    @param spec Value of SIRENE_DEPARTEMENTS.
+    @return Departement codes, empty for all of France.
+    @raises ValueError If a code is not a departement code.
+    """
+    codes = tuple(filter(None, (part.strip().upper() for part in spec.split(","))))
+    for code in codes:
+        if not re.fullmatch(r"\d{2,3}|2[AB]", code):
+            raise ValueError(f"SIRENE_DEPARTEMENTS entry is not a departement code: {code}")
+    return codes
+
+
+def parse_cache_ttls(spec: str) -> Dict[str, float]:
+    """! @brief Parses per-endpoint cache lifetimes written as 'host[/path]=hours,...'.
+    @param spec Value of API_CACHE_TTLS.
+    @return Lifetimes in seconds by endpoint prefix.
+    @raises ValueError If an entry is malformed or a lifetime is not positive.
+    """
+    return {
+        endpoint: hours * 3600
+        for endpoint, hours in _parse_host_values(spec, "API_CACHE_TTLS").items()
+    }
+
 
 @dataclass(frozen=True)
 class Config:
@@ -34,24 +107,64 @@ class Config:
     pg_pool_min: int = int(os.getenv("PG_POOL_MIN", "1"))
     pg_pool_max: int = int(os.getenv("PG_POOL_MAX", "5"))
     batch_size: int = int(os.getenv("BATCH_SIZE", "500"))
+    # Number of primary-key values per range compared by checksum during sync
+    sync_chunk_size: int = int(os.getenv("SYNC_CHUNK_SIZE", "10000"))
     log_file: str = os.getenv("MIGRATION_LOG", "logs/migration.log")
     temp_schema: str = os.getenv("PG_TEMP_SCHEMA", "temp_staging")
+    # Extraction strategy for large tables: 'keyset' (WHERE key > last ORDER BY key),
+    # 'stream' (server-side unbuffered cursor) or 'offset' (legacy LIMIT/OFFSET)
+    extract_method: str = os.getenv("EXTRACT_METHOD", "keyset").lower()
+    # Loading backend: 'copy' (COPY FROM STDIN, one commit per table) or
+    # 'insert' (execute_values, one commit per batch)
+    load_method: str = os.getenv("LOAD_METHOD", "copy").lower()
+    # Number of tables migrated concurrently (1 keeps the sequential migration)
+    migration_workers: int = int(os.getenv("MIGRATION_WORKERS", "1"))
+    # 'full' reloads every table, 'incremental' only the rows changed since
+    # the high-water mark stored in migration_watermark: max updated_at, or
+    # max id for tables without updated_at. An id mark only sees inserted
+    # rows: updates of existing rows of those tables need a full run.
+    migration_mode: str = os.getenv("MIGRATION_MODE", "full").lower()
+    # Temporary tables: profile, concurrent index builds after the load and
+    # maintenance_work_mem of the index build transactions
+    temp_table_profile: str = os.getenv("TEMP_TABLE_PROFILE", "unlogged").lower()
+    temp_index_workers: int = int(os.getenv("TEMP_INDEX_WORKERS", "4"))
+    temp_index_maintenance_work_mem: str = os.getenv("TEMP_INDEX_MAINTENANCE_WORK_MEM", "512MB")
 
     # DB Metrics (MariaDB)
     enable_db_metrics: bool = os.getenv("ENABLE_DB_METRICS", "true").lower() == "true"
     db_metrics_slow_ms: int = int(os.getenv("DB_METRICS_SLOW_MS", "200"))
     db_metrics_log_file: str = os.getenv("DB_METRICS_LOG", "logs/db_metrics.log")
+    # JSON profiling report of each run (see run_report.py)
+    run_report_dir: str = os.getenv("RUN_REPORT_DIR", "logs/run_reports")
 
     requests_per_second: int = int(os.getenv("API_REQUESTS_PER_SECOND", "7"))
     api_enabled: bool = os.getenv("ENABLE_API_ENRICHMENT", "false").lower() == "true"
     api_retries: int = int(os.getenv("API_RETRIES", "3"))
     api_backoff_factor: int = int(os.getenv("API_BACKOFF_FACTOR", "1"))
+    # Burst size of each host token bucket, and per-host rates ('host=rate,...')
+    api_burst: int = int(os.getenv("API_BURST", "1"))
+    api_host_rates: str = os.getenv("API_HOST_RATES", "")
+    # Persistent API response cache
+    api_cache_mode: str = os.getenv("API_CACHE_MODE", "on").lower()
+    api_cache_file: str = os.getenv("API_CACHE_FILE", "cache/api_responses.sqlite")
+    api_cache_ttl_hours: int = int(os.getenv("API_CACHE_TTL_HOURS", "168"))
+    api_cache_negative_ttl_hours: int = int(os.getenv("API_CACHE_NEGATIVE_TTL_HOURS", "24"))
+    api_cache_ttls: str = os.getenv("API_CACHE_TTLS", "")
+    api_cache_max_entries: int = int(os.getenv("API_CACHE_MAX_ENTRIES", "200000"))
+    # Optional local SIRENE establishment stock (CSV) checked before the API
+    sirene_stock_file: str = os.getenv("SIRENE_STOCK_FILE", "")
+    sirene_index_dir: str = os.getenv("SIRENE_INDEX_DIR", "cache/sirene")
+    sirene_departements: str = os.getenv("SIRENE_DEPARTEMENTS", "")
+    # Concurrent API enrichment (requests in flight, companies per UPDATE)
+    api_workers: int = int(os.getenv("API_WORKERS", "8"))
+    enrichment_batch_size: int = int(os.getenv("ENRICHMENT_BATCH_SIZE", "200"))
 
     # OPCO enrichment
     opco_enabled: bool = os.getenv("ENABLE_OPCO_ENRICHMENT", "false").lower() == "true"
     opco_resource_id: str = os.getenv(
         "OPCO_RESOURCE_ID", "59533036-3c0b-45e6-972c-e967c0a1be17"
     )
+    opco_source: str = os.getenv("OPCO_SOURCE", "index").lower()
     opco_page_size_siret: int = int(os.getenv("OPCO_PAGE_SIZE_SIRET", "1"))
     opco_page_size_siren: int = int(os.getenv("OPCO_PAGE_SIZE_SIREN", "100"))
 
@@ -68,10 +181,17 @@ class Config:
         """
         # Fields that can be empty or False without issue
         optional_fields = {
-            "batch_size", "log_file", "temp_schema",
-            "enable_db_metrics", "db_metrics_slow_ms", "db_metrics_log_file",
+            "batch_size", "log_file", "temp_schema", "extract_method", "load_method",
+            "migration_workers", "migration_mode", "sync_chunk_size",
+            "temp_table_profile", "temp_index_workers", "temp_index_maintenance_work_mem",
+            "enable_db_metrics", "db_metrics_slow_ms", "db_metrics_log_file", "run_report_dir",
             "requests_per_second", "api_enabled", "api_retries", "api_backoff_factor",
-            "opco_enabled", "opco_resource_id", "opco_page_size_siret", "opco_page_size_siren",
+            "api_burst", "api_host_rates", "api_workers", "enrichment_batch_size",
+            "api_cache_mode", "api_cache_file", "api_cache_ttl_hours",
+            "api_cache_negative_ttl_hours", "api_cache_ttls", "api_cache_max_entries",
+            "sirene_stock_file", "sirene_index_dir", "sirene_departements",
+            "opco_enabled", "opco_resource_id", "opco_source",
+            "opco_page_size_siret", "opco_page_size_siren",
             "enrichment_siret_limit",
             "migration_run_hour"
         }
@@ -89,6 +209,47 @@ class Config:
             raise ValueError("PG_POOL_MIN must be positive")
         if self.pg_pool_max < self.pg_pool_min:
             raise ValueError("PG_POOL_MAX must be greater or equal to PG_POOL_MIN")
+        if self.extract_method not in EXTRACT_METHODS:
+            raise ValueError(
+                f"EXTRACT_METHOD must be one of: {', '.join(EXTRACT_METHODS)}"
+            )
+        if self.load_method not in LOAD_METHODS:
+            raise ValueError(f"LOAD_METHOD must be one of: {', '.join(LOAD_METHODS)}")
+        if self.migration_workers <= 0:
+            raise ValueError("MIGRATION_WORKERS must be positive")
+        if self.sync_chunk_size <= 0:
+            raise ValueError("SYNC_CHUNK_SIZE must be positive")
+        if self.temp_table_profile not in TEMP_TABLE_PROFILES:
+            raise ValueError(
+                f"TEMP_TABLE_PROFILE must be one of: {', '.join(TEMP_TABLE_PROFILES)}"
+            )
+        if self.temp_index_workers <= 0:
+            raise ValueError("TEMP_INDEX_WORKERS must be positive")
+        if not re.fullmatch(r"\d+\s*(kB|MB|GB)?", self.temp_index_maintenance_work_mem.strip()):
+            raise ValueError("TEMP_INDEX_MAINTENANCE_WORK_MEM must be a size such as '512MB'")
+        if self.api_burst <= 0:
+            raise ValueError("API_BURST must be positive")
+        parse_host_rates(self.api_host_rates)
+        if self.api_cache_mode not in API_CACHE_MODES:
+            raise ValueError(f"API_CACHE_MODE must be one of: {', '.join(API_CACHE_MODES)}")
+        if self.api_cache_ttl_hours <= 0 or self.api_cache_negative_ttl_hours <= 0:
+            raise ValueError("API_CACHE_TTL_HOURS and API_CACHE_NEGATIVE_TTL_HOURS must be positive")
+        if self.api_cache_max_entries <= 0:
+            raise ValueError("API_CACHE_MAX_ENTRIES must be positive")
+        parse_cache_ttls(self.api_cache_ttls)
+        if self.sirene_stock_file.lower().endswith(".parquet"):
+            raise ValueError("SIRENE_STOCK_FILE must be a CSV export (Parquet is not supported)")
+        parse_departements(self.sirene_departements)
+        if self.opco_source not in OPCO_SOURCES:
+            raise ValueError(f"OPCO_SOURCE must be one of: {', '.join(OPCO_SOURCES)}")
+        if self.api_workers <= 0:
+            raise ValueError("API_WORKERS must be positive")
+        if self.enrichment_batch_size <= 0:
+            raise ValueError("ENRICHMENT_BATCH_SIZE must be positive")
+        if self.migration_mode not in MIGRATION_MODES:
+            raise ValueError(
+                f"MIGRATION_MODE must be one of: {', '.join(MIGRATION_MODES)}"
+            )
 
 
 # Table structure
@@ -121,6 +282,20 @@ CONFLICT_KEYS = {
 #            Cleanup handles SIRET deduplication and ID mapping
 PROTECTED_TABLES = {"city", "company"}
 
+# Tables whose rows cleanup deletes when nothing references them. Incremental
+# runs reload them in full and prune them in staging after sync, so that a row
+# referenced again by a later change comes back as in a full run.
+PRUNED_TABLES = {
+    "apprentice",
+    "company",
+    "rncp",
+    "sector",
+    "training",
+    "training_course",
+    "training_group",
+    "training_option",
+}
+
 TABLE_ORDER = [
     "city",
     "cerfa_param",
@@ -143,3 +318,45 @@ TABLE_ORDER = [
     "deadline",
     "billing_line",
 ]
+
+# Ordering constraints for the parallel migration (table -> tables that must
+# be fully loaded first). Temp tables are created without foreign keys and the
+# apprentice name normalization only touches its own rows, so no table has to
+# wait today; add an entry here when a step starts reading another temp table.
+MIGRATION_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {}
+
+# Rows discarded while they are extracted from MariaDB, so they are neither
+# transferred nor converted nor deleted by cleanup afterwards:
+# table -> (condition the extracted rows must meet, its parameters).
+# The cleanup step deleting the same rows is skipped for a filtered table.
+# Note: MariaDB compares LIKE patterns with the column collation
+# (case-insensitive by default).
+EXTRACTION_FILTERS: Dict[str, Tuple[str, Tuple[Any, ...]]] = {
+    # Registrations without apprentice or option, deleted, "double",
+    # started before 2022-06-01 or still drafts
+    "registration": (
+        "apprentice_id IS NOT NULL AND option_id IS NOT NULL AND deleted_at IS NULL"
+        " AND (status IS NULL OR status NOT LIKE %s)"
+        " AND (start_date IS NULL OR start_date >= %s)"
+        " AND (draft IS NULL OR draft <> 1)",
+        ("%double%", "2022-06-01"),
+    ),
+    # Temporary apprentices and companies
+    "apprentice": ("discr IS NULL OR discr NOT LIKE %s", ("%temp%",)),
+    "company": ("discr IS NULL OR discr NOT LIKE %s", ("%temp%",)),
+}
+
+# Indexes built on the unlogged temporary tables once they are loaded, besides
+# the conflict key of every table (used by the sync range checksums and merge).
+# Only the columns joined or filtered on by cleanup.py and sync.py are listed.
+TEMP_TABLE_INDEXES: Dict[str, Tuple[str, ...]] = {
+    "city": ("code",),
+    "company": ("siret",),
+    "billing": ("company_id",),
+    "training": ("rncp_id",),
+    "training_course": ("training_id",),
+    "training_group": ("course_id",),
+    "training_option": ("group_id",),
+    "apprentice": ("address_city_id",),
+    "registration": ("host_company_id", "option_id", "apprentice_id"),
+}
@@ -10,9 +10,10 @@ interactions.
 """
 
 import logging
+import threading
 import time
 from contextlib import contextmanager
-from typing import Any, Dict, Iterator, List, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import psycopg2 # type: ignore
 from psycopg2 import pool # type: ignore
@@ -42,6 +43,8 @@ class MariaDBMetrics:
         self.ops_count: Dict[str, int] = {}
         self.ops_time_s: Dict[str, float] = {}
         self.slow_queries: List[Dict[str, Any]] = []
+        # Queries may be recorded from several migration workers at once
+        self._lock = threading.Lock()
 
     def _op(self, sql: str) -> str:
         """! @brief Extracts the operation type from an SQL query.
@@ -56,11 +59,12 @@ class MariaDBMetrics:
         @param params The parameters used in the query.
         @param duration_s The query duration in seconds.
         """
-        self.total_queries += 1
-        self.total_time_s += duration_s
         op = self._op(sql)
-        self.ops_count[op] = self.ops_count.get(op, 0) + 1
-        self.ops_time_s[op] = self.ops_time_s.get(op, 0.0) + duration_s
+        with self._lock:
+            self.total_queries += 1
+            self.total_time_s += duration_s
+            self.ops_count[op] = self.ops_count.get(op, 0) + 1
+            self.ops_time_s[op] = self.ops_time_s.get(op, 0.0) + duration_s
 
         dur_ms = duration_s * 1000
         if dur_ms >= self.slow_ms:
@@ -72,7 +76,8 @@ class MariaDBMetrics:
             # Avoid logging large parameters
             if params is not None and params != ():
                 info["params"] = self._shorten_params(params)
-            self.slow_queries.append(info)
+            with self._lock:
+                self.slow_queries.append(info)
             if self.db_logger:
                 self.db_logger.info(
                     "SLOW %s %.1fms | %s | params=%r",
@@ -129,8 +134,98 @@ class MariaDBMetrics:
             return None
 
 
+# --- PostgreSQL Metrics ---------------------------------------------------
+
+
+class PostgresMetrics(MariaDBMetrics):
+    """! @brief Collects client-side statement timings for PostgreSQL.
+
+    Fed by TimedCursor, so execute_values pages, COPY loads, cleanup deletes
+    and sync statements are all measured. Statements are grouped by their
+    text cut before any VALUES list, and parameters are never kept: they
+    may contain SIRETs or personal data.
+    """
+
+    def __init__(self, slow_ms: int, db_logger: logging.Logger | None = None) -> None:
+        super().__init__(slow_ms, db_logger)
+        self.statements: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def statement(sql: Any) -> str:
+        """! @brief Returns the grouping key of a statement.
+        @param sql Query text, as str, bytes (execute_values) or psycopg2.sql object.
+        @return Whitespace-collapsed text, cut before VALUES, at most 200 characters.
+        """
+        if isinstance(sql, bytes):
+            sql = sql[:2000].decode("utf-8", errors="replace")
+        text = " ".join(str(sql)[:2000].split())
+        cut = text.upper().find(" VALUES ")
+        if cut >= 0:
+            text = text[:cut] + " VALUES ..."
+        return text[:200]
+
+    def record(self, sql: Any, params: Any, duration_s: float) -> None:
+        """! @brief Records a single statement execution (parameters are ignored).
+        @param sql The executed statement.
+        @param params Unused, kept for the MariaDBMetrics interface.
+        @param duration_s The statement duration in seconds.
+        """
+        statement = self.statement(sql)
+        super().record(statement, None, duration_s)
+        with self._lock:
+            entry = self.statements.setdefault(statement, {"count": 0, "time_s": 0.0, "max_s": 0.0})
+            entry["count"] += 1
+            entry["time_s"] += duration_s
+            entry["max_s"] = max(entry["max_s"], duration_s)
+
+    def top_statements(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """! @brief Returns the statements with the largest total time.
+        @param limit Maximum number of statements.
+        @return List of {statement, count, time_ms, max_ms}.
+        """
+        with self._lock:
+            entries = sorted(self.statements.items(), key=lambda e: e[1]["time_s"], reverse=True)
+        return [
+            {
+                "statement": statement,
+                "count": int(entry["count"]),
+                "time_ms": round(entry["time_s"] * 1000, 1),
+                "max_ms": round(entry["max_s"] * 1000, 1),
+            }
+            for statement, entry in entries[:limit]
+        ]
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """! @brief Cursor recording the duration of every statement in PostgresMetrics.
+
+    Installed as the cursor factory of the migration connections; it only
+    measures when init_postgres_metrics enabled the collector.
+    """
+
+    def _timed(self, method: Callable[..., Any], sql: Any, *args: Any) -> Any:
+        if _pg_metrics is None:
+            return method(sql, *args)
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            _pg_metrics.record(sql, None, time.perf_counter() - start)
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+
 _maria_metrics: MariaDBMetrics | None = None
+_pg_metrics: PostgresMetrics | None = None
 _pg_pool: pool.ThreadedConnectionPool | None = None
+_pg_pool_lock = threading.Lock()
 
 
 def init_mariadb_metrics(cfg: Config) -> None:
@@ -152,6 +247,24 @@ def get_mariadb_metrics() -> MariaDBMetrics | None:
     return _maria_metrics
 
 
+def init_postgres_metrics(cfg: Config) -> None:
+    """! @brief Initializes PostgreSQL statement metrics if enabled in the configuration.
+    @param cfg The application configuration.
+    """
+    global _pg_metrics
+    if cfg and getattr(cfg, "enable_db_metrics", False):
+        _pg_metrics = PostgresMetrics(cfg.db_metrics_slow_ms, logging.getLogger("migration.db"))
+    else:
+        _pg_metrics = None
+
+
+def get_postgres_metrics() -> PostgresMetrics | None:
+    """! @brief Gets the PostgreSQL metrics collector instance.
+    @return The PostgresMetrics instance, or None if not initialized.
+    """
+    return _pg_metrics
+
+
 def ma_execute(
     cur: pymysql.cursors.Cursor, sql: str, params: Any | None = None
 ) -> None:
@@ -209,6 +322,8 @@ def postgres_connection(cfg: Config) -> Iterator[psycopg2.extensions.connection]
     def _configure_connection(conn: psycopg2.extensions.connection) -> None:
         """Apply standard session settings for migration connections."""
         conn.set_session(autocommit=False)
+        # Statement timings (no-op unless PostgreSQL metrics are enabled)
+        conn.cursor_factory = TimedCursor
         with conn.cursor() as cur:
             cur.execute(f"SET search_path TO {cfg.pg_schema}")
             cur.execute("SET session_replication_role = 'replica'")
@@ -218,16 +333,17 @@ def postgres_connection(cfg: Config) -> Iterator[psycopg2.extensions.connection]
 
     if cfg.use_pg_pool:
         # Lazily initialize a thread-safe pool and reuse it for all callers
-        if _pg_pool is None:
-            _pg_pool = pool.ThreadedConnectionPool(
-                cfg.pg_pool_min,
-                cfg.pg_pool_max,
-                host=cfg.pg_host,
-                user=cfg.pg_user,
-                password=cfg.pg_password,
-                dbname=cfg.pg_db,
-                connect_timeout=10,
-            )
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                _pg_pool = pool.ThreadedConnectionPool(
+                    cfg.pg_pool_min,
+                    cfg.pg_pool_max,
+                    host=cfg.pg_host,
+                    user=cfg.pg_user,
+                    password=cfg.pg_password,
+                    dbname=cfg.pg_db,
+                    connect_timeout=10,
+                )
 
         conn = _pg_pool.getconn()
         try:
@@ -401,3 +517,85 @@ def normalize_names(row: Dict[str, Any]) -> Dict[str, Any]:
     if row.get("last_name"):
         row["last_name"] = row["last_name"].strip().upper()
     return row
+
+
+def _to_bool(value: Any) -> bool:
+    """! @brief Converts a MariaDB TINYINT flag to a Python boolean."""
+    return bool(int(value))
+
+
+def _value_converter(target_type: str) -> Optional[Callable[[Any], Any]]:
+    """! @brief Resolves the conversion callable for a PostgreSQL type.
+    @param target_type The target PostgreSQL type.
+    @return The callable applied by convert_value for this type, or None when
+            values are passed through unchanged.
+    """
+    t = target_type.lower()
+    if t in {"boolean"}:
+        return _to_bool
+    if t in {"integer", "int", "smallint", "bigint"}:
+        return int
+    if t in {"real", "numeric", "decimal"}:
+        return float
+    if t in {"character varying", "varchar", "text"}:
+        return str
+    return None
+
+
+def compile_row_converter(
+    columns: Sequence[str],
+    types: Sequence[str],
+    normalize: bool = False,
+) -> Callable[[Sequence[tuple]], List[tuple]]:
+    """! @brief Builds a batch converter for one table, resolved once from its column types.
+
+    The returned function converts fetched rows into output tuples with the
+    same results as convert_value (and normalize_names when requested), without
+    building an intermediate dict per row or re-parsing the type per cell.
+
+    @param columns Column names, in row order.
+    @param types PostgreSQL data types, in row order.
+    @param normalize Apply normalize_names to first_name/last_name columns.
+    @return A function taking a batch of rows and returning converted tuples.
+    @note If a row fails the fast path, it is converted cell by cell with
+          convert_value, which logs the failing value and keeps it unchanged.
+    """
+    steps: List[Tuple[int, Callable[[Any], Any]]] = []
+    for i, (col, col_type) in enumerate(zip(columns, types)):
+        fn = _value_converter(col_type)
+        if normalize and col == "first_name":
+            fn = (lambda v, f=fn: (f(v) if f else v).strip().title())
+        elif normalize and col == "last_name":
+            fn = (lambda v, f=fn: (f(v) if f else v).strip().upper())
+        if fn is not None:
+            steps.append((i, fn))
+    steps_t = tuple(steps)
+    cols = list(columns)
+    col_types = list(types)
+
+    def _slow_row(rec: Sequence[Any]) -> tuple:
+        d = {cols[i]: convert_value(rec[i], col_types[i]) for i in range(len(cols))}
+        if normalize:
+            d = normalize_names(d)
+        return tuple(d[c] for c in cols)
+
+    if not steps_t:
+        return lambda rows: [tuple(rec) for rec in rows]
+
+    def convert_rows(rows: Sequence[tuple]) -> List[tuple]:
+        out = []
+        append = out.append
+        for rec in rows:
+            row = list(rec)
+            try:
+                for i, fn in steps_t:
+                    v = row[i]
+                    if v is not None:
+                        row[i] = fn(v)
+            except Exception:
+                append(_slow_row(rec))
+                continue
+            append(tuple(row))
+        return out
+
+    return convert_rows
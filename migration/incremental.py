@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""! @file incremental.py
+@brief High-water marks and delta key sets for the incremental migration.
+@author Marie Challet
+@organization Formasup Auvergne
+
+With MIGRATION_MODE=incremental only the rows changed since the last
+successful sync are extracted from MariaDB:
+- a per-table high-water mark (max updated_at, or max id for tables without
+  updated_at) is kept in {pg_schema}.migration_watermark;
+- rows deleted in MariaDB are found by merging the sorted key lists of both
+  databases, without reloading the rows;
+- the keys touched by the run are stored in {temp_schema}.<table>_delta_keys
+  so that sync only deletes staging rows among those keys.
+
+A new mark is first stored as pending and only becomes the reference once
+sync_tables has synchronized the table, so the rows of a failed run are
+extracted again by the next one. The pending mark is dropped when a load of
+the table starts, so only the mark of the rows loaded by the current cycle
+can be promoted.
+"""
+
+import logging
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg2  # type: ignore
+import pymysql
+from psycopg2.extras import execute_values  # type: ignore
+
+from config import Config, CONFLICT_KEYS, PROTECTED_TABLES, PRUNED_TABLES
+from database import ma_execute, transaction
+
+
+WATERMARK_TABLE = "migration_watermark"
+
+# Keys fetched per round trip when comparing key lists
+KEY_FETCH_SIZE = 10000
+
+
+def is_incremental(cfg: Config) -> bool:
+    """! @brief Tells whether the incremental mode is enabled.
+    @param cfg Configuration containing the migration mode.
+    @return True when MIGRATION_MODE is 'incremental'.
+    """
+    return getattr(cfg, "migration_mode", "full") == "incremental"
+
+
+def ensure_watermark_table(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
+    """! @brief Creates the migration_watermark table if it does not exist.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    """
+    with transaction(conn_pg) as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {cfg.pg_schema}.{WATERMARK_TABLE} (
+                table_name VARCHAR(64) PRIMARY KEY,
+                column_name VARCHAR(64) NOT NULL,
+                value TEXT,
+                pending_value TEXT,
+                updated_at TIMESTAMP DEFAULT NOW() NOT NULL
+            )
+            """
+        )
+
+
+def watermark_column(table: str, columns: Sequence[str]) -> Optional[str]:
+    """! @brief Chooses the column tracked by the high-water mark of a table.
+    @param table Name of the table.
+    @param columns Columns common to MariaDB and PostgreSQL.
+    @return 'updated_at' when available, else the table key, else None.
+    @note Protected tables are always reloaded in full: cleanup remaps ids
+          from their complete content. So are the tables pruned by cleanup
+          (PRUNED_TABLES), whose pruned rows must come back when referenced again.
+    @note An id mark only selects inserted rows: updates of existing rows of
+          tables without updated_at are only picked up by a full run.
+    """
+    if table in PROTECTED_TABLES or table in PRUNED_TABLES:
+        return None
+    if "updated_at" in columns:
+        return "updated_at"
+    key = CONFLICT_KEYS.get(table)
+    if key and key in columns:
+        return key
+    return None
+
+
+def get_watermark(
+    conn_pg: psycopg2.extensions.connection, cfg: Config, table: str, column: str
+) -> Optional[str]:
+    """! @brief Reads the committed high-water mark of a table.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @param table Name of the table.
+    @param column Column the mark must have been taken on.
+    @return The mark, or None if the table was never synchronized (or the
+            tracked column changed), meaning a full extraction.
+    """
+    with conn_pg.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (f"{cfg.pg_schema}.{WATERMARK_TABLE}",))
+        if cur.fetchone()[0] is None:
+            return None
+        cur.execute(
+            f"SELECT column_name, value FROM {cfg.pg_schema}.{WATERMARK_TABLE} "
+            "WHERE table_name = %s",
+            (table,),
+        )
+        row = cur.fetchone()
+    if not row or row[0] != column:
+        return None
+    return row[1]
+
+
+def delta_predicate(column: str, mark: str) -> Tuple[str, Tuple[Any, ...]]:
+    """! @brief Builds the MariaDB filter selecting rows changed since a mark.
+    @param column Tracked column.
+    @param mark High-water mark.
+    @return The WHERE condition and its parameters.
+    @note updated_at is compared with >= so rows sharing the mark timestamp
+          but committed after the previous extraction are not lost (the
+          upsert is idempotent). Rows without updated_at are always taken.
+    """
+    if column == "updated_at":
+        return "(updated_at >= %s OR updated_at IS NULL)", (mark,)
+    return f"{column} > %s", (mark,)
+
+
+def store_pending_watermark(
+    conn_pg: psycopg2.extensions.connection,
+    cfg: Config,
+    table: str,
+    column: str,
+    source_schema: str,
+) -> Optional[str]:
+    """! @brief Records the mark reached by the rows just loaded, as pending.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @param table Name of the table.
+    @param column Tracked column.
+    @param source_schema Schema holding the loaded rows.
+    @return The pending mark, or None if no row carries a value.
+    """
+    with transaction(conn_pg) as cur:
+        cur.execute(f"SELECT MAX({column})::text FROM {source_schema}.{table}")
+        mark = cur.fetchone()[0]
+        if mark is None:
+            return None
+        cur.execute(
+            f"""
+            INSERT INTO {cfg.pg_schema}.{WATERMARK_TABLE} (table_name, column_name, pending_value)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (table_name) DO UPDATE SET
+                pending_value = excluded.pending_value,
+                value = CASE
+                    WHEN {WATERMARK_TABLE}.column_name = excluded.column_name
+                    THEN {WATERMARK_TABLE}.value
+                END,
+                column_name = excluded.column_name
+            """,
+            (table, column, mark),
+        )
+    return mark
+
+
+def clear_pending_watermark(
+    conn_pg: psycopg2.extensions.connection, cfg: Config, table: str
+) -> None:
+    """! @brief Drops the pending mark of a table whose load is starting.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @param table Name of the table.
+    @note A mark left pending by a cycle whose sync failed must not be promoted
+          by a later cycle whose load of the table failed: the rows up to it
+          were never synchronized.
+    """
+    with transaction(conn_pg) as cur:
+        cur.execute(
+            f"UPDATE {cfg.pg_schema}.{WATERMARK_TABLE} SET pending_value = NULL "
+            "WHERE table_name = %s AND pending_value IS NOT NULL",
+            (table,),
+        )
+
+
+def commit_watermark(
+    conn_pg: psycopg2.extensions.connection, cfg: Config, table: str
+) -> None:
+    """! @brief Promotes the pending mark of a table once it has been synchronized.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the schema.
+    @param table Name of the table.
+    """
+    with transaction(conn_pg) as cur:
+        cur.execute("SELECT to_regclass(%s)", (f"{cfg.pg_schema}.{WATERMARK_TABLE}",))
+        if cur.fetchone()[0] is None:
+            return
+        cur.execute(
+            f"""
+            UPDATE {cfg.pg_schema}.{WATERMARK_TABLE}
+            SET value = pending_value, pending_value = NULL, updated_at = NOW()
+            WHERE table_name = %s AND pending_value IS NOT NULL
+            """,
+            (table,),
+        )
+
+
+def _iter_mariadb_keys(
+    conn_maria: pymysql.connections.Connection,
+    table: str,
+    key: str,
+    where: str = "",
+    params: Tuple[Any, ...] = (),
+) -> Iterator[Any]:
+    """! @brief Streams the sorted key list of a MariaDB table (restricted by where)."""
+    with conn_maria.cursor(pymysql.cursors.SSCursor) as ma_cur:
+        if where:
+            ma_execute(ma_cur, f"SELECT {key} FROM {table} WHERE {where} ORDER BY {key}", params)
+        else:
+            ma_execute(ma_cur, f"SELECT {key} FROM {table} ORDER BY {key}")
+        while True:
+            rows = ma_cur.fetchmany(KEY_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0]
+
+
+def _iter_pg_keys(
+    conn_pg: psycopg2.extensions.connection, schema: str, table: str, key: str
+) -> Iterator[Any]:
+    """! @brief Streams the sorted key list of a PostgreSQL table (named cursor)."""
+    with conn_pg.cursor(name=f"keys_{table}") as pg_cur:
+        pg_cur.itersize = KEY_FETCH_SIZE
+        pg_cur.execute(f"SELECT {key} FROM {schema}.{table} ORDER BY {key}")
+        for row in pg_cur:
+            yield row[0]
+
+
+def missing_keys(source: Iterator[Any], target: Iterator[Any]) -> Iterator[Any]:
+    """! @brief Merges two sorted key streams and yields the target keys absent from source.
+    @param source Sorted keys of the source database.
+    @param target Sorted keys of the target database.
+    @return Iterator of keys present in target only.
+    """
+    current = next(source, None)
+    for key in target:
+        while current is not None and current < key:
+            current = next(source, None)
+        if current is None or current != key:
+            yield key
+
+
+def record_delta_keys(
+    conn_maria: pymysql.connections.Connection,
+    conn_pg: psycopg2.extensions.connection,
+    cfg: Config,
+    table: str,
+    where: str = "",
+    params: Tuple[Any, ...] = (),
+) -> int:
+    """! @brief Stores the keys touched by an incremental run in <table>_delta_keys.
+
+    The set holds the keys of the changed rows just loaded in the temp table
+    and the keys of staging rows deleted in MariaDB since the last run.
+    It must be built before cleanup so that rows filtered out by cleanup are
+    removed from staging by sync, as in a full run.
+
+    @param conn_maria Active MariaDB connection.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing schema names.
+    @param table Name of the table.
+    @param where Extraction filter of the table: MariaDB rows that no longer
+                 match it count as deleted, so sync removes them from staging.
+    @param params Parameters of the filter.
+    @return Number of keys deleted in MariaDB.
+    """
+    key = CONFLICT_KEYS[table]
+    delta_table = f"{cfg.temp_schema}.{table}_delta_keys"
+
+    deleted: List[tuple] = [
+        (k,)
+        for k in missing_keys(
+            _iter_mariadb_keys(conn_maria, table, key, where, params),
+            _iter_pg_keys(conn_pg, cfg.pg_schema, table, key),
+        )
+    ]
+    # Close the read transaction opened by the named cursor
+    conn_pg.commit()
+
+    with transaction(conn_pg) as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {delta_table}")
+        cur.execute(
+            f"CREATE TABLE {delta_table} AS SELECT {key} FROM {cfg.temp_schema}.{table}"
+        )
+        if deleted:
+            execute_values(cur, f"INSERT INTO {delta_table} ({key}) VALUES %s", deleted)
+
+    logging.getLogger("migration").info(
+        f"{table}: {len(deleted)} rows deleted (or filtered out) in MariaDB since last run"
+    )
+    return len(deleted)
+
+
+def delta_keys_table(
+    conn_pg: psycopg2.extensions.connection, cfg: Config, table: str
+) -> Optional[str]:
+    """! @brief Returns the delta key table of a table if the migrate step built one.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing the temporary schema.
+    @param table Name of the table.
+    @return Qualified table name, or None.
+    """
+    name = f"{cfg.temp_schema}.{table}_delta_keys"
+    with conn_pg.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (name,))
+        exists = cur.fetchone()[0] is not None
+    return name if exists else None
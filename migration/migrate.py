@@ -17,18 +17,32 @@ import logging
 import re
 import sys
 import time
+from dataclasses import replace
 from datetime import date, datetime
 from pathlib import Path
 
 from api_enrichment import api_enrich_companies
-from cleanup import run_cleanup
+from checkpoint import CycleJournal
+from cleanup import run_cleanup, run_staging_cleanup
 from config import Config, TABLE_ORDER
 from database import mariadb_connection, postgres_connection
 from logger import setup_logger, setup_db_logger
 from migration_core import run_migration
-from database import init_mariadb_metrics, get_mariadb_metrics, ma_execute
+from database import (
+    get_mariadb_metrics,
+    get_postgres_metrics,
+    init_mariadb_metrics,
+    init_postgres_metrics,
+    ma_execute,
+)
+from run_report import RunReport, finish_run_report, start_run_report
 from sync import sync_tables, analyze_tables
-from temp_tables import create_temp_schema, create_temp_tables, drop_temp_schema
+from temp_tables import (
+    build_temp_indexes,
+    create_temp_schema,
+    create_temp_tables,
+    drop_temp_schema,
+)
 
 
 # Constants for daily execution control
@@ -162,6 +176,19 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Run once and exit (do not wait for next day)",
     )
+    p.add_argument(
+        "--mode",
+        choices=["full", "incremental"],
+        help="Override MIGRATION_MODE: reload every row or only the changed ones. "
+        "Tables without updated_at are tracked by id, so incremental runs only "
+        "pick up their new rows, not updates of existing ones",
+    )
+    p.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the interrupted cycle: skip completed phases and tables, "
+        "continue partially loaded tables after their last checkpoint",
+    )
     p.add_argument(
         "--daemon",
         action="store_true",
@@ -170,13 +197,50 @@ def parse_args() -> argparse.Namespace:
     return p.parse_args()
 
 
-def run_migration_cycle(args: argparse.Namespace, cfg: Config, logger: "logging.Logger") -> None:
-    """! @brief Execute a single migration cycle.
+def run_migration_cycle(args: argparse.Namespace, cfg: Config, logger: "logging.Logger") -> bool:
+    """! @brief Execute a single migration cycle and write its run report.
+
+    Args:
+        args: Parsed command line arguments.
+        cfg: Configuration object.
+        logger: Logger instance.
+
+    Returns:
+        False if tables were not fully loaded and the cycle must be resumed.
+    """
+    report = start_run_report(args.step, cfg.migration_mode, args.dry_run)
+    # Database metrics cover this cycle only
+    init_mariadb_metrics(cfg)
+    init_postgres_metrics(cfg)
+    try:
+        completed = _run_cycle_steps(args, cfg, logger, report)
+    except Exception as e:
+        finish_run_report(report, cfg, success=False, error=str(e))
+        raise
+    finish_run_report(
+        report, cfg, success=completed,
+        error=None if completed else "Tables not fully loaded",
+    )
+    return completed
+
+
+def _run_cycle_steps(
+    args: argparse.Namespace, cfg: Config, logger: "logging.Logger", report: RunReport
+) -> bool:
+    """! @brief Runs the steps of a migration cycle, timing each phase in the report.
+
+    A table whose load did not complete stops the cycle after the migrate step:
+    cleanup and sync would delete the staging rows it is missing, and the temp
+    tables are kept for --resume.
 
     Args:
         args: Parsed command line arguments.
         cfg: Configuration object.
         logger: Logger instance.
+        report: Report of the cycle.
+
+    Returns:
+        False if tables were not fully loaded, True otherwise.
     """
     logger.info("Starting migration (step=%s, dry_run=%s)", args.step, args.dry_run)
 
@@ -194,87 +258,98 @@ def run_migration_cycle(args: argparse.Namespace, cfg: Config, logger: "logging.
 
         if not tables:
             logger.warning("No tables to migrate were found in MariaDB!")
-            return
+            return True
 
         logger.info("Tables to migrate: %s", ", ".join(tables))
 
-        if args.step in ("migrate", "full"):
-            # Create temporary schema and tables
+        # Checkpoint journal: cleared by a new cycle, read back by --resume
+        journal = CycleJournal(pg_conn, cfg, enabled=not args.dry_run, resume=args.resume)
+
+        if args.step in ("migrate", "full") and not journal.skip("migrate"):
+            resumed = journal.tables()
+            with report.phase("migrate"):
+                # Create temporary schema and tables (kept for tables being resumed)
+                if not args.dry_run:
+                    create_temp_schema(pg_conn, cfg)
+                    create_temp_tables(pg_conn, cfg, [t for t in tables if t not in resumed])
+
+                # Migrate data from MariaDB to temporary tables
+                stats = run_migration(
+                    ma_conn,
+                    pg_conn,
+                    cfg,
+                    tables,
+                    mode=("dry-run" if args.dry_run else "live"),
+                    checkpoints=resumed,
+                    journal=journal.enabled,
+                )
+            report.add_tables(stats)
+
             if not args.dry_run:
-                create_temp_schema(pg_conn, cfg)
-                create_temp_tables(pg_conn, cfg, tables)
-
-            # Migrate data from MariaDB to temporary tables
-            stats = run_migration(
-                ma_conn,
-                pg_conn,
-                cfg,
-                tables,
-                mode=("dry-run" if args.dry_run else "live"),
-            )
+                # Index the loaded temporary tables for cleanup and sync
+                with report.phase("index"):
+                    build_temp_indexes(cfg, tables)
+
+            incomplete = journal.incomplete_tables(tables)
 
             # Log statistics
             if not args.dry_run:
                 with pg_conn.cursor() as cur:
                     cur.execute(
                         f"INSERT INTO {cfg.pg_schema}.migration_logs (stats, success) VALUES (%s, %s)",
-                        (json.dumps(stats), True),
+                        (json.dumps(stats), not incomplete),
                     )
                     pg_conn.commit()
 
-        if args.step in ("cleanup", "full") and not args.dry_run:
+            journal.complete("migrate", success=not incomplete)
+            if incomplete:
+                logger.warning(
+                    "Tables not fully loaded: %s. Cleanup and sync skipped, temp tables "
+                    "kept: run again with --resume",
+                    ", ".join(incomplete),
+                )
+                return False
+
+        if args.step in ("cleanup", "full") and not args.dry_run and not journal.skip("cleanup"):
             # Clean data in temporary tables
-            run_cleanup(pg_conn, cfg)
+            with report.phase("cleanup"):
+                run_cleanup(pg_conn, cfg)
+            journal.complete("cleanup")
 
         if args.step in ("sync", "full") and not args.dry_run:
-            # Synchronize temporary tables with main tables
-            sync_stats = sync_tables(pg_conn, cfg, tables)
-            logger.info("Synchronization summary: %s", json.dumps(sync_stats))
+            if not journal.skip("sync"):
+                # Synchronize temporary tables with main tables
+                with report.phase("sync"):
+                    sync_stats = sync_tables(pg_conn, cfg, tables)
+                    # Incremental runs prune the complete data, in staging
+                    run_staging_cleanup(pg_conn, cfg)
+                logger.info("Synchronization summary: %s", json.dumps(sync_stats))
+                _log_sync_stats(pg_conn, cfg, logger, sync_stats)
+                journal.complete("sync")
 
             # API enrichment after synchronization
-            if cfg.api_enabled:
-                api_stats = api_enrich_companies(pg_conn, cfg, ma_conn)
+            if cfg.api_enabled and not journal.skip("enrich"):
+                with report.phase("enrich"):
+                    api_stats = api_enrich_companies(pg_conn, cfg, ma_conn)
                 logger.info("Company API summary: %s", json.dumps(api_stats))
+                journal.complete("enrich")
 
             # Refresh planner statistics for updated tables
-            analyze_tables(pg_conn, cfg, tables)
-
-            # Log synchronization statistics
-            try:
-                with pg_conn.cursor() as cur:
-                    # First, check if the migration_type column exists
-                    cur.execute(
-                        """
-                        SELECT column_name
-                        FROM information_schema.columns
-                        WHERE table_schema = %s AND table_name = 'migration_logs'
-                        AND column_name = 'migration_type'
-                    """,
-                        (cfg.pg_schema,),
-                    )
-
-                    has_migration_type = cur.fetchone() is not None
-
-                    if has_migration_type:
-                        cur.execute(
-                            f"INSERT INTO {cfg.pg_schema}.migration_logs (stats, success, migration_type) VALUES (%s, %s, %s)",
-                            (json.dumps(sync_stats), True, "sync"),
-                        )
-                    else:
-                        cur.execute(
-                            f"INSERT INTO {cfg.pg_schema}.migration_logs (stats, success) VALUES (%s, %s)",
-                            (json.dumps(sync_stats), True),
-                        )
-                    pg_conn.commit()
-            except Exception as e:
-                logger.error(
-                    "Error while saving sync stats: %s",
-                    e,
-                )
-                pg_conn.rollback()
-
-        # Delete temporary tables if requested
-        if not args.dry_run and not args.keep_temp and args.step in ("sync", "full"):
+            if not journal.skip("analyze"):
+                with report.phase("analyze"):
+                    analyze_tables(pg_conn, cfg, tables)
+                journal.complete("analyze")
+
+            # The cycle went through: nothing left to resume
+            journal.close()
+
+        # Delete temporary tables if requested (kept while a phase is left to resume)
+        if (
+            not args.dry_run
+            and not args.keep_temp
+            and args.step in ("sync", "full")
+            and journal.clean
+        ):
             drop_temp_schema(pg_conn, cfg)
 
     logger.info("Migration finished.")
@@ -298,6 +373,66 @@ def run_migration_cycle(args: argparse.Namespace, cfg: Config, logger: "logging.
                     cfg.db_metrics_slow_ms,
                     cfg.db_metrics_log_file,
                 )
+        pg_metrics = get_postgres_metrics()
+        if pg_metrics:
+            summary = pg_metrics.summary()
+            logger.info(
+                "PostgreSQL statements: %d, %.1f ms total (average %.1f ms)",
+                summary["total_queries"],
+                summary["total_time_ms"],
+                summary["avg_ms_per_query"],
+            )
+            for entry in pg_metrics.top_statements(limit=3):
+                logger.info(
+                    "Top statement: %.1f ms over %d calls | %s",
+                    entry["time_ms"],
+                    entry["count"],
+                    entry["statement"],
+                )
+    return True
+
+
+def _log_sync_stats(pg_conn, cfg: Config, logger: "logging.Logger", sync_stats: dict) -> None:
+    """! @brief Records the synchronization statistics in migration_logs.
+
+    Args:
+        pg_conn: Active PostgreSQL connection.
+        cfg: Configuration object.
+        logger: Logger instance.
+        sync_stats: Statistics returned by sync_tables.
+    """
+    try:
+        with pg_conn.cursor() as cur:
+            # First, check if the migration_type column exists
+            cur.execute(
+                """
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema = %s AND table_name = 'migration_logs'
+                AND column_name = 'migration_type'
+            """,
+                (cfg.pg_schema,),
+            )
+
+            has_migration_type = cur.fetchone() is not None
+
+            if has_migration_type:
+                cur.execute(
+                    f"INSERT INTO {cfg.pg_schema}.migration_logs (stats, success, migration_type) VALUES (%s, %s, %s)",
+                    (json.dumps(sync_stats), True, "sync"),
+                )
+            else:
+                cur.execute(
+                    f"INSERT INTO {cfg.pg_schema}.migration_logs (stats, success) VALUES (%s, %s)",
+                    (json.dumps(sync_stats), True),
+                )
+            pg_conn.commit()
+    except Exception as e:
+        logger.error(
+            "Error while saving sync stats: %s",
+            e,
+        )
+        pg_conn.rollback()
 
 
 def main() -> None:
@@ -314,6 +449,8 @@ def main() -> None:
 
     # Load and validate configuration
     cfg = Config()
+    if args.mode:
+        cfg = replace(cfg, migration_mode=args.mode)
     try:
         cfg.validate()
     except Exception as e:
@@ -322,10 +459,9 @@ def main() -> None:
 
     # Configure logger
     logger = setup_logger(cfg.log_file)
-    # Specific logger for DB metrics + metric initialization
+    # Specific logger for DB metrics (collectors are initialized per cycle)
     if cfg.enable_db_metrics:
         setup_db_logger(cfg.db_metrics_log_file)
-        init_mariadb_metrics(cfg)
 
     # Daemon mode: run once per day in a loop
     if args.daemon:
@@ -340,9 +476,11 @@ def main() -> None:
                 if not args.force and not is_time_to_run(cfg.migration_run_hour):
                     wait_until_run_time(cfg.migration_run_hour, logger)
 
-                run_migration_cycle(args, cfg, logger)
+                completed = run_migration_cycle(args, cfg, logger)
                 # Reset force flag after first run in daemon mode
                 args.force = False
+                # An incomplete cycle is resumed by the next check
+                args.resume = not completed
             else:
                 logger.info(
                     "Migration already completed today (last run: %s)",
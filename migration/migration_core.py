@@ -5,247 +5,648 @@
 @organization Formasup Auvergne
 
 This module contains the main logic for the data migration process,
-including adaptive batching and handling of different table sizes.
+including adaptive batching, handling of different table sizes and the
+extraction strategies used to page through large MariaDB tables.
 """
 
 import logging
 import time
-from typing import Any, Dict, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import psycopg2
 import pymysql
-from psycopg2.extras import execute_values
 
-from config import Config, TABLE_ORDER
+from config import (
+    Config,
+    CONFLICT_KEYS,
+    EXTRACTION_FILTERS,
+    MIGRATION_DEPENDENCIES,
+    PROTECTED_TABLES,
+    PRUNED_TABLES,
+    TABLE_ORDER,
+)
 from database import (
     get_pg_columns,
     get_mariadb_columns,
-    normalize_names,
-    transaction,
-    convert_value,
+    compile_row_converter,
     ma_execute,
     get_mariadb_metrics,
+    mariadb_connection,
+    postgres_connection,
+)
+from incremental import (
+    clear_pending_watermark,
+    delta_predicate,
+    ensure_watermark_table,
+    get_watermark,
+    is_incremental,
+    record_delta_keys,
+    store_pending_watermark,
+    watermark_column,
 )
+from checkpoint import (
+    CHECKPOINT_ROWS,
+    Checkpoint,
+    prepare_resumed_table,
+    save_table_checkpoint,
+)
+from loader import make_loader
 
 
-def run_migration(
+def combine_predicates(
+    *predicates: Tuple[str, Tuple[Any, ...]]
+) -> Tuple[str, Tuple[Any, ...]]:
+    """! @brief ANDs SQL conditions together with their parameters.
+    @param predicates Tuples (condition, parameters); empty conditions are ignored.
+    @return The combined condition, each part in parentheses, and its parameters.
+    """
+    parts = [(where, params) for where, params in predicates if where]
+    if len(parts) == 1:
+        return parts[0][0], tuple(parts[0][1])
+    where = " AND ".join(f"({w})" for w, _ in parts)
+    params: Tuple[Any, ...] = tuple(p for _, ps in parts for p in ps)
+    return where, params
+
+
+def extraction_filter(table: str) -> Tuple[str, Tuple[Any, ...]]:
+    """! @brief Returns the EXTRACTION_FILTERS condition of a table.
+    @param table Name of the table.
+    @return Tuple (condition in parentheses, parameters), ('', ()) when the
+            table is not filtered.
+    """
+    where, params = EXTRACTION_FILTERS.get(table, ("", ()))
+    return (f"({where})", tuple(params)) if where else ("", ())
+
+
+def _iter_offset_batches(
+    conn_maria: pymysql.connections.Connection,
+    table: str,
+    columns: str,
+    batch_size: int,
+    table_size: int,
+    where: str = "",
+    params: Tuple[Any, ...] = (),
+) -> Iterator[Sequence[tuple]]:
+    """! @brief Pages through a table with LIMIT/OFFSET (legacy strategy).
+    @note Each page rescans every row before the offset, so the total cost
+          grows quadratically with the table size.
+    """
+    where_sql = f" WHERE {where}" if where else ""
+    offset = 0
+    while offset < table_size:
+        with conn_maria.cursor() as ma_cur:
+            ma_execute(
+                ma_cur,
+                f"SELECT {columns} FROM {table}{where_sql} LIMIT %s OFFSET %s",
+                params + (batch_size, offset),
+            )
+            rows = ma_cur.fetchall()
+        if not rows:
+            break
+        yield rows
+        offset += batch_size
+
+
+def _iter_keyset_batches(
+    conn_maria: pymysql.connections.Connection,
+    table: str,
+    columns: str,
+    key: str,
+    key_index: int,
+    batch_size: int,
+    where: str = "",
+    params: Tuple[Any, ...] = (),
+) -> Iterator[Sequence[tuple]]:
+    """! @brief Walks a table along its primary key (WHERE key > last ORDER BY key).
+    @note Every page is an index range seek, so the cost per page stays flat
+          whatever the position in the table.
+    """
+    last_key: Optional[Any] = None
+    while True:
+        with conn_maria.cursor() as ma_cur:
+            if last_key is None:
+                where_sql = f" WHERE {where}" if where else ""
+                ma_execute(
+                    ma_cur,
+                    f"SELECT {columns} FROM {table}{where_sql} ORDER BY {key} LIMIT %s",
+                    params + (batch_size,),
+                )
+            else:
+                where_sql = f"{where} AND " if where else ""
+                ma_execute(
+                    ma_cur,
+                    f"SELECT {columns} FROM {table} WHERE {where_sql}{key} > %s "
+                    f"ORDER BY {key} LIMIT %s",
+                    params + (last_key, batch_size),
+                )
+            rows = ma_cur.fetchall()
+        if not rows:
+            break
+        yield rows
+        if len(rows) < batch_size:
+            break
+        last_key = rows[-1][key_index]
+
+
+def _iter_stream_batches(
+    conn_maria: pymysql.connections.Connection,
+    table: str,
+    columns: str,
+    batch_size: int,
+    where: str = "",
+    params: Tuple[Any, ...] = (),
+) -> Iterator[Sequence[tuple]]:
+    """! @brief Streams a table through a server-side unbuffered cursor (SSCursor).
+    @note A single query is issued; rows are pulled from the socket batch by
+          batch, so the client never holds more than one batch in memory.
+          The MariaDB connection cannot run other queries until the stream ends.
+    """
+    with conn_maria.cursor(pymysql.cursors.SSCursor) as ma_cur:
+        if where:
+            ma_execute(ma_cur, f"SELECT {columns} FROM {table} WHERE {where}", params)
+        else:
+            ma_execute(ma_cur, f"SELECT {columns} FROM {table}")
+        while True:
+            rows = ma_cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+
+def iter_table_batches(
+    conn_maria: pymysql.connections.Connection,
+    cfg: Config,
+    table: str,
+    common_cols: List[str],
+    batch_size: int,
+    table_size: int,
+    where: str = "",
+    params: Tuple[Any, ...] = (),
+) -> Iterator[Sequence[tuple]]:
+    """! @brief Yields batches of MariaDB rows using the configured extraction strategy.
+    @param conn_maria Active MariaDB connection.
+    @param cfg Configuration containing the extraction method.
+    @param table Name of the table to read.
+    @param common_cols Columns to select, in output order.
+    @param batch_size Number of rows per batch.
+    @param table_size Row count of the table (used by the offset strategy).
+    @param where Optional SQL condition restricting the extracted rows.
+    @param params Parameters of the condition.
+    @return Iterator of row batches (tuples ordered like common_cols).
+    @note 'keyset' falls back to 'offset' when the table has no usable key column.
+    """
+    columns = ", ".join(common_cols)
+    method = getattr(cfg, "extract_method", "keyset")
+
+    if method == "stream":
+        return _iter_stream_batches(conn_maria, table, columns, batch_size, where, params)
+
+    if method == "keyset":
+        key = CONFLICT_KEYS.get(table)
+        if key and key in common_cols:
+            return _iter_keyset_batches(
+                conn_maria, table, columns, key, common_cols.index(key), batch_size,
+                where, params,
+            )
+        logging.getLogger("migration").warning(
+            "No key column for keyset extraction of %s, using LIMIT/OFFSET", table
+        )
+
+    return _iter_offset_batches(
+        conn_maria, table, columns, batch_size, table_size, where, params
+    )
+
+
+def _migrate_table(
     conn_maria: pymysql.connections.Connection,
     conn_pg: psycopg2.extensions.connection,
     cfg: Config,
-    tables: Sequence[str],
+    table: str,
+    table_size: int,
+    target_schema: str,
     mode: str,
-) -> Dict[str, Any]:
-    """! @brief Executes the data migration from MariaDB to PostgreSQL.
+    checkpoint: Optional[Checkpoint] = None,
+    journal: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """! @brief Migrates a single table and records it in migration_table_log.
     @param conn_maria Active MariaDB connection.
     @param conn_pg Active PostgreSQL connection.
     @param cfg Configuration containing schema names.
-    @param tables List of tables to migrate.
+    @param table Name of the table to migrate.
+    @param table_size Row count of the table in MariaDB.
+    @param target_schema Schema receiving the rows.
     @param mode Execution mode ('dry-run' or 'live').
-    @return Dictionary containing migration statistics by table.
+    @param checkpoint Journal entry of an interrupted load to resume.
+    @param journal True to record the progress in the checkpoint journal.
+    @return Statistics of the table, or None if it was skipped or failed.
     """
     logger = logging.getLogger("migration")
-    stats: Dict[str, Any] = {}
-
-    # Use the temporary schema for insertion
-    target_schema = cfg.temp_schema if mode != "dry-run" else cfg.pg_schema
-
-    # 1. Estimate the total number of required queries
-    table_sizes = {}
-    total_expected_queries = 0
-
-    # Get the size of all tables in a single connection
-    with conn_maria.cursor() as ma_cur:
-        for table in TABLE_ORDER:
-            if table not in tables:
-                continue
-            ma_execute(ma_cur, f"SELECT COUNT(*) FROM {table}")
-            count = ma_cur.fetchone()[0]
-            table_sizes[table] = count
-            # For each table: 1 query for the COUNT + estimation of the number of queries by pagination
-            if count > 0:
-                # If the table is small, we process it in a single query
-                # Otherwise we estimate the number of queries by pagination
-                if count <= cfg.batch_size:
-                    total_expected_queries += 1  # Just one query for the data
-                else:
-                    total_expected_queries += (
-                        count + cfg.batch_size - 1
-                    ) // cfg.batch_size
-
-    # 2. Optimize the strategy according to the size of the tables
     query_count = 0  # Query counter (local tracking for progress logs)
 
-    for table in TABLE_ORDER:
-        if table not in tables or table not in table_sizes:
-            logger.info(f"Skip missing table {table}")
-            continue
-
-        table_size = table_sizes[table]
-        if table_size == 0:
-            logger.info(f"No data in {table}")
-            continue
-
-        logger.info(f"Migrating {table} to {target_schema}... ({table_size} rows)")
-        start = time.time()
-
-        # Get the structure of the PostgreSQL table
-        with conn_pg.cursor() as pg_cur:
-            try:
-                pg_cols, pg_types = get_pg_columns(pg_cur, cfg.pg_schema, table)
-            except RuntimeError as e:
-                logger.warning(str(e))
-                continue
-
-        # Get the columns from MariaDB and keep only the common columns
-        with conn_maria.cursor() as ma_cur:
-            maria_cols = get_mariadb_columns(ma_cur, table)
-
-        # Intersection: columns present in both databases
-        common_cols = []
-        common_types = []
-        for i, col in enumerate(pg_cols):
-            if col in maria_cols:
-                common_cols.append(col)
-                common_types.append(pg_types[i])
-
-        if not common_cols:
-            logger.warning(f"No common columns between PostgreSQL and MariaDB for table {table}")
-            continue
-
-        if len(common_cols) < len(pg_cols):
-            missing = set(pg_cols) - set(common_cols)
-            logger.info(f"Table {table}: {len(missing)} columns missing in MariaDB: {missing}")
+    logger.info(f"Migrating {table} to {target_schema}... ({table_size} rows)")
+    start = time.time()
 
-        columns = ", ".join(f"{c}" for c in common_cols)
+    # Get the structure of the PostgreSQL table
+    with conn_pg.cursor() as pg_cur:
+        try:
+            pg_cols, pg_types = get_pg_columns(pg_cur, cfg.pg_schema, table)
+        except RuntimeError as e:
+            logger.warning(str(e))
+            if journal:
+                save_table_checkpoint(conn_pg, cfg, table, None, 0, completed=True)
+            return None
+
+    # Get the columns from MariaDB and keep only the common columns
+    with conn_maria.cursor() as ma_cur:
+        maria_cols = get_mariadb_columns(ma_cur, table)
+
+    # Intersection: columns present in both databases
+    common_cols = []
+    common_types = []
+    for i, col in enumerate(pg_cols):
+        if col in maria_cols:
+            common_cols.append(col)
+            common_types.append(pg_types[i])
+
+    if not common_cols:
+        logger.warning(f"No common columns between PostgreSQL and MariaDB for table {table}")
+        if journal:
+            save_table_checkpoint(conn_pg, cfg, table, None, 0, completed=True)
+        return None
+
+    if len(common_cols) < len(pg_cols):
+        missing = set(pg_cols) - set(common_cols)
+        logger.info(f"Table {table}: {len(missing)} columns missing in MariaDB: {missing}")
+
+    columns = ", ".join(f"{c}" for c in common_cols)
+
+    # Resolve per-column converters once for the whole table
+    convert_rows = compile_row_converter(
+        common_cols, common_types, normalize=(table == "apprentice")
+    )
+
+    # Rows that cleanup would delete are not extracted at all
+    row_filter = extraction_filter(table)
+    where, params = row_filter
+    if where:
+        logger.info(f"{table}: extraction filtered by EXTRACTION_FILTERS")
+
+    # Incremental mode: only extract the rows changed since the last sync
+    mark_column = watermark_column(table, common_cols) if is_incremental(cfg) else None
+    if mark_column:
+        mark = get_watermark(conn_pg, cfg, table, mark_column)
+        if mark is not None:
+            where, params = combine_predicates(row_filter, delta_predicate(mark_column, mark))
+            logger.info(f"{table}: extracting rows with {mark_column} since {mark}")
+
+    # Only an ordered keyset walk can restart after its last loaded key
+    key = CONFLICT_KEYS.get(table)
+    keyset = (
+        getattr(cfg, "extract_method", "keyset") == "keyset"
+        and key in common_cols
+        and table_size > cfg.batch_size
+    )
+    key_index = common_cols.index(key) if keyset else 0
+
+    # Adaptive strategy according to the size of the table
+    inserted = 0
+    processed_count = 0
+    checkpointed = 0
+    error_message = None
+    loader = None
+    table_stats: Optional[Dict[str, Any]] = None
+    # Seconds spent reading MariaDB, converting rows and writing PostgreSQL
+    extract_s = convert_s = load_s = 0.0
+
+    try:
+        if mark_column and mode != "dry-run":
+            # Only the mark stored by this load may be promoted by sync
+            clear_pending_watermark(conn_pg, cfg, table)
+        if checkpoint is not None and mode != "dry-run":
+            resumable = prepare_resumed_table(
+                conn_pg, target_schema, table, key if keyset else None, checkpoint
+            )
+            if resumable:
+                where, params = combine_predicates(
+                    (where, params), (f"{key} > %s", (checkpoint.last_key,))
+                )
+                inserted = processed_count = checkpointed = checkpoint.rows_loaded
+                logger.info(
+                    f"{table}: resuming after {key} {checkpoint.last_key} "
+                    f"({checkpoint.rows_loaded} rows already loaded)"
+                )
+            else:
+                logger.info(f"{table}: reloading from the start")
 
-        # Adaptive strategy according to the size of the table
-        inserted = 0
-        processed_count = 0
-        error_message = None
+        if mode != "dry-run":
+            loader = make_loader(conn_pg, cfg, target_schema, table, common_cols)
 
-        try:
-            # For small tables (less rows than batch_size), a single query
-            if table_size <= cfg.batch_size:
-                with conn_maria.cursor() as ma_cur:
+        # For small tables (less rows than batch_size), a single query
+        if table_size <= cfg.batch_size:
+            tick = time.perf_counter()
+            with conn_maria.cursor() as ma_cur:
+                if where:
+                    ma_execute(ma_cur, f"SELECT {columns} FROM {table} WHERE {where}", params)
+                else:
                     ma_execute(ma_cur, f"SELECT {columns} FROM {table}")
+                if m := get_mariadb_metrics():
+                    query_count = m.total_queries
+                rows = ma_cur.fetchall()
+            extract_s += time.perf_counter() - tick
+
+            tick = time.perf_counter()
+            processed_batch = convert_rows(rows)
+            convert_s += time.perf_counter() - tick
+
+            if loader and processed_batch:
+                tick = time.perf_counter()
+                loader.write(processed_batch)
+                load_s += time.perf_counter() - tick
+                inserted += len(processed_batch)
+                processed_count += len(processed_batch)
+            else:
+                logger.info(
+                    f"DRY-RUN: would insert {len(processed_batch)} rows into {table}"
+                )
+                processed_count = len(processed_batch)
+
+        # For large tables, use pagination
+        else:
+            # Calculate an optimal batch size to minimize queries
+            adaptive_batch_size = min(10000, max(cfg.batch_size, table_size // 10))
+
+            batches = iter_table_batches(
+                conn_maria, cfg, table, common_cols, adaptive_batch_size, table_size,
+                where, params,
+            )
+            # closing() releases a server-side cursor if the load fails mid-stream
+            with closing(batches):
+                tick = time.perf_counter()
+                for rows in batches:
+                    extract_s += time.perf_counter() - tick
                     if m := get_mariadb_metrics():
                         query_count = m.total_queries
-                    rows = ma_cur.fetchall()
-
-                processed_batch = []
-                for rec in rows:
-                    d = {
-                        common_cols[i]: convert_value(rec[i], common_types[i])
-                        for i in range(len(common_cols))
-                    }
-                    if table == "apprentice":
-                        d = normalize_names(d)
-                    processed_batch.append(tuple(d[c] for c in common_cols))
-
-                if mode != "dry-run" and processed_batch:
-                    sql = f"INSERT INTO {target_schema}.{table} ({columns}) VALUES %s;"
-                    with transaction(conn_pg) as tx:
-                        execute_values(tx, sql, processed_batch)
-                    inserted += len(processed_batch)
-                    processed_count += len(processed_batch)
-                else:
-                    logger.info(
-                        f"DRY-RUN: would insert {len(processed_batch)} rows into {table}"
-                    )
-                    processed_count = len(processed_batch)
 
-            # For large tables, use pagination
-            else:
-                # Calculate an optimal batch size to minimize queries
-                adaptive_batch_size = min(10000, max(cfg.batch_size, table_size // 10))
-
-                offset = 0
-                while offset < table_size:
-                    with conn_maria.cursor() as ma_cur:
-                        ma_execute(
-                            ma_cur,
-                            f"SELECT {columns} FROM {table} LIMIT %s OFFSET %s",
-                            (adaptive_batch_size, offset),
-                        )
-                        if m := get_mariadb_metrics():
-                            query_count = m.total_queries
-                        rows = ma_cur.fetchall()
-
-                    if not rows:
-                        break
-
-                    processed_batch = []
-                    for rec in rows:
-                        d = {
-                            common_cols[i]: convert_value(rec[i], common_types[i])
-                            for i in range(len(common_cols))
-                        }
-                        if table == "apprentice":
-                            d = normalize_names(d)
-                        processed_batch.append(tuple(d[c] for c in common_cols))
-
-                    if mode != "dry-run" and processed_batch:
-                        sql = f"INSERT INTO {target_schema}.{table} ({columns}) VALUES %s;"
-                        for i in range(0, len(processed_batch), cfg.batch_size):
-                            sub_batch = processed_batch[i : i + cfg.batch_size]
-                            with transaction(conn_pg) as tx:
-                                execute_values(tx, sql, sub_batch)
-                            inserted += len(sub_batch)
+                    tick = time.perf_counter()
+                    processed_batch = convert_rows(rows)
+                    convert_s += time.perf_counter() - tick
+
+                    if loader and processed_batch:
+                        tick = time.perf_counter()
+                        loader.write(processed_batch)
+                        load_s += time.perf_counter() - tick
+                        inserted += len(processed_batch)
                     else:
                         logger.info(
                             f"DRY-RUN: would insert {len(processed_batch)} rows from batch"
                         )
 
                     processed_count += len(processed_batch)
-                    offset += adaptive_batch_size
                     logger.info(
                         f"Processed {processed_count}/{table_size} rows from {table} (queries: {query_count})"
                     )
 
-            # Final count
+                    # Commit the rows, then record the key they reached
+                    if journal and loader and keyset and inserted - checkpointed >= CHECKPOINT_ROWS:
+                        tick = time.perf_counter()
+                        loader.commit()
+                        load_s += time.perf_counter() - tick
+                        save_table_checkpoint(conn_pg, cfg, table, rows[-1][key_index], inserted)
+                        checkpointed = inserted
+                    tick = time.perf_counter()
+
+        if loader:
+            tick = time.perf_counter()
+            loader.finish()
+            load_s += time.perf_counter() - tick
+            loader = None
+
+            if mark_column:
+                store_pending_watermark(conn_pg, cfg, table, mark_column, target_schema)
+            if mark_column or (is_incremental(cfg) and table in PRUNED_TABLES - PROTECTED_TABLES):
+                # Pruned tables are reloaded in full: their delta keys still let
+                # sync delete the staging rows deleted in MariaDB
+                record_delta_keys(conn_maria, conn_pg, cfg, table, *row_filter)
+
+            if journal:
+                save_table_checkpoint(conn_pg, cfg, table, None, inserted, completed=True)
+
+        # Final count
+        with conn_pg.cursor() as pg_cur:
+            pg_cur.execute(f"SELECT COUNT(*) FROM {target_schema}.{table}")
+            final = pg_cur.fetchone()[0]  # type: ignore
+
+        duration = time.time() - start
+        table_stats = {
+            "processed": processed_count,
+            "inserted": inserted,
+            "final": final,
+            "time_s": round(duration, 2),
+            "extract_s": round(extract_s, 3),
+            "convert_s": round(convert_s, 3),
+            "load_s": round(load_s, 3),
+            "rows_per_s": round(processed_count / duration, 1) if duration > 0 else 0.0,
+        }
+
+        logger.info(
+            f"{table}: {inserted}/{processed_count} rows inserted in {duration:.2f}s"
+        )
+
+        # Log migration details
+        if mode != "dry-run":
             with conn_pg.cursor() as pg_cur:
-                pg_cur.execute(f"SELECT COUNT(*) FROM {target_schema}.{table}")
-                final = pg_cur.fetchone()[0]  # type: ignore
-
-            duration = time.time() - start
-            stats[table] = {
-                "processed": processed_count,
-                "inserted": inserted,
-                "final": final,
-                "time_s": round(duration, 2),
-            }
-
-            logger.info(
-                f"{table}: {inserted}/{processed_count} rows inserted in {duration:.2f}s"
-            )
-
-            # Log migration details
-            if mode != "dry-run":
-                with conn_pg.cursor() as pg_cur:
-                    pg_cur.execute(
-                        f"""
-                        INSERT INTO {cfg.pg_schema}.migration_table_log (
-                            migration_name, table_name, processed, inserted, skipped,
-                            final_count, duration_seconds, success, error
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                        (
-                            "run_migration",
-                            table,
-                            processed_count,
-                            inserted,
-                            processed_count - inserted,
-                            final,
-                            round(duration, 2),
-                            error_message is None,
-                            error_message,
-                        ),
-                    )
-                    conn_pg.commit()
+                pg_cur.execute(
+                    f"""
+                    INSERT INTO {cfg.pg_schema}.migration_table_log (
+                        migration_name, table_name, processed, inserted, skipped,
+                        final_count, duration_seconds, success, error
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                    (
+                        "run_migration",
+                        table,
+                        processed_count,
+                        inserted,
+                        processed_count - inserted,
+                        final,
+                        round(duration, 2),
+                        error_message is None,
+                        error_message,
+                    ),
+                )
+                conn_pg.commit()
+
+    except Exception as e:
+        error_message = str(e)
+        logger.exception(f"Error during migration of table {table}: {e}")
+        if loader:
+            loader.abort()
+
+    return table_stats
+
+
+def _migrate_tables_parallel(
+    cfg: Config,
+    tables: Sequence[str],
+    table_sizes: Dict[str, int],
+    target_schema: str,
+    mode: str,
+    workers: int,
+    checkpoints: Optional[Dict[str, Checkpoint]] = None,
+    journal: bool = False,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """! @brief Migrates tables concurrently on a thread pool.
+
+    Each worker opens its own MariaDB and PostgreSQL connections (the latter
+    come from the shared ThreadedConnectionPool when USE_PG_POOL is set).
+    A table is only submitted once every table it depends on in
+    MIGRATION_DEPENDENCIES has finished; among ready tables the largest are
+    started first so the longest loads do not end up last.
+
+    @param cfg Configuration containing connection settings.
+    @param tables Tables to migrate, in TABLE_ORDER order.
+    @param table_sizes Row count of each table in MariaDB.
+    @param target_schema Schema receiving the rows.
+    @param mode Execution mode ('dry-run' or 'live').
+    @param workers Number of tables migrated at the same time.
+    @param checkpoints Journal entries of the interrupted table loads to resume.
+    @param journal True to record the progress in the checkpoint journal.
+    @return Statistics by table (None for skipped or failed tables).
+    @raises ValueError If the dependency graph contains a cycle.
+    """
+    logger = logging.getLogger("migration")
 
+    def _worker(table: str) -> Optional[Dict[str, Any]]:
+        try:
+            with mariadb_connection(cfg) as conn_maria, postgres_connection(cfg) as conn_pg:
+                return _migrate_table(
+                    conn_maria, conn_pg, cfg, table, table_sizes[table], target_schema,
+                    mode, checkpoints.get(table), journal,
+                )
         except Exception as e:
-            error_message = str(e)
+            # Opening the worker connections failed (or the pool is exhausted):
+            # the table fails alone, as an error inside _migrate_table would
             logger.exception(f"Error during migration of table {table}: {e}")
+            return None
+
+    checkpoints = checkpoints or {}
+    # Only dependencies that are part of this run can hold a table back
+    deps = {
+        t: {d for d in MIGRATION_DEPENDENCIES.get(t, ()) if d in tables}
+        for t in tables
+    }
+    remaining = sorted(tables, key=lambda t: table_sizes[t], reverse=True)
+    done: set = set()
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    logger.info(f"Migrating {len(tables)} tables with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as executor:
+        running: Dict[Future, str] = {}
+        while remaining or running:
+            for table in [t for t in remaining if deps[t] <= done]:
+                if len(running) >= workers:
+                    break
+                remaining.remove(table)
+                running[executor.submit(_worker, table)] = table
+
+            if not running:
+                raise ValueError(
+                    f"Circular migration dependencies between: {', '.join(remaining)}"
+                )
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                # A failed table is logged by _worker or _migrate_table and does
+                # not block its dependents, as in the sequential loop
+                done.add(table)
+                results[table] = future.result()
+
+    return results
+
+
+def run_migration(
+    conn_maria: pymysql.connections.Connection,
+    conn_pg: psycopg2.extensions.connection,
+    cfg: Config,
+    tables: Sequence[str],
+    mode: str,
+    checkpoints: Optional[Dict[str, Checkpoint]] = None,
+    journal: bool = False,
+) -> Dict[str, Any]:
+    """! @brief Executes the data migration from MariaDB to PostgreSQL.
+    @param conn_maria Active MariaDB connection.
+    @param conn_pg Active PostgreSQL connection.
+    @param cfg Configuration containing schema names and the number of workers.
+    @param tables List of tables to migrate.
+    @param mode Execution mode ('dry-run' or 'live').
+    @param checkpoints Journal entries of a resumed run: completed tables are
+           skipped, interrupted ones continue after their last key.
+    @param journal True to record the progress in the checkpoint journal.
+    @return Dictionary containing migration statistics by table.
+    @note With MIGRATION_WORKERS > 1 the tables are migrated concurrently on
+          dedicated connections; conn_maria is then only used to count rows.
+    """
+    logger = logging.getLogger("migration")
+    stats: Dict[str, Any] = {}
+
+    # Use the temporary schema for insertion
+    target_schema = cfg.temp_schema if mode != "dry-run" else cfg.pg_schema
 
-    logger.info(f"Migration completed using {query_count} MariaDB queries")
+    if mode != "dry-run" and is_incremental(cfg):
+        ensure_watermark_table(conn_pg, cfg)
+
+    # 1. Get the size of all tables in a single connection
+    table_sizes = {}
+    with conn_maria.cursor() as ma_cur:
+        for table in TABLE_ORDER:
+            if table not in tables:
+                continue
+            ma_execute(ma_cur, f"SELECT COUNT(*) FROM {table}")
+            table_sizes[table] = ma_cur.fetchone()[0]
+
+    checkpoints = checkpoints or {}
+    pending = []
+    for table in TABLE_ORDER:
+        if table not in tables or table not in table_sizes:
+            logger.info(f"Skip missing table {table}")
+        elif table in checkpoints and checkpoints[table].completed:
+            logger.info(f"Skip {table}: loaded by the interrupted run")
+        elif table_sizes[table] == 0:
+            logger.info(f"No data in {table}")
+            if journal:
+                save_table_checkpoint(conn_pg, cfg, table, None, 0, completed=True)
+        else:
+            pending.append(table)
+
+    # 2. Migrate the tables, one at a time or on a worker pool
+    workers = min(cfg.migration_workers, len(pending))
+    if cfg.use_pg_pool:
+        # Keep one pooled connection for the caller's own connection
+        workers = min(workers, cfg.pg_pool_max - 1)
+
+    if workers > 1:
+        results = _migrate_tables_parallel(
+            cfg, pending, table_sizes, target_schema, mode, workers, checkpoints, journal
+        )
+    else:
+        results = {
+            table: _migrate_table(
+                conn_maria, conn_pg, cfg, table, table_sizes[table], target_schema, mode,
+                checkpoints.get(table), journal,
+            )
+            for table in pending
+        }
+
+    # Report statistics in TABLE_ORDER whatever the completion order
+    for table in pending:
+        if results.get(table) is not None:
+            stats[table] = results[table]
+
+    m = get_mariadb_metrics()
+    logger.info(
+        f"Migration completed using {m.total_queries if m else 0} MariaDB queries"
+    )
     return stats
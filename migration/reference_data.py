@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""! @file reference_data.py
+@brief In-memory code -> id dictionaries of the enrichment reference tables.
+@author Marie Challet
+@organization Formasup Auvergne
+
+The company enrichment resolves INSEE commune, NAF, legal category and IDCC
+codes to the ids of the small and rarely changing city, naf, company_type and
+idcc tables. ReferenceData loads them once, so no lookup query is sent per
+company, and reloads a table only when its row count or its latest
+updated_at changes.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import psycopg2  # type: ignore
+
+from config import Config
+
+# Reference tables of the enrichment, all keyed by their 'code' column
+REFERENCE_TABLES = ("city", "naf", "company_type", "idcc")
+
+# Main INSEE code of Paris and its arrondissement codes (75101-75120)
+PARIS_CODE = "75056"
+PARIS_ARRONDISSEMENTS = tuple(f"751{n:02d}" for n in range(1, 21))
+
+
+class ReferenceData:
+    """! @brief Code -> id dictionaries of the reference tables.
+
+    Dictionaries are replaced as a whole on reload, so API worker threads can
+    read them while the main thread refreshes them.
+    """
+
+    def __init__(self, conn_pg: psycopg2.extensions.connection, cfg: Config):
+        """! @brief Loads every reference table.
+        @param conn_pg Active PostgreSQL connection (used by the calling thread only).
+        @param cfg Configuration with schema information.
+        """
+        self.conn_pg = conn_pg
+        self.cfg = cfg
+        self.ids: Dict[str, Dict[str, int]] = {table: {} for table in REFERENCE_TABLES}
+        self._signatures: Dict[str, Optional[Tuple]] = {}
+        self._has_updated_at: Dict[str, bool] = {}
+        self.refresh()
+
+    def _signature(self, cur, table: str) -> Tuple:
+        """! @brief Returns (row count, latest updated_at) of a reference table."""
+        if table not in self._has_updated_at:
+            cur.execute(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = %s AND table_name = %s AND column_name = 'updated_at'",
+                (self.cfg.pg_schema, table),
+            )
+            self._has_updated_at[table] = cur.fetchone() is not None
+        latest = "MAX(updated_at)::text" if self._has_updated_at[table] else "NULL"
+        cur.execute(f"SELECT COUNT(*), {latest} FROM {self.cfg.pg_schema}.{table}")
+        return tuple(cur.fetchone())
+
+    def _load(self, cur, table: str) -> Dict[str, int]:
+        """! @brief Reads the code -> id mapping of a table (lowest id wins on duplicates)."""
+        cur.execute(
+            f"SELECT code, id FROM {self.cfg.pg_schema}.{table} "
+            "WHERE code IS NOT NULL ORDER BY id"
+        )
+        mapping: Dict[str, int] = {}
+        for code, row_id in cur.fetchall():
+            mapping.setdefault(str(code).strip(), row_id)
+        if table == "city" and PARIS_CODE in mapping:
+            # The API returns arrondissement codes, staging only knows Paris
+            for code in PARIS_ARRONDISSEMENTS:
+                mapping.setdefault(code, mapping[PARIS_CODE])
+        return mapping
+
+    def refresh(self) -> int:
+        """! @brief Reloads the tables whose row count or latest updated_at changed.
+        @return Number of tables reloaded.
+        @note A table that cannot be read keeps its previous mapping.
+        """
+        logger = logging.getLogger("migration")
+        reloaded = 0
+        for table in REFERENCE_TABLES:
+            try:
+                with self.conn_pg.cursor() as cur:
+                    signature = self._signature(cur, table)
+                    if signature == self._signatures.get(table):
+                        continue
+                    self.ids[table] = self._load(cur, table)
+                self._signatures[table] = signature
+                reloaded += 1
+                logger.debug(f"Reference table {table} loaded: {len(self.ids[table])} codes")
+            except Exception as e:
+                self.conn_pg.rollback()
+                logger.error(f"Error while loading reference table {table}: {e}")
+        return reloaded
+
+    def lookup(self, table: str, code: Optional[str]) -> Optional[int]:
+        """! @brief Resolves a code to the id of a reference table.
+        @param table One of REFERENCE_TABLES.
+        @param code Code returned by the API.
+        @return The id, or None if the code is empty or unknown.
+        """
+        if not code:
+            return None
+        return self.ids[table].get(str(code).strip())
+
+    def city_id(self, commune: Optional[str]) -> Optional[int]:
+        """! @brief Resolves an INSEE commune code (Paris arrondissements included)."""
+        return self.lookup("city", commune)
+
+    def naf_id(self, naf_code: Optional[str]) -> Optional[int]:
+        """! @brief Resolves a NAF code."""
+        return self.lookup("naf", naf_code)
+
+    def type_id(self, type_code: Optional[str]) -> Optional[int]:
+        """! @brief Resolves a company type (legal category) code."""
+        return self.lookup("company_type", type_code)
+
+    def idcc_id(self, idcc_code: Optional[str]) -> Optional[int]:
+        """! @brief Resolves an IDCC code."""
+        return self.lookup("idcc", idcc_code)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""! @file run_report.py
+@brief End-to-end profiling report of a migration cycle.
+@author Marie Challet
+@organization Formasup Auvergne
+
+run_migration_cycle opens a RunReport that collects:
+- the wall time of each phase (migrate, index, cleanup, sync, enrich, analyze),
+  plus the extract / convert / load seconds summed over the migrated tables;
+- the rows and rows per second of each table;
+- the MariaDB query counts (MariaDBMetrics) and the PostgreSQL statement
+  timings recorded by database.TimedCursor (PostgresMetrics);
+- the HTTP counters and latency percentiles of the RateLimitedAPI clients.
+
+At the end of the cycle, successful or not, the report is written as JSON in
+RUN_REPORT_DIR and stored in {pg_schema}.migration_run_metrics, so nightly
+runs can be compared. Query parameters are never part of the report.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from config import Config
+from database import get_mariadb_metrics, get_postgres_metrics, postgres_connection, transaction
+
+METRICS_TABLE = "migration_run_metrics"
+
+# JSON reports kept in RUN_REPORT_DIR (about two months of nightly runs)
+RUN_REPORTS_KEPT = 60
+
+# Per-table timings summed into the extract / convert / load phases
+TABLE_PHASES = ("extract", "convert", "load")
+
+
+class RunReport:
+    """! @brief Timings and counters of one migration cycle."""
+
+    def __init__(self, step: str, mode: str, dry_run: bool = False, clock=time.perf_counter):
+        """! @brief Starts the report.
+        @param step Step of the cycle (migrate, cleanup, sync or full).
+        @param mode Migration mode (full or incremental).
+        @param dry_run True for a dry run (the report is then not stored in PostgreSQL).
+        @param clock Monotonic clock, replaceable in tests.
+        """
+        self.step = step
+        self.mode = mode
+        self.dry_run = dry_run
+        self.success = False
+        self.error: Optional[str] = None
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.phases: Dict[str, float] = {}
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.api: Dict[str, Dict[str, Any]] = {}
+        self._clock = clock
+        self._start = clock()
+        self._duration: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """! @brief Measures the wall time of a phase (added up if it runs several times).
+        @param name Phase name.
+        """
+        start = self._clock()
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            logging.getLogger("migration").info(f"Phase {name} took {elapsed:.2f}s")
+
+    def add_tables(self, stats: Dict[str, Dict[str, Any]]) -> None:
+        """! @brief Records the statistics returned by run_migration.
+        @param stats Statistics by table (processed rows and timings).
+        """
+        for table, table_stats in stats.items():
+            self.tables[table] = {
+                "rows": table_stats.get("processed", 0),
+                "time_s": table_stats.get("time_s", 0.0),
+                "rows_per_s": table_stats.get("rows_per_s", 0.0),
+                **{f"{p}_s": table_stats.get(f"{p}_s", 0.0) for p in TABLE_PHASES},
+            }
+
+    def add_api_metrics(self, name: str, snapshot: Dict[str, Any]) -> None:
+        """! @brief Records the counters of an API client.
+        @param name Client name (e.g. 'company').
+        @param snapshot Result of ApiMetrics.snapshot().
+        """
+        self.api[name] = snapshot
+
+    def finish(self, success: bool, error: Optional[str] = None) -> None:
+        """! @brief Stops the clock.
+        @param success True if the cycle completed.
+        @param error Error message of a failed cycle.
+        """
+        self.success = success
+        self.error = error
+        self.finished_at = datetime.now()
+        self._duration = self._clock() - self._start
+
+    def as_dict(self) -> Dict[str, Any]:
+        """! @brief Returns the report as a JSON-serializable dictionary."""
+        duration = self._duration if self._duration is not None else self._clock() - self._start
+        report: Dict[str, Any] = {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": (self.finished_at or datetime.now()).isoformat(timespec="seconds"),
+            "step": self.step,
+            "mode": self.mode,
+            "dry_run": self.dry_run,
+            "success": self.success,
+            "error": self.error,
+            "duration_s": round(duration, 2),
+            "phases_s": {name: round(seconds, 2) for name, seconds in self.phases.items()},
+            # Summed over tables: exceeds the migrate wall time with several workers
+            "table_phases_s": {
+                p: round(sum(t[f"{p}_s"] for t in self.tables.values()), 2) for p in TABLE_PHASES
+            },
+            "rows_total": sum(t["rows"] for t in self.tables.values()),
+            "tables": self.tables,
+            "api": self.api,
+        }
+        # Slow queries are left to the DB metrics log: their parameters may hold personal data
+        if maria := get_mariadb_metrics():
+            summary = maria.summary()
+            summary.pop("slow_queries", None)
+            report["mariadb"] = summary
+        if pg := get_postgres_metrics():
+            summary = pg.summary()
+            summary.pop("slow_queries", None)
+            summary["top_statements"] = pg.top_statements()
+            report["postgres"] = summary
+        return report
+
+    def write_json(self, directory: str) -> Path:
+        """! @brief Writes the report file and removes the oldest ones.
+        @param directory Directory of the reports (created if needed).
+        @return Path of the written file.
+        """
+        folder = Path(directory)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"run_{self.started_at:%Y%m%d_%H%M%S}.json"
+        path.write_text(json.dumps(self.as_dict(), indent=2), encoding="utf-8")
+        for old in sorted(folder.glob("run_*.json"))[:-RUN_REPORTS_KEPT]:
+            old.unlink()
+        return path
+
+    def store(self, conn_pg, cfg: Config) -> None:
+        """! @brief Inserts the report into {pg_schema}.migration_run_metrics.
+        @param conn_pg Active PostgreSQL connection.
+        @param cfg Configuration containing the schema.
+        """
+        report = self.as_dict()
+        with transaction(conn_pg) as cur:
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {cfg.pg_schema}.{METRICS_TABLE} (
+                    id BIGSERIAL PRIMARY KEY,
+                    started_at TIMESTAMP NOT NULL,
+                    finished_at TIMESTAMP NOT NULL,
+                    step VARCHAR(16) NOT NULL,
+                    mode VARCHAR(16) NOT NULL,
+                    success BOOLEAN NOT NULL,
+                    duration_s NUMERIC(12, 2) NOT NULL,
+                    rows_total BIGINT NOT NULL,
+                    phases JSONB NOT NULL,
+                    report JSONB NOT NULL
+                )
+                """
+            )
+            cur.execute(
+                f"""
+                INSERT INTO {cfg.pg_schema}.{METRICS_TABLE} (
+                    started_at, finished_at, step, mode, success,
+                    duration_s, rows_total, phases, report
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    report["started_at"],
+                    report["finished_at"],
+                    self.step,
+                    self.mode,
+                    self.success,
+                    report["duration_s"],
+                    report["rows_total"],
+                    json.dumps({**report["phases_s"], **report["table_phases_s"]}),
+                    json.dumps(report),
+                ),
+            )
+
+
+_active_report: Optional[RunReport] = None
+
+
+def start_run_report(step: str, mode: str, dry_run: bool = False) -> RunReport:
+    """! @brief Starts the report of a new cycle and makes it the active one.
+    @return The new report.
+    """
+    global _active_report
+    _active_report = RunReport(step, mode, dry_run)
+    return _active_report
+
+
+def get_run_report() -> Optional[RunReport]:
+    """! @brief Gets the report of the running cycle.
+    @return The active RunReport, or None outside of a cycle.
+    """
+    return _active_report
+
+
+def finish_run_report(report: RunReport, cfg: Config, success: bool, error: Optional[str] = None) -> None:
+    """! @brief Ends a report, writes its JSON file and stores it in PostgreSQL.
+
+    Errors are logged and never raised, so a failed cycle is still reported
+    and reporting cannot fail a cycle. Dry runs are only written as JSON.
+
+    @param report Report of the cycle.
+    @param cfg Configuration with the report directory and schema.
+    @param success True if the cycle completed.
+    @param error Error message of a failed cycle.
+    """
+    global _active_report
+    logger = logging.getLogger("migration")
+    report.finish(success, error)
+    if _active_report is report:
+        _active_report = None
+
+    try:
+        path = report.write_json(cfg.run_report_dir)
+        logger.info(f"Run report written to {path}")
+    except OSError as e:
+        logger.error(f"Error while writing the run report: {e}")
+
+    if report.dry_run:
+        return
+    try:
+        # Own connection: the cycle may have failed on a lost connection
+        with postgres_connection(cfg) as conn_pg:
+            report.store(conn_pg, cfg)
+    except Exception as e:
+        logger.error(f"Error while storing the run report: {e}")
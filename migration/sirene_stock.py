@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""! @file sirene_stock.py
+@brief Local SIRENE establishment stock used before the company search API.
+@author Marie Challet
+@organization Formasup Auvergne
+
+The SIRET correction checks up to 14 Luhn-valid candidates per invalid SIRET,
+and searches companies by name and city when none exists. With a SIRENE
+establishment stock export (StockEtablissement CSV, optionally joined with
+the legal unit name), these checks run locally:
+- the stock is filtered to our departements and written once to an index
+  directory: a sorted array of SIRETs (unsigned 64-bit integers), the
+  establishment records and their offsets, all memory-mapped when opened;
+- company names are normalized with _normalize_company_name and stored in an
+  inverted index (word -> record numbers) for name + city searches;
+- the index is rebuilt only when the stock file or the departements change.
+
+A SIRET missing from a departement-filtered stock may exist elsewhere, so
+absence is only conclusive for companies located in the covered departements
+(see SireneStock.covers); the API remains the fallback otherwise.
+"""
+
+import bisect
+import csv
+import json
+import logging
+import mmap
+import os
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import Config, parse_departements
+from siret_correction import _normalize_city_name, _normalize_company_name
+
+# Bumped when the layout of the index files changes
+INDEX_VERSION = 1
+
+SIRETS_FILE = "sirets.u64"
+OFFSETS_FILE = "offsets.u64"
+RECORDS_FILE = "records.tsv"
+NAMES_FILE = "names.json"
+META_FILE = "meta.json"
+
+# Stock columns, the first non-empty name column wins
+NAME_COLUMNS = (
+    "denominationUniteLegale",
+    "denominationUsuelleEtablissement",
+    "enseigne1Etablissement",
+)
+RECORD_FIELDS = ("name", "city_code", "city", "postal_code", "code_naf", "etat", "is_siege")
+
+# Names words shorter than this are not indexed (same rule as the API match score)
+MIN_WORD_LENGTH = 3
+
+
+def _clean(value: Optional[str]) -> str:
+    return " ".join((value or "").replace("\t", " ").split())
+
+
+def _in_departements(code: str, departements: Sequence[str]) -> bool:
+    """! @brief Tells whether an INSEE commune or postal code belongs to the departements."""
+    return not departements or any(code.startswith(dep) for dep in departements)
+
+
+def _name_words(name: str) -> List[str]:
+    return [w for w in _normalize_company_name(name).split() if len(w) >= MIN_WORD_LENGTH]
+
+
+def iter_stock_rows(path: str, departements: Sequence[str] = ()) -> Iterator[Tuple[int, Tuple[str, ...]]]:
+    """! @brief Streams the establishments of a SIRENE stock CSV file.
+    @param path CSV export of the establishment stock (',' or ';' separated).
+    @param departements Departement codes to keep, empty for all.
+    @return Iterator of (SIRET as integer, record fields in RECORD_FIELDS order).
+    @raises ValueError If the file is a Parquet file or has no 'siret' column.
+    """
+    if path.lower().endswith(".parquet"):
+        raise ValueError("Parquet stock files are not supported, export the stock to CSV")
+    with open(path, encoding="utf-8", newline="") as f:
+        header = f.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        columns = next(csv.reader([header], delimiter=delimiter))
+        if "siret" not in columns:
+            raise ValueError(f"{path} has no 'siret' column")
+        for row in csv.DictReader(f, fieldnames=columns, delimiter=delimiter):
+            siret = (row.get("siret") or "").strip()
+            if len(siret) != 14 or not siret.isdigit():
+                continue
+            city_code = (row.get("codeCommuneEtablissement") or "").strip()
+            postal_code = (row.get("codePostalEtablissement") or "").strip()
+            if not _in_departements(city_code or postal_code, departements):
+                continue
+            name = next((row[c] for c in NAME_COLUMNS if (row.get(c) or "").strip()), "")
+            siege = (row.get("etablissementSiege") or "").strip().lower()
+            yield int(siret), (
+                _clean(name),
+                city_code,
+                _clean(row.get("libelleCommuneEtablissement")),
+                postal_code,
+                _clean(row.get("activitePrincipaleEtablissement")),
+                (row.get("etatAdministratifEtablissement") or "").strip().upper(),
+                "1" if siege in ("true", "1", "o", "oui") else "0",
+            )
+
+
+def _source_signature(source: str, departements: Sequence[str]) -> Dict[str, Any]:
+    stat = os.stat(source)
+    return {
+        "version": INDEX_VERSION,
+        "source": os.path.abspath(source),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "departements": list(departements),
+    }
+
+
+def build_index(source: str, index_dir: str, departements: Sequence[str] = ()) -> int:
+    """! @brief Writes the index files of a SIRENE stock CSV file.
+    @param source CSV export of the establishment stock.
+    @param index_dir Directory receiving the index files (created if needed).
+    @param departements Departement codes to keep, empty for all.
+    @return Number of establishments indexed.
+    @note Files are written under temporary names and renamed, the metadata
+          file last, so an interrupted build is rebuilt on the next run.
+    """
+    logger = logging.getLogger("migration")
+    rows = sorted(iter_stock_rows(source, departements))
+    directory = Path(index_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    sirets = array("Q")
+    offsets = array("Q", [0])
+    names: Dict[str, List[int]] = {}
+    previous = None
+    with open(directory / f"{RECORDS_FILE}.tmp", "wb") as records:
+        for siret, fields in rows:
+            if siret == previous:
+                continue
+            previous = siret
+            for word in set(_name_words(fields[0])):
+                names.setdefault(word, []).append(len(sirets))
+            sirets.append(siret)
+            records.write(("\t".join(fields) + "\n").encode("utf-8"))
+            offsets.append(records.tell())
+    with open(directory / f"{SIRETS_FILE}.tmp", "wb") as f:
+        sirets.tofile(f)
+    with open(directory / f"{OFFSETS_FILE}.tmp", "wb") as f:
+        offsets.tofile(f)
+    with open(directory / f"{NAMES_FILE}.tmp", "w", encoding="utf-8") as f:
+        json.dump(names, f, separators=(",", ":"))
+    for name in (RECORDS_FILE, SIRETS_FILE, OFFSETS_FILE, NAMES_FILE):
+        os.replace(directory / f"{name}.tmp", directory / name)
+
+    meta = _source_signature(source, departements)
+    meta["count"] = len(sirets)
+    with open(directory / f"{META_FILE}.tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(directory / f"{META_FILE}.tmp", directory / META_FILE)
+
+    logger.info(f"SIRENE stock indexed: {len(sirets)} establishments, {len(names)} name words")
+    return len(sirets)
+
+
+def _map(path: Path) -> Optional[mmap.mmap]:
+    """! @brief Memory-maps a file read-only, None if it is empty."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SireneStock:
+    """! @brief Read-only view of an index written by build_index.
+
+    Lookups read the memory-mapped files, so they are safe from several
+    threads; the name index is loaded on the first search.
+    """
+
+    def __init__(self, index_dir: str):
+        """! @brief Opens the index files of a directory.
+        @param index_dir Directory written by build_index.
+        """
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / META_FILE, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.departements = tuple(self.meta.get("departements", ()))
+        self._maps = [_map(self.index_dir / name) for name in (SIRETS_FILE, OFFSETS_FILE, RECORDS_FILE)]
+        sirets_map, offsets_map, self._records = self._maps
+        self._sirets = memoryview(sirets_map).cast("Q") if sirets_map else ()
+        self._offsets = memoryview(offsets_map).cast("Q") if offsets_map else ()
+        self._names: Optional[Dict[str, List[int]]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, source: str, index_dir: str, departements: Sequence[str] = ()) -> "SireneStock":
+        """! @brief Opens the index of a stock file, (re)building it when it is missing or stale.
+        @param source CSV export of the establishment stock.
+        @param index_dir Directory of the index files.
+        @param departements Departement codes to keep, empty for all.
+        @return Opened stock.
+        """
+        meta_path = Path(index_dir) / META_FILE
+        expected = _source_signature(source, departements)
+        current = None
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                current = json.load(f)
+            current.pop("count", None)
+        if current != expected:
+            logging.getLogger("migration").info(f"Building SIRENE stock index in {index_dir}")
+            build_index(source, index_dir, departements)
+        return cls(index_dir)
+
+    def __len__(self) -> int:
+        return len(self._sirets)
+
+    def close(self) -> None:
+        """! @brief Releases the memory maps."""
+        if isinstance(self._sirets, memoryview):
+            self._sirets.release()
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._sirets = self._offsets = ()
+        for mapped in self._maps:
+            if mapped is not None:
+                mapped.close()
+        self._maps = []
+
+    def _record(self, position: int) -> Dict[str, Any]:
+        raw = self._records[self._offsets[position]:self._offsets[position + 1] - 1]
+        record: Dict[str, Any] = dict(zip(RECORD_FIELDS, raw.decode("utf-8").split("\t")))
+        record["siret"] = f"{self._sirets[position]:014d}"
+        record["is_siege"] = record["is_siege"] == "1"
+        return record
+
+    def find(self, siret: str) -> Optional[Dict[str, Any]]:
+        """! @brief Looks a SIRET up by binary search.
+        @param siret SIRET to look up.
+        @return Establishment record (siret, name, city_code, city, postal_code,
+                code_naf, etat, is_siege), or None if it is not in the stock.
+        """
+        if len(siret) != 14 or not siret.isdigit():
+            return None
+        value = int(siret)
+        position = bisect.bisect_left(self._sirets, value)
+        if position < len(self._sirets) and self._sirets[position] == value:
+            return self._record(position)
+        return None
+
+    def covers(self, city_code: Optional[str]) -> bool:
+        """! @brief Tells whether a SIRET missing from the stock can be considered nonexistent.
+        @param city_code INSEE code of the company city, if known.
+        @return True if the stock is not filtered or the city is in one of its departements.
+        """
+        if not self.departements:
+            return True
+        return bool(city_code) and _in_departements(city_code, self.departements)
+
+    def _name_index(self) -> Dict[str, List[int]]:
+        with self._lock:
+            if self._names is None:
+                with open(self.index_dir / NAMES_FILE, encoding="utf-8") as f:
+                    self._names = json.load(f)
+            return self._names
+
+    def search(self, name: str, city: Optional[str] = None, limit: int = 25) -> List[Dict[str, Any]]:
+        """! @brief Searches establishments sharing words of a company name, in a city.
+        @param name Company name, normalized like the API match score.
+        @param city City name; when given, only establishments of that city are returned.
+        @param limit Maximum number of results.
+        @return Records with the most common name words first, then head offices,
+                in the format of search_company_by_name_and_city.
+        """
+        words = set(_name_words(name))
+        if not words:
+            return []
+        index = self._name_index()
+        shared: Dict[int, int] = {}
+        for word in words:
+            for position in index.get(word, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        wanted_city = _normalize_city_name(city) if city else ""
+        matches = []
+        for position, count in shared.items():
+            record = self._record(position)
+            if wanted_city and _normalize_city_name(record["city"]) != wanted_city:
+                continue
+            matches.append((-count, not record["is_siege"], record["siret"], record))
+        matches.sort(key=lambda m: m[:3])
+        return [
+            {
+                "siret": record["siret"],
+                "name": record["name"],
+                "city": record["city"],
+                "postal_code": record["postal_code"],
+                "is_siege": record["is_siege"],
+            }
+            for *_, record in matches[:limit]
+        ]
+
+
+def load_sirene_stock(cfg: Config) -> Optional[SireneStock]:
+    """! @brief Opens the SIRENE stock configured by SIRENE_STOCK_FILE.
+    @param cfg Configuration with the stock file, index directory and departements.
+    @return Opened stock, or None if none is configured or it cannot be read
+            (the API is then used for every check).
+    """
+    if not cfg.sirene_stock_file:
+        return None
+    logger = logging.getLogger("migration")
+    try:
+        stock = SireneStock.open(
+            cfg.sirene_stock_file,
+            cfg.sirene_index_dir,
+            parse_departements(cfg.sirene_departements),
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"SIRENE stock unavailable, using the API only: {e}")
+        return None
+    logger.info(f"SIRENE stock loaded: {len(stock)} establishments")
+    return stock
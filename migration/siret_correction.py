@@ -11,14 +11,24 @@ This module provides functions to correct invalid SIRETs by:
 """
 
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 
 import pymysql  # type: ignore
 
 from api_client import RateLimitedAPI
 from database import ma_execute
 
+if TYPE_CHECKING:
+    from sirene_stock import SireneStock
+
+# SIRETs per MariaDB lookup query of the batch corrector
+MARIADB_LOOKUP_CHUNK = 500
+# Name + city match score from which a candidate is accepted without
+# validating the remaining candidates of the same SIRET
+STRONG_MATCH_SCORE = 3
+
 
 def is_valid_luhn(number: str) -> bool:
     """! @brief Checks if a number complies with the Luhn algorithm (modulo 10).
@@ -50,42 +60,43 @@ def hamming_distance(s1: str, s2: str) -> int:
     return sum(c1 != c2 for c1, c2 in zip(s1, s2))
 
 
+# Luhn contribution of each digit, for a position kept as is (0) or doubled (1)
+_LUHN_CONTRIBUTION = (
+    tuple(range(10)),
+    tuple(d * 2 - 9 if d > 4 else d * 2 for d in range(10)),
+)
+# Digit giving a contribution (both tables are permutations of 0-9)
+_LUHN_DIGIT = tuple({c: d for d, c in enumerate(table)} for table in _LUHN_CONTRIBUTION)
+
+
 def generate_luhn_valid_candidates(siret: str, max_distance: int = 1) -> List[str]:
     """! @brief Generates all Luhn-valid SIRET candidates within a given Hamming distance.
 
-    Optimized for distance=1 only (fastest option, ~140 candidates per SIRET).
+    Works on distance 1 only. The Luhn sum of the SIRET is computed once from
+    the digit contribution table; for each position, exactly one digit brings
+    the sum back to a multiple of 10, so it is read from the inverse table
+    instead of trying the 9 other digits (at most 14 candidates, no string is
+    checked with is_valid_luhn).
 
     @param siret Invalid SIRET to correct.
     @param max_distance Maximum Hamming distance from the original (default: 1, max: 1).
-    @return List of Luhn-valid SIRET candidates.
+    @return List of Luhn-valid SIRET candidates, by position.
     """
     if not siret or len(siret) != 14 or not siret.isdigit():
         return []
 
+    size = len(siret)
+    parities = [(size - 1 - pos) % 2 for pos in range(size)]
+    contributions = [_LUHN_CONTRIBUTION[p][int(d)] for p, d in zip(parities, siret)]
+    total = sum(contributions)
+
     candidates = []
-    siret_list = list(siret)
-
-    # Generate candidates at distance 1 (single digit changes)
-    # ~14 * 9 = ~126 candidates per SIRET (fast!)
-    for pos in range(14):
-        original_digit = siret_list[pos]
-        for digit in "0123456789":
-            if digit != original_digit:
-                siret_list[pos] = digit
-                candidate = "".join(siret_list)
-                if is_valid_luhn(candidate):
-                    candidates.append(candidate)
-        siret_list[pos] = original_digit
-
-    # Remove duplicates while preserving order
-    seen = set()
-    result = []
-    for candidate in candidates:
-        if candidate not in seen:
-            seen.add(candidate)
-            result.append(candidate)
-
-    return result
+    for pos, (parity, current) in enumerate(zip(parities, contributions)):
+        # Contribution this position needs for the sum to end with 0
+        digit = _LUHN_DIGIT[parity][(current - total) % 10]
+        if digit != int(siret[pos]):
+            candidates.append(f"{siret[:pos]}{digit}{siret[pos + 1:]}")
+    return candidates
 
 
 def get_company_city_from_mariadb(
@@ -184,22 +195,82 @@ def get_company_info_from_mariadb(
         return {}
 
 
+def get_companies_info_from_mariadb(
+    conn_maria: pymysql.connections.Connection,
+    sirets: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """! @brief Retrieves company information from MariaDB for many SIRETs at once.
+
+    Batch variant of get_company_info_from_mariadb: one WHERE siret IN (...)
+    query per MARIADB_LOOKUP_CHUNK SIRETs. A company_official row is preferred
+    over other rows of the same SIRET, rows without a name are ignored.
+
+    @param conn_maria Active MariaDB connection.
+    @param sirets SIRETs to search for.
+    @return Dictionary SIRET -> company information (name, city_code, city_name);
+            SIRETs without information are absent.
+    """
+    logger = logging.getLogger("migration")
+    unique = list(dict.fromkeys(sirets))
+    infos: Dict[str, Dict[str, Any]] = {}
+    official: Set[str] = set()
+
+    try:
+        with conn_maria.cursor() as cur:
+            for offset in range(0, len(unique), MARIADB_LOOKUP_CHUNK):
+                chunk = unique[offset:offset + MARIADB_LOOKUP_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                ma_execute(cur, f"""
+                    SELECT company.siret, company.name, city.code, city.name,
+                           company.discr LIKE 'company_official%%'
+                    FROM company
+                    LEFT JOIN city ON company.address_city_id = city.id
+                    WHERE company.siret IN ({placeholders})
+                """, tuple(chunk))
+                for siret, name, city_code, city_name, is_official in cur.fetchall():
+                    if not name or siret in official:
+                        continue
+                    if is_official or siret not in infos:
+                        infos[siret] = {
+                            "name": name,
+                            "city_code": city_code,
+                            "city_name": city_name
+                        }
+                    if is_official:
+                        official.add(siret)
+    except Exception as e:
+        logger.error(f"Error retrieving company info for {len(unique)} SIRETs: {e}", exc_info=True)
+
+    logger.info(f"MariaDB info found for {len(infos)}/{len(unique)} invalid SIRETs")
+    return infos
+
+
 def search_company_by_name_and_city(
     name: str,
     city: str,
     postal_code: Optional[str],
-    api_client: RateLimitedAPI
+    api_client: RateLimitedAPI,
+    stock: Optional["SireneStock"] = None
 ) -> List[Dict[str, Any]]:
     """! @brief Searches for companies by name and city using the French government API.
 
+    When a local SIRENE stock is given, its name index is searched first and
+    the API is only called if it finds nothing.
+
     @param name Company name to search for.
     @param city City name.
     @param postal_code Optional postal code for filtering.
     @param api_client API client with rate limiting.
+    @param stock Optional local SIRENE stock (see sirene_stock.py).
     @return List of matching companies with their SIRETs.
     """
     logger = logging.getLogger("migration")
 
+    if stock is not None and name:
+        local_results = stock.search(name, city)
+        if local_results:
+            return local_results
+
     # Build search query with company name and city
     search_terms = []
     if name:
@@ -298,22 +369,99 @@ def _normalize_company_name(name: str) -> str:
     return normalized
 
 
+def _is_closed(etat: Optional[str]) -> bool:
+    """! @brief Tells whether an administrative state means a closed establishment."""
+    return bool(etat) and etat.lower() in ["f", "fermé", "closed", "ferme"]
+
+
+def _validation_result(
+    siret: str,
+    name: Optional[str],
+    city_code: Optional[str],
+    city_name: Optional[str],
+    code_naf: Optional[str],
+    expected_name: Optional[str],
+    expected_city_code: Optional[str]
+) -> Dict[str, Any]:
+    """! @brief Builds the validation result of an existing SIRET with its match scores.
+    @param siret Validated SIRET.
+    @param name Company name of the SIRET.
+    @param city_code INSEE code of the establishment city.
+    @param city_name Establishment city name.
+    @param code_naf Main activity code.
+    @param expected_name Expected company name (optional).
+    @param expected_city_code Expected city INSEE code (optional).
+    @return Result in the format of validate_siret_with_api.
+    """
+    # Calculate match scores for ranking
+    name_match_score = 0
+    city_match_score = 0
+
+    # Check name match
+    if expected_name and name:
+        expected_normalized = _normalize_company_name(expected_name)
+        actual_normalized = _normalize_company_name(name)
+
+        if expected_normalized and actual_normalized:
+            expected_words = set(expected_normalized.split())
+            actual_words = set(actual_normalized.split())
+            common_words = expected_words & actual_words
+            significant_common = [w for w in common_words if len(w) > 2]
+            name_match_score = len(significant_common)
+
+    # Check city match using INSEE code
+    if expected_city_code and city_code:
+        if expected_city_code == city_code:
+            city_match_score = 2  # Exact INSEE code match
+
+    return {
+        "siret": siret,
+        "name": name,
+        "city": city_name,
+        "city_code": city_code,
+        "expected_name": expected_name,
+        "expected_city_code": expected_city_code,
+        "code_naf": code_naf,
+        "name_match_score": name_match_score,
+        "city_match_score": city_match_score,
+        "is_valid": True
+    }
+
+
 def validate_siret_with_api(
     siret: str,
     expected_name: Optional[str],
     expected_city_code: Optional[str],
-    api_client: RateLimitedAPI
+    api_client: RateLimitedAPI,
+    stock: Optional["SireneStock"] = None
 ) -> Optional[Dict[str, Any]]:
     """! @brief Validates a SIRET candidate against the French government API.
 
+    When a local SIRENE stock is given, the SIRET is looked up there first;
+    the API is only called if the stock cannot tell (SIRET missing from a
+    stock that does not cover the expected city).
+
     @param siret SIRET candidate to validate.
     @param expected_name Expected company name for filtering (optional).
     @param expected_city_code Expected city INSEE code for filtering (optional).
     @param api_client API client with rate limiting.
+    @param stock Optional local SIRENE stock (see sirene_stock.py).
     @return Company data if SIRET exists, None otherwise.
     """
     logger = logging.getLogger("migration")
 
+    if stock is not None:
+        record = stock.find(siret)
+        if record is not None:
+            if _is_closed(record["etat"]):
+                return None
+            return _validation_result(
+                siret, record["name"], record["city_code"], record["city"],
+                record["code_naf"], expected_name, expected_city_code
+            )
+        if stock.covers(expected_city_code):
+            return None
+
     url = "https://recherche-entreprises.api.gouv.fr/search"
     params = {
         "q": siret,
@@ -338,7 +486,7 @@ def validate_siret_with_api(
 
         # Filter out closed establishments
         etat = etablissement.get("etat_administratif", "")
-        if etat and etat.lower() in ["f", "fermé", "closed", "ferme"]:
+        if _is_closed(etat):
             logger.debug(f"SIRET {siret} is closed (etat_administratif: {etat})")
             return None
 
@@ -346,45 +494,15 @@ def validate_siret_with_api(
         # API field mapping:
         #   - commune = INSEE code (e.g., "63338")
         #   - libelle_commune = city name (e.g., "SAINT-ELOY-LES-MINES")
-        api_city_code = etablissement.get("commune", "")  # INSEE code
-        api_city_name = etablissement.get("libelle_commune", "")  # City name
-
-        # Get company name
-        api_name = result.get("nom_raison_sociale") or result.get("nom_complet")
-
-        # Calculate match scores for ranking
-        name_match_score = 0
-        city_match_score = 0
-
-        # Check name match
-        if expected_name and api_name:
-            expected_normalized = _normalize_company_name(expected_name)
-            actual_normalized = _normalize_company_name(api_name)
-
-            if expected_normalized and actual_normalized:
-                expected_words = set(expected_normalized.split())
-                actual_words = set(actual_normalized.split())
-                common_words = expected_words & actual_words
-                significant_common = [w for w in common_words if len(w) > 2]
-                name_match_score = len(significant_common)
-
-        # Check city match using INSEE code
-        if expected_city_code and api_city_code:
-            if expected_city_code == api_city_code:
-                city_match_score = 2  # Exact INSEE code match
-
-        return {
-            "siret": siret,
-            "name": api_name,
-            "city": api_city_name,
-            "city_code": api_city_code,
-            "expected_name": expected_name,
-            "expected_city_code": expected_city_code,
-            "code_naf": result.get("activite_principale"),
-            "name_match_score": name_match_score,
-            "city_match_score": city_match_score,
-            "is_valid": True
-        }
+        return _validation_result(
+            siret,
+            result.get("nom_raison_sociale") or result.get("nom_complet"),
+            etablissement.get("commune", ""),  # INSEE code
+            etablissement.get("libelle_commune", ""),  # City name
+            result.get("activite_principale"),
+            expected_name,
+            expected_city_code
+        )
 
     except Exception as e:
         logger.debug(f"Error validating SIRET {siret}: {e}")
@@ -423,23 +541,174 @@ def _normalize_city_name(name: str) -> str:
     return normalized
 
 
+def _candidate_match(
+    invalid_siret: str,
+    candidate: str,
+    result: Dict[str, Any],
+    company_info: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """! @brief Builds the correction entry of a candidate confirmed by the API.
+    @param invalid_siret The invalid SIRET being corrected.
+    @param candidate Candidate SIRET.
+    @param result Result of validate_siret_with_api for the candidate.
+    @param company_info MariaDB information of the invalid SIRET.
+    @return Correction entry, or None if the candidate length differs.
+    """
+    try:
+        distance = hamming_distance(invalid_siret, candidate)
+    except ValueError:
+        return None
+
+    return {
+        "original_siret": invalid_siret,
+        "corrected_siret": candidate,
+        "hamming_distance": distance,
+        "company_name": result.get("name"),
+        "expected_name": company_info.get("name"),
+        "city": result.get("city"),
+        "city_code": result.get("city_code"),
+        "expected_city": company_info.get("city_name"),
+        "expected_city_code": company_info.get("city_code"),
+        "name_match_score": result.get("name_match_score", 0),
+        "city_match_score": result.get("city_match_score", 0),
+        "method": "hamming_distance"
+    }
+
+
+def _match_score(candidate: Dict[str, Any]) -> int:
+    """! @brief Returns the name + city match score of a correction entry."""
+    return candidate["name_match_score"] + candidate["city_match_score"]
+
+
+def _rank_candidates(
+    invalid_siret: str,
+    valid_candidates: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """! @brief Ranks the confirmed candidates of a SIRET and returns the best one.
+    @param invalid_siret The invalid SIRET being corrected.
+    @param valid_candidates Non-empty list of correction entries.
+    @return Best entry, with 'all_candidates' and 'needs_manual_review' set.
+    """
+    logger = logging.getLogger("migration")
+
+    # Sort by: match score (name + city), then distance, then SIRET
+    valid_candidates.sort(
+        key=lambda x: (
+            -_match_score(x),  # Higher score first
+            x["hamming_distance"],  # Lower distance first
+            x["corrected_siret"]  # Deterministic
+        )
+    )
+
+    best = valid_candidates[0]
+    best_score = _match_score(best)
+
+    # Filter out low-quality candidates when a good match exists
+    # Keep only candidates with score > 0 or within 1 point of best score
+    if best_score >= STRONG_MATCH_SCORE:
+        # Strong match: filter out candidates with no name/city match
+        filtered_candidates = [c for c in valid_candidates if _match_score(c) > 0]
+    else:
+        # Weak match: keep all for manual review
+        filtered_candidates = valid_candidates
+
+    # Use filtered list if it still has candidates
+    if filtered_candidates:
+        valid_candidates = filtered_candidates
+
+    logger.info(
+        f"Found {len(valid_candidates)} correction(s) for {invalid_siret}: "
+        f"best={best['corrected_siret']} (distance={best['hamming_distance']}, "
+        f"name='{best.get('company_name')}', city='{best.get('city')}')"
+    )
+
+    # Determine if manual review is needed:
+    # - Not needed if best has high confidence (score >= 3) and is clearly better
+    # - Needed if multiple candidates with similar scores
+    needs_review = False
+    if len(valid_candidates) > 1:
+        second_score = _match_score(valid_candidates[1])
+        # Review needed only if second candidate is competitive (within 1 point)
+        needs_review = (best_score < STRONG_MATCH_SCORE) or (second_score >= best_score - 1)
+
+    # Return best candidate with all alternatives
+    best["all_candidates"] = valid_candidates
+    best["needs_manual_review"] = needs_review
+    return best
+
+
+def _search_correction(
+    invalid_siret: str,
+    company_info: Dict[str, Any],
+    api_client: RateLimitedAPI,
+    max_distance: int,
+    stock: Optional["SireneStock"] = None
+) -> Optional[Dict[str, Any]]:
+    """! @brief Looks for a correction by company name and city (fallback strategy).
+    @param invalid_siret The invalid SIRET being corrected.
+    @param company_info MariaDB information of the invalid SIRET.
+    @param api_client API client with rate limiting.
+    @param max_distance Maximum Hamming distance of the Luhn candidates.
+    @param stock Optional local SIRENE stock searched before the API.
+    @return Correction entry, or None if no close SIRET was found.
+    """
+    logger = logging.getLogger("migration")
+    company_name = company_info.get("name")
+    city_name = company_info.get("city_name")
+    if not (company_name and city_name):
+        return None
+
+    logger.info(f"Trying API search by name and city for {invalid_siret}")
+    search_results = search_company_by_name_and_city(
+        company_name, city_name, company_info.get("postal_code"), api_client, stock
+    )
+
+    for result in search_results:
+        candidate_siret = result.get("siret")
+        if candidate_siret and is_valid_luhn(candidate_siret):
+            # Calculate distance to see if it's close to original
+            try:
+                if len(candidate_siret) == 14:
+                    distance = hamming_distance(invalid_siret, candidate_siret)
+                    if distance <= max_distance + 2:  # Allow slightly larger distance for name search
+                        logger.info(
+                            f"Found correction via name search for {invalid_siret}: {candidate_siret} "
+                            f"(distance={distance}, name='{result.get('name')}')"
+                        )
+                        return {
+                            "original_siret": invalid_siret,
+                            "corrected_siret": candidate_siret,
+                            "hamming_distance": distance,
+                            "company_name": result.get("name"),
+                            "city": result.get("city"),
+                            "method": "name_city_search"
+                        }
+            except ValueError:
+                continue
+    return None
+
+
 def correct_invalid_siret(
     invalid_siret: str,
     conn_maria: pymysql.connections.Connection,
     api_client: RateLimitedAPI,
     max_distance: int = 1,
-    max_candidates: int = 5
+    max_candidates: int = 5,
+    stock: Optional["SireneStock"] = None
 ) -> Optional[Dict[str, Any]]:
     """! @brief Attempts to correct an invalid SIRET using Hamming distance and API validation.
 
     Returns multiple correction candidates ranked by match quality.
-    Uses parallel API requests for speed.
+    Uses parallel API requests for speed. To correct many SIRETs, use
+    correct_invalid_sirets_batch, which shares one lookup query and one
+    worker pool between them.
 
     @param invalid_siret The invalid SIRET to correct.
     @param conn_maria Active MariaDB connection.
     @param api_client API client with rate limiting.
     @param max_distance Maximum Hamming distance for candidates (default: 1 for speed).
     @param max_candidates Maximum number of candidates to return (default: 5).
+    @param stock Optional local SIRENE stock checked before the API.
     @return Dictionary with correction info and all candidates, None if none found.
     """
     logger = logging.getLogger("migration")
@@ -454,13 +723,12 @@ def correct_invalid_siret(
     logger.debug(f"Complete company_info dict for {invalid_siret}: {company_info}")
 
     city_code = company_info.get("city_code")  # INSEE code
-    city_name = company_info.get("city_name")
     company_name = company_info.get("name")
-    postal_code = company_info.get("postal_code")
 
     logger.info(
         f"MariaDB info for {invalid_siret}: name='{company_name}', "
-        f"city='{city_name}' (INSEE: {city_code}), postal_code='{postal_code}'"
+        f"city='{company_info.get('city_name')}' (INSEE: {city_code}), "
+        f"postal_code='{company_info.get('postal_code')}'"
     )
 
     # Strategy 1: Generate Luhn-valid candidates and validate with API in parallel
@@ -472,27 +740,9 @@ def correct_invalid_siret(
 
     def validate_candidate(candidate: str) -> Optional[Dict[str, Any]]:
         """Validate a single candidate and return extended info if valid."""
-        result = validate_siret_with_api(candidate, company_name, city_code, api_client)
+        result = validate_siret_with_api(candidate, company_name, city_code, api_client, stock)
         if result:
-            try:
-                distance = hamming_distance(invalid_siret, candidate)
-            except ValueError:
-                return None
-
-            return {
-                "original_siret": invalid_siret,
-                "corrected_siret": candidate,
-                "hamming_distance": distance,
-                "company_name": result.get("name"),
-                "expected_name": company_name,
-                "city": result.get("city"),
-                "city_code": result.get("city_code"),
-                "expected_city": city_name,
-                "expected_city_code": city_code,
-                "name_match_score": result.get("name_match_score", 0),
-                "city_match_score": result.get("city_match_score", 0),
-                "method": "hamming_distance"
-            }
+            return _candidate_match(invalid_siret, candidate, result, company_info)
         return None
 
     # Use ThreadPoolExecutor for parallel API requests (4 threads, safe with rate limiting)
@@ -519,86 +769,12 @@ def correct_invalid_siret(
 
     # If we have candidates, rank them and return all
     if valid_candidates:
-        # Sort by: match score (name + city), then distance, then SIRET
-        valid_candidates.sort(
-            key=lambda x: (
-                -(x["name_match_score"] + x["city_match_score"]),  # Higher score first
-                x["hamming_distance"],  # Lower distance first
-                x["corrected_siret"]  # Deterministic
-            )
-        )
-
-        best = valid_candidates[0]
-        best_score = best["name_match_score"] + best["city_match_score"]
-
-        # Filter out low-quality candidates when a good match exists
-        # Keep only candidates with score > 0 or within 1 point of best score
-        if best_score >= 3:
-            # Strong match: filter out candidates with no name/city match
-            filtered_candidates = [
-                c for c in valid_candidates
-                if (c["name_match_score"] + c["city_match_score"]) > 0
-            ]
-        else:
-            # Weak match: keep all for manual review
-            filtered_candidates = valid_candidates
-
-        # Use filtered list if it still has candidates
-        if filtered_candidates:
-            valid_candidates = filtered_candidates
-
-        all_sirets = [c["corrected_siret"] for c in valid_candidates]  # noqa: F841
-
-        logger.info(
-            f"Found {len(valid_candidates)} correction(s) for {invalid_siret}: "
-            f"best={best['corrected_siret']} (distance={best['hamming_distance']}, "
-            f"name='{best.get('company_name')}', city='{best.get('city')}')"
-        )
-
-        # Determine if manual review is needed:
-        # - Not needed if best has high confidence (score >= 3) and is clearly better
-        # - Needed if multiple candidates with similar scores
-        needs_review = False
-        if len(valid_candidates) > 1:
-            second_score = valid_candidates[1]["name_match_score"] + valid_candidates[1]["city_match_score"]
-            # Review needed only if second candidate is competitive (within 1 point)
-            needs_review = (best_score < 3) or (second_score >= best_score - 1)
-
-        # Return best candidate with all alternatives
-        best["all_candidates"] = valid_candidates
-        best["needs_manual_review"] = needs_review
-
-        return best
+        return _rank_candidates(invalid_siret, valid_candidates)
 
     # Strategy 2: Search by company name and city if Hamming approach fails
-    if company_name and city_name:
-        logger.info(f"Trying API search by name and city for {invalid_siret}")
-        search_results = search_company_by_name_and_city(
-            company_name, city_name, postal_code, api_client
-        )
-
-        for result in search_results:
-            candidate_siret = result.get("siret")
-            if candidate_siret and is_valid_luhn(candidate_siret):
-                # Calculate distance to see if it's close to original
-                try:
-                    if len(candidate_siret) == 14:
-                        distance = hamming_distance(invalid_siret, candidate_siret)
-                        if distance <= max_distance + 2:  # Allow slightly larger distance for name search
-                            logger.info(
-                                f"Found correction via name search for {invalid_siret}: {candidate_siret} "
-                                f"(distance={distance}, name='{result.get('name')}')"
-                            )
-                            return {
-                                "original_siret": invalid_siret,
-                                "corrected_siret": candidate_siret,
-                                "hamming_distance": distance,
-                                "company_name": result.get("name"),
-                                "city": result.get("city"),
-                                "method": "name_city_search"
-                            }
-                except ValueError:
-                    continue
+    correction = _search_correction(invalid_siret, company_info, api_client, max_distance, stock)
+    if correction:
+        return correction
 
     logger.warning(f"No valid correction found for SIRET {invalid_siret}")
     return None
@@ -608,35 +784,100 @@ def correct_invalid_sirets_batch(
     invalid_sirets: List[str],
     conn_maria: pymysql.connections.Connection,
     api_client: RateLimitedAPI,
-    max_distance: int = 2
+    max_distance: int = 2,
+    workers: int = 4,
+    max_candidates: int = 5,
+    stock: Optional["SireneStock"] = None
 ) -> Tuple[List[Dict[str, Any]], List[str]]:
     """! @brief Attempts to correct a batch of invalid SIRETs.
 
+    The MariaDB information of all SIRETs is read with a few IN (...)
+    queries, then every (SIRET, candidate) pair is validated on one shared
+    pool of `workers` threads; the api_client keeps the API within its rate
+    limit. Once a SIRET has a strong match (score >= STRONG_MATCH_SCORE) or
+    max_candidates confirmed candidates, its remaining candidates are
+    skipped without calling the API. SIRETs without any confirmed candidate
+    fall back to the name + city search, on the same pool. With a local
+    SIRENE stock most checks are answered without any API call.
+
     @param invalid_sirets List of invalid SIRETs to correct.
     @param conn_maria Active MariaDB connection.
     @param api_client API client with rate limiting.
     @param max_distance Maximum Hamming distance for candidates.
+    @param workers Number of API validations in flight.
+    @param max_candidates Maximum number of candidates kept per SIRET.
+    @param stock Optional local SIRENE stock checked before the API.
     @return Tuple of (list of corrections, list of uncorrected SIRETs).
     """
     logger = logging.getLogger("migration")
     logger.info(f"=== Correcting {len(invalid_sirets)} invalid SIRETs ===")
 
-    corrections = []
-    uncorrected = []
-
-    for i, siret in enumerate(invalid_sirets):
-        logger.info(f"Processing {i + 1}/{len(invalid_sirets)}: {siret}")
+    sirets = list(dict.fromkeys(invalid_sirets))
+    infos = get_companies_info_from_mariadb(conn_maria, sirets) if conn_maria else {}
+    found: Dict[str, List[Dict[str, Any]]] = {siret: [] for siret in sirets}
+    # SIRETs whose remaining candidates no longer need to be validated
+    settled: Set[str] = set()
+    lock = threading.Lock()
+    searched: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def validate_candidate(siret: str, candidate: str) -> None:
+        if siret in settled:
+            return
+        info = infos.get(siret, {})
+        result = validate_siret_with_api(
+            candidate, info.get("name"), info.get("city_code"), api_client, stock
+        )
+        match = _candidate_match(siret, candidate, result, info) if result else None
+        if match is None:
+            return
+        with lock:
+            if siret in settled:
+                return
+            found[siret].append(match)
+            if _match_score(match) >= STRONG_MATCH_SCORE or len(found[siret]) >= max_candidates:
+                settled.add(siret)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="siret") as executor:
+        futures = [
+            executor.submit(validate_candidate, siret, candidate)
+            for siret in sirets
+            for candidate in generate_luhn_valid_candidates(siret, max_distance)[:max_candidates * 5]
+        ]
+        logger.info(f"Validating {len(futures)} Luhn-valid candidates with {workers} workers")
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.debug(f"Error validating SIRET candidate: {e}")
 
-        result = correct_invalid_siret(siret, conn_maria, api_client, max_distance)
+        # Strategy 2 for the SIRETs without any confirmed candidate
+        searches = {
+            executor.submit(
+                _search_correction, siret, infos.get(siret, {}), api_client, max_distance, stock
+            ): siret
+            for siret in sirets
+            if not found[siret]
+        }
+        for future in as_completed(searches):
+            try:
+                searched[searches[future]] = future.result()
+            except Exception as e:
+                logger.debug(f"Error searching SIRET correction: {e}")
 
-        if result:
-            corrections.append(result)
+    corrections = []
+    uncorrected = []
+    for siret in sirets:
+        if found[siret]:
+            corrections.append(_rank_candidates(siret, found[siret]))
+        elif searched.get(siret):
+            corrections.append(searched[siret])
         else:
             uncorrected.append(siret)
 
     # Log summary
     logger.info("=== SIRET Correction Summary ===")
-    logger.info(f"Total processed: {len(invalid_sirets)}")
+    logger.info(f"Total processed: {len(sirets)}")
     logger.info(f"Corrected: {len(corrections)}")
     logger.info(f"Uncorrected: {len(uncorrected)}")
 
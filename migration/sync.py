@@ -10,12 +10,13 @@ tables to the final production tables.
 
 import logging
 import time
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import psycopg2 # type: ignore
 
 from config import Config, CONFLICT_KEYS, TABLE_ORDER, PROTECTED_TABLES
 from database import get_pg_columns, transaction
+from incremental import commit_watermark, delta_keys_table, is_incremental
 
 
 def ensure_company_indexes(
@@ -25,7 +26,9 @@ def ensure_company_indexes(
 
     Creates indexes on SIRET plus foreign-key columns used in cleanup joins
     across both staging and temp schemas. This speeds up SIRET-based lookups
-    and the NOT EXISTS checks used for cleanup.
+    and the NOT EXISTS checks used for cleanup. Staging also gets an index on
+    the SIREN prefix (left(siret, 9)) used to find the replacement of a
+    corrected SIRET.
     """
     logger = logging.getLogger("migration")
     index_specs = [
@@ -33,9 +36,13 @@ def ensure_company_indexes(
         ("registration", "host_company_id", "idx_{schema}_registration_host_company_id"),
         ("billing", "company_id", "idx_{schema}_billing_company_id"),
     ]
+    staging_specs = [
+        ("company", "(left(siret, 9))", "idx_{schema}_company_siren"),
+    ]
 
     for schema in [cfg.pg_schema, cfg.temp_schema]:
-        for table, column, name_template in index_specs:
+        specs = index_specs + (staging_specs if schema == cfg.pg_schema else [])
+        for table, column, name_template in specs:
             try:
                 with transaction(conn_pg) as cur:
                     idx_name = name_template.format(schema=schema.replace(".", "_"))
@@ -175,6 +182,136 @@ def analyze_tables(
             logger.warning("Failed to ANALYZE %s.%s: %s", cfg.pg_schema, table, e)
 
 
+def range_checksums(
+    cur: psycopg2.extensions.cursor,
+    schema: str,
+    table: str,
+    key: str,
+    columns: List[str],
+    chunk_size: int,
+) -> Dict[int, Tuple[int, str]]:
+    """! @brief Computes a row count and a checksum for each primary-key range of a table.
+    @param cur Active PostgreSQL cursor.
+    @param schema Schema of the table.
+    @param table Name of the table.
+    @param key Integer primary key splitting the table into ranges.
+    @param columns Columns covered by the checksum, in a fixed order.
+    @param chunk_size Number of key values per range.
+    @return Dictionary range id (key / chunk_size) -> (row count, md5 of the range).
+    """
+    cur.execute(
+        f"""
+        SELECT {key} / {int(chunk_size)} AS range_id,
+               COUNT(*),
+               md5(string_agg(md5(ROW({", ".join(columns)})::text), '' ORDER BY {key}))
+        FROM {schema}.{table}
+        GROUP BY 1
+        """
+    )
+    return {range_id: (count, digest) for range_id, count, digest in cur.fetchall()}
+
+
+def changed_range_ids(
+    source: Dict[int, Tuple[int, str]], target: Dict[int, Tuple[int, str]]
+) -> List[int]:
+    """! @brief Lists the key ranges whose content differs between two tables.
+    @param source Range checksums of the temporary table.
+    @param target Range checksums of the main table.
+    @return Sorted ids of the ranges present on one side only or with different checksums.
+    """
+    return sorted(
+        range_id
+        for range_id in source.keys() | target.keys()
+        if source.get(range_id) != target.get(range_id)
+    )
+
+
+def ensure_update_log_timings(
+    conn_pg: psycopg2.extensions.connection, cfg: Config
+) -> None:
+    """! @brief Adds the per-phase timing columns to update_log if they are missing."""
+    logger = logging.getLogger("migration")
+    try:
+        with transaction(conn_pg) as cur:
+            cur.execute(
+                f"""
+                ALTER TABLE {cfg.pg_schema}.update_log
+                    ADD COLUMN IF NOT EXISTS diff_seconds NUMERIC,
+                    ADD COLUMN IF NOT EXISTS write_seconds NUMERIC
+                """
+            )
+    except Exception as e:
+        logger.warning("Could not add timing columns to update_log: %s", e)
+
+
+def merge_statement(
+    cfg: Config,
+    table: str,
+    key: str,
+    columns: List[str],
+    source_filter: str,
+    delete_filter: Optional[str],
+) -> str:
+    """! @brief Builds the statement synchronizing a table in a single pass.
+
+    The upsert and the delete run as data-modifying CTEs of one statement, so
+    they share one snapshot and one scan of each side. Inserted rows are told
+    apart from updated ones with RETURNING (xmax = 0).
+
+    @param cfg Configuration containing schema names.
+    @param table Name of the table.
+    @param key Primary key of the table.
+    @param columns Columns of the main table.
+    @param source_filter Condition on the temp rows to upsert (alias t), or ''.
+    @param delete_filter Condition on the main rows that may be deleted
+           (alias s), or None to never delete.
+    @return SQL returning one row (inserts, updates, deletes).
+    """
+    target = f"{cfg.pg_schema}.{table}"
+    source = f"{cfg.temp_schema}.{table}"
+    column_list = ", ".join(columns)
+    set_clause = ", ".join(f"{col} = excluded.{col}" for col in columns if col != key)
+
+    if "updated_at" in columns:
+        # Only overwrite with more recent data
+        conflict_where = f"{target}.updated_at < excluded.updated_at"
+    else:
+        # Compare columns one by one
+        conflict_where = " OR ".join(
+            f"{target}.{col} IS DISTINCT FROM excluded.{col}"
+            for col in columns
+            if col != key
+        )
+
+    source_where = f"WHERE {source_filter}" if source_filter else ""
+    deleted_cte = ""
+    deletes = "0"
+    if delete_filter is not None:
+        deleted_cte = f""",
+    deleted AS (
+        DELETE FROM {target} s
+        WHERE {delete_filter}
+          AND NOT EXISTS (SELECT 1 FROM {source} t WHERE t.{key} = s.{key})
+        RETURNING 1
+    )"""
+        deletes = "(SELECT COUNT(*) FROM deleted)"
+
+    return f"""
+    WITH upserted AS (
+        INSERT INTO {target} ({column_list})
+        SELECT {column_list} FROM {source} t {source_where}
+        ON CONFLICT ({key}) DO UPDATE SET
+            {set_clause}
+        WHERE {conflict_where}
+        RETURNING (xmax = 0) AS inserted
+    ){deleted_cte}
+    SELECT COUNT(*) FILTER (WHERE inserted),
+           COUNT(*) FILTER (WHERE NOT inserted),
+           {deletes}
+    FROM upserted
+    """
+
+
 def sync_company_sirets(
     conn_pg: psycopg2.extensions.connection, cfg: Config
 ) -> Dict[str, int]:
@@ -293,14 +430,24 @@ def sync_tables(
             - inserts: number of insertions performed
             - updates: number of updates performed
             - deletes: number of deletions performed
-    @note Insertions and updates are performed in a single operation
-          with INSERT ... ON CONFLICT.
+    @note Each table is split into primary-key ranges of SYNC_CHUNK_SIZE keys
+          whose checksums are compared on both sides; only the differing
+          ranges are upserted and purged, and the counts come from that diff.
+    @note Insertions, updates and deletions are performed by a single
+          statement per table (INSERT ... ON CONFLICT and a NOT EXISTS
+          anti-join DELETE in data-modifying CTEs); the counts come from
+          RETURNING (xmax = 0 marks an inserted row).
+    @note The checksum and write durations of each table are stored in
+          update_log (diff_seconds, write_seconds).
     @note For tables with "updated_at", the update is only performed if
           the temporary data is more recent.
     @note For tables that are not fundamental dimensions, records
           that no longer exist in the temporary tables are deleted
           from the main tables.
     @note Tables in PROTECTED_TABLES are skipped (reference data).
+    @note In incremental mode only the keys listed in <table>_delta_keys can
+          be deleted, and the high-water mark of each synchronized table is
+          committed.
     """
     logger = logging.getLogger("migration")
     logger.info(
@@ -312,6 +459,8 @@ def sync_tables(
         sync_company_sirets(conn_pg, cfg)
 
     stats: Dict[str, Dict[str, int]] = {}
+    incremental = is_incremental(cfg)
+    ensure_update_log_timings(conn_pg, cfg)
 
     for table in [t for t in TABLE_ORDER if t not in PROTECTED_TABLES]:
         if table not in tables:
@@ -320,6 +469,7 @@ def sync_tables(
         logger.info("Synchronizing %s...", table)
         stats[table] = {"inserts": 0, "updates": 0, "deletes": 0}
         start_time = time.time()
+        timings = {"diff_seconds": 0.0, "write_seconds": 0.0}
         success = True
         error_message = None
 
@@ -336,74 +486,74 @@ def sync_tables(
             with conn_pg.cursor() as cur:
                 pg_cols, _ = get_pg_columns(cur, cfg.pg_schema, table)
 
-            columns = ", ".join(pg_cols)
-            set_clause = ", ".join(
-                [f"{col} = excluded.{col}" for col in pg_cols if col != key]
-            )
-
-            # Count rows before synchronization
-            with conn_pg.cursor() as cur:
-                cur.execute(f"SELECT COUNT(*) FROM {cfg.pg_schema}.{table}")
-                count_before = cur.fetchone()[0]  # type: ignore
-
-            # 1. Insertion and update in a single operation with ON CONFLICT
-            if "updated_at" in pg_cols:
-                # For tables with updated_at
-                with transaction(conn_pg) as cur:
-                    cur.execute(f"""
-                    INSERT INTO {cfg.pg_schema}.{table} ({columns})
-                    SELECT {columns} FROM {cfg.temp_schema}.{table}
-                    ON CONFLICT ({key}) DO UPDATE SET
-                        {set_clause}
-                    WHERE {cfg.pg_schema}.{table}.updated_at < excluded.updated_at
-                    """)
-                    affected = cur.rowcount
+            chunk = int(cfg.sync_chunk_size)
+            # Dimension tables keep rows that disappeared from the source
+            can_delete = table not in ["degree_level"]
+
+            if incremental:
+                # The temp table only holds the delta: sync all of it, and only
+                # delete among the keys touched since the last run
+                delta_keys = delta_keys_table(conn_pg, cfg, table) if can_delete else None
+                source_filter = ""
+                delete_filter = (
+                    f"EXISTS (SELECT 1 FROM {delta_keys} k WHERE k.{key} = s.{key})"
+                    if delta_keys
+                    else None
+                )
+                params: Dict[str, Any] = {}
+                changed = True
             else:
-                # For tables without 'updated_at', compare columns one by one
-                where_clause = " OR ".join(
-                    [
-                        f"{cfg.pg_schema}.{table}.{col} IS DISTINCT FROM excluded.{col}"
-                        for col in pg_cols
-                        if col != key
-                    ]
+                # Compare key-range checksums and only touch the ranges that differ
+                with conn_pg.cursor() as cur:
+                    target_ranges = range_checksums(
+                        cur, cfg.pg_schema, table, key, pg_cols, chunk
+                    )
+                    source_ranges = range_checksums(
+                        cur, cfg.temp_schema, table, key, pg_cols, chunk
+                    )
+                changed_ranges = changed_range_ids(source_ranges, target_ranges)
+                count_before = sum(count for count, _ in target_ranges.values())
+                source_filter = f"t.{key} / {chunk} = ANY(%(ranges)s)"
+                delete_filter = (
+                    f"s.{key} / {chunk} = ANY(%(ranges)s)" if can_delete else None
+                )
+                params = {"ranges": changed_ranges}
+                changed = bool(changed_ranges)
+                logger.info(
+                    "%s: %d/%d key ranges differ",
+                    table,
+                    len(changed_ranges),
+                    len(set(source_ranges) | set(target_ranges)),
                 )
+            timings["diff_seconds"] = round(time.time() - start_time, 2)
 
+            # Upsert and anti-join delete in one statement, counted by RETURNING
+            if changed:
+                write_start = time.time()
                 with transaction(conn_pg) as cur:
-                    cur.execute(f"""
-                    INSERT INTO {cfg.pg_schema}.{table} ({columns})
-                    SELECT {columns} FROM {cfg.temp_schema}.{table}
-                    ON CONFLICT ({key}) DO UPDATE SET
-                        {set_clause}
-                    WHERE {where_clause}
-                    """)
-                    affected = cur.rowcount
-
-            # Count rows after to determine actual insertions
-            with conn_pg.cursor() as cur:
-                cur.execute(f"SELECT COUNT(*) FROM {cfg.pg_schema}.{table}")
-                count_after = cur.fetchone()[0]  # type: ignore
-
-            # Actual insertions are the difference between before and after
-            stats[table]["inserts"] = count_after - count_before
-            # Updates are the affected rows minus the insertions
-            stats[table]["updates"] = max(0, affected - stats[table]["inserts"])
-
-            # 2. Deletion of records that are no longer in the temporary table
-            # (only for tables that are not dimensions)
-            if table not in [
-                "degree_level",
-            ]:
-                with transaction(conn_pg) as cur:
-                    cur.execute(f"""
-                    DELETE FROM {cfg.pg_schema}.{table}
-                    WHERE {key} NOT IN (SELECT {key} FROM {cfg.temp_schema}.{table})
-                    """)
-                    stats[table]["deletes"] = cur.rowcount
-
-            # Get the final count of records in the table
-            with conn_pg.cursor() as cur:
-                cur.execute(f"SELECT COUNT(*) FROM {cfg.pg_schema}.{table}")
-                final_count = cur.fetchone()[0]  # type: ignore
+                    cur.execute(
+                        merge_statement(
+                            cfg, table, key, pg_cols, source_filter, delete_filter
+                        ),
+                        params,
+                    )
+                    (
+                        stats[table]["inserts"],
+                        stats[table]["updates"],
+                        stats[table]["deletes"],
+                    ) = cur.fetchone()  # type: ignore
+                timings["write_seconds"] = round(time.time() - write_start, 2)
+
+            # Final count of records in the table
+            if incremental:
+                with conn_pg.cursor() as cur:
+                    cur.execute(f"SELECT COUNT(*) FROM {cfg.pg_schema}.{table}")
+                    final_count = cur.fetchone()[0]  # type: ignore
+                commit_watermark(conn_pg, cfg, table)
+            else:
+                final_count = (
+                    count_before + stats[table]["inserts"] - stats[table]["deletes"]
+                )
 
             logger.info(
                 "Synchronization of %s finished: %d inserts/updates, %d deletes",
@@ -429,8 +579,9 @@ def sync_tables(
                     f"""
                 INSERT INTO {cfg.pg_schema}.update_log (
                     migration_name, table_name, inserted, updates, deletes,
-                    final_count, duration_seconds, success, error
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    final_count, duration_seconds, diff_seconds, write_seconds,
+                    success, error
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """,
                     (
                         "sync_tables",
@@ -440,6 +591,8 @@ def sync_tables(
                         stats[table]["deletes"],
                         final_count,
                         round(duration, 2),
+                        timings["diff_seconds"],
+                        timings["write_seconds"],
                         success,
                         error_message,
                     ),
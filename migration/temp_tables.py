@@ -6,14 +6,22 @@
 
 This module provides functions for creating and deleting the temporary schema
 and tables used during the migration process.
+
+With the default 'unlogged' profile the temporary tables are created UNLOGGED
+and without any index, so the bulk load writes neither WAL nor index entries;
+build_temp_indexes() then builds only the indexes used by cleanup and sync,
+in parallel, and refreshes the planner statistics.
 """
 
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
 
 import psycopg2
 
-from config import Config
-from database import transaction
+from config import CONFLICT_KEYS, TEMP_TABLE_INDEXES, Config
+from database import postgres_connection, transaction
 
 
 def create_temp_schema(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
@@ -41,12 +49,22 @@ def create_temp_tables(
     @param cfg Configuration containing the schema names.
     @param tables List of table names to create in the temporary schema.
     @note - First deletes the tables if they already exist.
-          - Creates tables with the same structure as the original tables.
+          - Creates tables with the same structure as the original tables:
+            UNLOGGED and without indexes or constraints with the 'unlogged'
+            profile, as an exact copy with the 'logged' profile.
           - Disables triggers to facilitate data import.
     @raises Exception In case of an error during table creation.
     """
     logger = logging.getLogger("migration")
-    logger.info("Creating temporary tables...")
+    logger.info("Creating temporary tables (profile=%s)...", cfg.temp_table_profile)
+    if cfg.temp_table_profile == "unlogged":
+        # Column defaults, identity and generated columns only: indexes are
+        # built after the load by build_temp_indexes()
+        kind = "UNLOGGED TABLE"
+        like = "INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED"
+    else:
+        kind = "TABLE"
+        like = "INCLUDING ALL"
 
     try:
         with transaction(conn_pg) as cur:
@@ -57,8 +75,8 @@ def create_temp_tables(
 
                 # Create the temporary table with the same structure as the main table
                 cur.execute(f"""
-                CREATE TABLE IF NOT EXISTS {cfg.temp_schema}.{table} (
-                    LIKE {cfg.pg_schema}.{table} INCLUDING ALL
+                CREATE {kind} IF NOT EXISTS {cfg.temp_schema}.{table} (
+                    LIKE {cfg.pg_schema}.{table} {like}
                 )
                 """)
 
@@ -75,6 +93,106 @@ def create_temp_tables(
         raise
 
 
+def temp_index_plan(tables: List[str]) -> List[Tuple[str, List[str]]]:
+    """! @brief Lists the columns to index on each temporary table.
+    @param tables Temporary tables of the run.
+    @return List of (table, columns): the conflict key first, then the
+            TEMP_TABLE_INDEXES columns of the table.
+    """
+    plan = []
+    for table in tables:
+        columns = [CONFLICT_KEYS[table]] if table in CONFLICT_KEYS else []
+        columns += [c for c in TEMP_TABLE_INDEXES.get(table, ()) if c not in columns]
+        if columns:
+            plan.append((table, columns))
+    return plan
+
+
+def _index_temp_table(cfg: Config, table: str, columns: List[str]) -> int:
+    """! @brief Builds the indexes of one temporary table and analyzes it.
+    @param cfg Configuration containing the schema names.
+    @param table Temporary table.
+    @param columns Columns to index, one btree index each.
+    @return Number of indexes built.
+    @note Runs on its own connection. maintenance_work_mem is only raised for
+          the transaction of each statement (SET LOCAL): a pooled connection
+          goes back to the pool with its default value.
+    @raises Exception If the connection or an index fails.
+    """
+    logger = logging.getLogger("migration")
+    work_mem = (cfg.temp_index_maintenance_work_mem.strip(),)
+    built = 0
+    with postgres_connection(cfg) as conn_pg:
+        for column in columns:
+            start = time.perf_counter()
+            with transaction(conn_pg) as cur:
+                cur.execute("SELECT set_config('maintenance_work_mem', %s, true)", work_mem)
+                cur.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{column}_idx "
+                    f"ON {cfg.temp_schema}.{table} ({column})"
+                )
+            built += 1
+            logger.info(
+                "Index %s.%s(%s) built in %.1fs",
+                cfg.temp_schema, table, column, time.perf_counter() - start,
+            )
+        with transaction(conn_pg) as cur:
+            cur.execute("SELECT set_config('maintenance_work_mem', %s, true)", work_mem)
+            cur.execute(f"ANALYZE {cfg.temp_schema}.{table}")
+    return built
+
+
+def build_temp_indexes(cfg: Config, tables: List[str]) -> int:
+    """! @brief Builds the indexes of the loaded temporary tables in parallel.
+    @param cfg Configuration containing the schema names and index settings.
+    @param tables Temporary tables of the run.
+    @return Number of indexes built.
+    @note Does nothing with the 'logged' profile, whose tables already carry
+          the indexes of the main tables. Each table is indexed and analyzed
+          by one of TEMP_INDEX_WORKERS workers, with a raised
+          maintenance_work_mem. With USE_PG_POOL the workers leave one pooled
+          connection to the caller.
+    @raises RuntimeError If a table could not be indexed: cleanup and sync
+            would run on unindexed tables.
+    """
+    logger = logging.getLogger("migration")
+    if cfg.temp_table_profile != "unlogged":
+        return 0
+    plan = temp_index_plan(tables)
+    if not plan:
+        return 0
+
+    start = time.perf_counter()
+    workers = min(cfg.temp_index_workers, len(plan))
+    if cfg.use_pg_pool:
+        # Keep one pooled connection for the caller's own connection
+        workers = min(workers, cfg.pg_pool_max - 1)
+    workers = max(1, workers)
+    logger.info(
+        "Building indexes of %d temporary tables with %d workers (maintenance_work_mem=%s)",
+        len(plan), workers, cfg.temp_index_maintenance_work_mem,
+    )
+    built = 0
+    failed: List[str] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index") as executor:
+        futures = {
+            executor.submit(_index_temp_table, cfg, table, columns): table
+            for table, columns in plan
+        }
+        for future in as_completed(futures):
+            try:
+                built += future.result()
+            except Exception as e:
+                logger.error("Error while indexing %s.%s: %s", cfg.temp_schema, futures[future], e)
+                failed.append(futures[future])
+    if failed:
+        raise RuntimeError(
+            f"Indexes of {cfg.temp_schema} tables not built: {', '.join(sorted(failed))}"
+        )
+    logger.info("%d temporary indexes built in %.1fs", built, time.perf_counter() - start)
+    return built
+
+
 def drop_temp_schema(conn_pg: psycopg2.extensions.connection, cfg: Config) -> None:
     """! @brief Deletes the temporary schema and all its tables.
     @param conn_pg Active PostgreSQL connection.
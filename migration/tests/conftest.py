@@ -14,6 +14,20 @@ from config import Config
 from database import MariaDBMetrics
 
 
+# ============================================================================
+# Markers
+# ============================================================================
+
+def pytest_configure(config: pytest.Config) -> None:
+    """
+    Register the markers of pytest.ini, whose [tool:pytest] section is only
+    read from setup.cfg and is therefore ignored.
+    """
+    config.addinivalue_line("markers", "unit: unit tests")
+    config.addinivalue_line("markers", "integration: integration tests")
+    config.addinivalue_line("markers", "slow: slow tests and benchmarks")
+
+
 # ============================================================================
 # Configuration Fixtures
 # ============================================================================
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent API response cache.
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from api_cache import ResponseCache, cache_key, is_negative
+from api_client import RateLimitedAPI
+
+SEARCH_URL = "https://recherche-entreprises.api.gouv.fr/search"
+HOUR = 3600.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status: int, payload) -> Mock:
+    response = Mock()
+    response.status_code = status
+    response.content = json.dumps(payload).encode("utf-8")
+    response.headers = {"Content-Type": "application/json"}
+    return response
+
+
+def _cache(clock=None, **kwargs) -> ResponseCache:
+    options = {"ttl": 24 * HOUR, "negative_ttl": HOUR, "max_entries": 1000}
+    options.update(kwargs)
+    return ResponseCache(":memory:", clock=clock or FakeClock(), **options)
+
+
+class TestCacheKey:
+    """Endpoint + normalized params."""
+
+    def test_param_order_and_spaces_ignored(self):
+        a = cache_key("GET", SEARCH_URL, {"q": " 12345678900011", "minimal": "true"})
+        b = cache_key("get", SEARCH_URL + "?minimal=true", {"q": "12345678900011"})
+        assert a == b
+        assert a[0] == "recherche-entreprises.api.gouv.fr/search"
+
+    def test_different_params_differ(self):
+        assert cache_key("GET", SEARCH_URL, {"q": "1"}) != cache_key("GET", SEARCH_URL, {"q": "2"})
+
+    def test_negative_detection(self):
+        assert is_negative(404, b"")
+        assert is_negative(200, b'{"results": []}')
+        assert is_negative(200, b'{"data": [], "links": {}}')
+        assert is_negative(200, b"[]")
+        assert not is_negative(200, b'{"results": [{"siren": "1"}]}')
+
+
+class TestResponseCache:
+    """Storage, TTLs and eviction."""
+
+    def test_round_trip(self):
+        cache = _cache()
+        assert cache.put("GET", SEARCH_URL, {"q": "1"}, _response(200, {"results": [{"a": 1}]}))
+
+        cached = cache.get("GET", SEARCH_URL, {"q": "1"})
+
+        assert cached.status_code == 200
+        assert cached.json() == {"results": [{"a": 1}]}
+        assert cached.from_cache
+
+    def test_throttled_and_server_errors_not_stored(self):
+        cache = _cache()
+        assert not cache.put("GET", SEARCH_URL, {"q": "1"}, _response(429, {}))
+        assert not cache.put("GET", SEARCH_URL, {"q": "1"}, _response(503, {}))
+        assert cache.get("GET", SEARCH_URL, {"q": "1"}) is None
+
+    def test_negative_entries_expire_first(self):
+        clock = FakeClock()
+        cache = _cache(clock)
+        cache.put("GET", SEARCH_URL, {"q": "found"}, _response(200, {"results": [{"a": 1}]}))
+        cache.put("GET", SEARCH_URL, {"q": "missing"}, _response(200, {"results": []}))
+
+        clock.now += 2 * HOUR
+
+        assert cache.get("GET", SEARCH_URL, {"q": "found"}) is not None
+        assert cache.get("GET", SEARCH_URL, {"q": "missing"}) is None
+
+    def test_endpoint_ttl_override(self):
+        clock = FakeClock()
+        cache = _cache(clock, endpoint_ttls={"tabular-api.data.gouv.fr": 2 * HOUR})
+        url = "https://tabular-api.data.gouv.fr/api/resources/x/data/"
+        cache.put("GET", url, {"SIRET__exact": "1"}, _response(200, {"data": [{"a": 1}]}))
+        cache.put("GET", SEARCH_URL, {"q": "1"}, _response(200, {"results": [{"a": 1}]}))
+
+        clock.now += 3 * HOUR
+
+        assert cache.get("GET", url, {"SIRET__exact": "1"}) is None
+        assert cache.get("GET", SEARCH_URL, {"q": "1"}) is not None
+
+    def test_eviction_keeps_newest(self):
+        clock = FakeClock()
+        cache = _cache(clock, max_entries=2)
+        for i in range(4):
+            clock.now += 1
+            cache.put("GET", SEARCH_URL, {"q": str(i)}, _response(200, {"results": [i]}))
+
+        cache.evict()
+
+        kept = [i for i in range(4) if cache.get("GET", SEARCH_URL, {"q": str(i)})]
+        assert kept == [2, 3]
+
+
+class TestClientWithCache:
+    """RateLimitedAPI serves GET requests from the cache."""
+
+    def test_second_call_served_from_cache(self):
+        client = RateLimitedAPI(requests_per_second=100, cache=_cache())
+        client.session = Mock()
+        client.session.request.return_value = _response(200, {"results": [{"a": 1}]})
+
+        first = client.request("GET", SEARCH_URL, params={"q": "1"})
+        second = client.request("GET", SEARCH_URL, params={"q": "1"})
+
+        assert client.session.request.call_count == 1
+        assert first.status_code == second.status_code == 200
+        assert second.json() == {"results": [{"a": 1}]}
+        assert client.metrics.snapshot()["cache_hits"] == 1
+
+    def test_cache_only_never_hits_network(self):
+        cache = _cache(cache_only=True)
+        cache.put("GET", SEARCH_URL, {"q": "known"}, _response(200, {"results": [1]}))
+        client = RateLimitedAPI(requests_per_second=100, cache=cache)
+        client.session = Mock()
+
+        assert client.request("GET", SEARCH_URL, params={"q": "known"}).status_code == 200
+        assert client.request("GET", SEARCH_URL, params={"q": "unknown"}) is None
+        client.session.request.assert_not_called()
+        assert client.metrics.snapshot()["cache_misses"] == 1
+
+    def test_persisted_between_runs(self, tmp_path):
+        path = str(tmp_path / "cache" / "api.sqlite")
+        cache = ResponseCache(path, ttl=HOUR, negative_ttl=HOUR, max_entries=10)
+        cache.put("GET", SEARCH_URL, {"q": "1"}, _response(200, {"results": [1]}))
+        cache.close()
+
+        reopened = ResponseCache(path, ttl=HOUR, negative_ttl=HOUR, max_entries=10)
+        assert reopened.get("GET", SEARCH_URL, {"q": "1"}).json() == {"results": [1]}
+        reopened.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Tests for the concurrent company enrichment pipeline.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from api_enrichment import (
+    _enrich_valid_sirets,
+    _resolve_idcc_code,
+    _resolve_reference_ids,
+    _write_enrichment_batch,
+)
+from config import Config
+from reference_data import ReferenceData
+
+SIRETS = [f"{i:014d}" for i in range(10)]
+
+
+def _cfg(workers: int = 4, batch: int = 3) -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.pg_schema = "staging"
+    cfg.api_workers = workers
+    cfg.enrichment_batch_size = batch
+    return cfg
+
+
+def _row(siret: str) -> tuple:
+    return (siret, f"Company {siret}", "62.01Z", "1486", "63113", 15, "PME", "57")
+
+
+def _reference(**tables) -> ReferenceData:
+    """ReferenceData holding the given code -> id mappings, without a database."""
+    reference = ReferenceData.__new__(ReferenceData)
+    reference.ids = {name: {} for name in ("city", "naf", "company_type", "idcc")}
+    reference.ids.update(tables)
+    return reference
+
+
+def _stats() -> dict:
+    return {"processed": 0, "inserted": 0, "errors": 0}
+
+
+class TestConcurrentEnrichment:
+    """API calls overlap, writes are batched on the calling thread."""
+
+    def test_requests_in_flight_concurrently(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def fetch(siret, api_client, reference):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+            return _row(siret)
+
+        with patch("api_enrichment.ReferenceData"), patch(
+            "api_enrichment._fetch_company_enrichment", side_effect=fetch
+        ), patch(
+            "api_enrichment._write_enrichment_batch",
+            side_effect=lambda conn, cfg, rows: {r[0] for r in rows},
+        ):
+            errors = _enrich_valid_sirets(MagicMock(), _cfg(), SIRETS, MagicMock(), [], _stats())
+
+        assert errors == []
+        assert peak > 1
+
+    def test_results_written_in_batches(self):
+        stats = _stats()
+        batches = []
+
+        def write(conn, cfg, rows):
+            batches.append(len(rows))
+            return {r[0] for r in rows}
+
+        with patch("api_enrichment.ReferenceData"), patch(
+            "api_enrichment._fetch_company_enrichment",
+            side_effect=lambda siret, *_: _row(siret),
+        ), patch("api_enrichment._write_enrichment_batch", side_effect=write):
+            _enrich_valid_sirets(MagicMock(), _cfg(batch=4), SIRETS, MagicMock(), [], stats)
+
+        assert batches == [4, 4, 2]
+        assert stats == {"processed": 10, "inserted": 10, "errors": 0}
+
+    def test_api_failures_and_unknown_companies_are_errors(self):
+        stats = _stats()
+
+        def fetch(siret, *_):
+            return None if siret == SIRETS[0] else _row(siret)
+
+        with patch("api_enrichment.ReferenceData"), patch(
+            "api_enrichment._fetch_company_enrichment", side_effect=fetch
+        ), patch(
+            "api_enrichment._write_enrichment_batch",
+            side_effect=lambda conn, cfg, rows: {r[0] for r in rows if r[0] != SIRETS[1]},
+        ):
+            errors = _enrich_valid_sirets(MagicMock(), _cfg(), SIRETS, MagicMock(), [], stats)
+
+        assert sorted(errors) == SIRETS[:2]
+        assert stats == {"processed": 10, "inserted": 8, "errors": 2}
+
+
+class TestBatchWrite:
+    """One UPDATE ... FROM (VALUES ...) per batch, no lookup query."""
+
+    def test_single_statement(self):
+        conn = MagicMock()
+        reference = _reference(city={"63113": 7}, naf={"62.01Z": 3}, idcc={"1486": 9})
+        rows = [_resolve_reference_ids(_row(s), reference) for s in SIRETS[:2]]
+        with patch(
+            "api_enrichment.execute_values", return_value=[(SIRETS[0],)]
+        ) as ev:
+            updated = _write_enrichment_batch(conn, _cfg(), rows)
+
+        assert updated == {SIRETS[0]}
+        ev.assert_called_once()
+        sql = ev.call_args[0][1]
+        assert "UPDATE staging.company c" in sql
+        assert "FROM (VALUES %s)" in sql
+        assert "SELECT id" not in sql
+        assert ev.call_args[0][2][0] == (SIRETS[0], f"Company {SIRETS[0]}", 3, 9, 7, 15, "PME", None)
+        assert ev.call_args[1]["fetch"] is True
+        conn.commit.assert_called_once()
+
+    def test_reference_refreshed_before_each_batch(self):
+        reference = MagicMock()
+        with patch("api_enrichment.ReferenceData", return_value=reference), patch(
+            "api_enrichment._fetch_company_enrichment",
+            side_effect=lambda siret, *_: _row(siret),
+        ), patch(
+            "api_enrichment._write_enrichment_batch",
+            side_effect=lambda conn, cfg, rows: {r[0] for r in rows},
+        ):
+            _enrich_valid_sirets(MagicMock(), _cfg(batch=4), SIRETS, MagicMock(), [], _stats())
+
+        assert reference.refresh.call_count == 3
+
+
+class TestReferenceData:
+    """Reference tables loaded once and reloaded only when they change."""
+
+    def _conn(self, signatures, mappings):
+        """Connection answering the signature and load queries of each table."""
+        cur = MagicMock()
+        cur.__enter__.return_value = cur
+        state = {"table": None}
+
+        def execute(sql, params=None):
+            if "information_schema" in sql:
+                state["table"] = params[1]
+                cur.fetchone.return_value = (1,) if params[1] == "city" else None
+            elif "COUNT(*)" in sql:
+                state["table"] = sql.split("FROM staging.")[1]
+                cur.fetchone.return_value = signatures[state["table"]]
+            else:
+                cur.fetchall.return_value = mappings[state["table"]]
+
+        cur.execute.side_effect = execute
+        conn = MagicMock()
+        conn.cursor.return_value = cur
+        return conn, cur
+
+    def test_loads_and_maps_paris_arrondissements(self):
+        signatures = {t: (1, None) for t in ("city", "naf", "company_type", "idcc")}
+        mappings = {
+            "city": [("75056", 10), ("63113", 11), ("63113", 12)],
+            "naf": [("62.01Z", 1)],
+            "company_type": [("57", 2)],
+            "idcc": [("1486", 3)],
+        }
+        conn, _ = self._conn(signatures, mappings)
+
+        reference = ReferenceData(conn, _cfg())
+
+        assert reference.city_id("75112") == 10
+        assert reference.city_id("63113") == 11
+        assert reference.naf_id("62.01Z") == 1
+        assert reference.type_id("57") == 2
+        assert reference.idcc_id("1486") == 3
+        assert reference.idcc_id("9999") is None
+        assert reference.city_id(None) is None
+
+    def test_refresh_reloads_changed_tables_only(self):
+        signatures = {t: (1, None) for t in ("city", "naf", "company_type", "idcc")}
+        mappings = {t: [] for t in signatures}
+        conn, cur = self._conn(signatures, mappings)
+        reference = ReferenceData(conn, _cfg())
+
+        assert reference.refresh() == 0
+        signatures["idcc"] = (2, None)
+        mappings["idcc"] = [("2098", 5)]
+
+        assert reference.refresh() == 1
+        assert reference.idcc_id("2098") == 5
+
+
+class TestIdccResolution:
+    """IDCC fallbacks only trigger when the code is not in the idcc table."""
+
+    def test_known_code_no_extra_call(self):
+        client = MagicMock()
+        reference = _reference(idcc={"1486": 1})
+        code = _resolve_idcc_code(SIRETS[0], {"idcc": "1486, 2098"}, client, reference)
+        assert code == "1486"
+        client.request.assert_not_called()
+
+    def test_unknown_code_falls_back_to_siege(self):
+        with patch(
+            "api_enrichment.get_api_company_data_siege", return_value={"idcc": "2098"}
+        ) as siege, patch("api_enrichment.get_idcc_from_siret2idcc_api") as fallback:
+            code = _resolve_idcc_code(
+                SIRETS[0], {"idcc": "9999"}, MagicMock(), _reference(idcc={"2098": 2})
+            )
+        assert code == "2098"
+        siege.assert_called_once_with(SIRETS[0][:9], siege.call_args[0][1])
+        fallback.assert_not_called()
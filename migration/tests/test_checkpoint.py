@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Tests for the checkpoint journal and the --resume of an interrupted cycle.
+"""
+
+import argparse
+from contextlib import contextmanager
+from unittest.mock import ANY, MagicMock, patch
+
+import pytest
+
+from checkpoint import (
+    Checkpoint,
+    CycleJournal,
+    prepare_resumed_table,
+    prune_stale_checkpoints,
+)
+from config import Config
+from loader import CopyLoader
+from migrate import _run_cycle_steps
+from migration_core import run_migration
+
+
+@pytest.fixture(autouse=True)
+def no_extraction_filters():
+    """The fake MariaDB table lacks the columns of the real extraction filters."""
+    with patch.dict("migration_core.EXTRACTION_FILTERS", clear=True):
+        yield
+
+
+class FakeMariaCursor:
+    """Keyset-only MariaDB cursor double over rows sorted by id."""
+
+    def __init__(self, db: "FakeMariaDB") -> None:
+        self.db = db
+        self._rows: list = []
+
+    def __enter__(self) -> "FakeMariaCursor":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    def execute(self, sql: str, params=()) -> None:
+        self.db.queries.append((sql, params))
+        if sql.startswith("SHOW COLUMNS"):
+            self._rows = [("id",), ("status",)]
+        elif sql.startswith("SELECT COUNT(*)"):
+            self._rows = [(len(self.db.rows),)]
+        else:
+            # Every "id > %s" bound applies, the last parameter is the LIMIT
+            lower = max(params[:-1], default=0)
+            self._rows = [r for r in self.db.rows if r[0] > lower][:params[-1]]
+
+    def fetchall(self) -> list:
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeMariaDB:
+    def __init__(self, size: int) -> None:
+        self.rows = [(i, "ok") for i in range(1, size + 1)]
+        self.queries: list = []
+
+    def cursor(self, cursor_class=None) -> FakeMariaCursor:
+        return FakeMariaCursor(self)
+
+
+def _cfg() -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.extract_method = "keyset"
+    cfg.load_method = "insert"
+    cfg.migration_workers = 1
+    cfg.use_pg_pool = False
+    cfg.batch_size = 100
+    cfg.pg_schema = "staging"
+    cfg.temp_schema = "temp_staging"
+    return cfg
+
+
+def _pg(size: int) -> MagicMock:
+    pg_cursor = MagicMock()
+    pg_cursor.fetchall.return_value = [("id", "integer"), ("status", "text")]
+    pg_cursor.fetchone.return_value = (size,)
+    pg_cursor.__enter__.return_value = pg_cursor
+    conn_pg = MagicMock()
+    conn_pg.cursor.return_value = pg_cursor
+    return conn_pg
+
+
+def _executed(cur: MagicMock) -> list:
+    return [" ".join(c[0][0].split()) for c in cur.execute.call_args_list]
+
+
+class TestResumedLoad:
+    """run_migration skips loaded tables and continues after the last key."""
+
+    def _run(self, checkpoints=None, journal=False):
+        db = FakeMariaDB(2500)
+        written = []
+        with patch(
+            "loader.execute_values", side_effect=lambda cur, sql, rows: written.extend(rows)
+        ), patch("migration_core.save_table_checkpoint") as save, patch(
+            "migration_core.prepare_resumed_table", return_value=True
+        ) as prepare:
+            stats = run_migration(
+                db, _pg(2500), _cfg(), ["registration"], mode="live",
+                checkpoints=checkpoints, journal=journal,
+            )
+        return db, written, stats, save, prepare
+
+    def test_unverified_checkpoint_reloads_from_start(self):
+        partial = Checkpoint("table", "registration", 1500, 1500, False)
+        with patch("migration_core.prepare_resumed_table", return_value=False), patch(
+            "loader.execute_values"
+        ) as write:
+            stats = run_migration(
+                FakeMariaDB(2500), _pg(2500), _cfg(), ["registration"], mode="live",
+                checkpoints={"registration": partial},
+            )
+        assert stats["registration"]["inserted"] == 2500
+        assert sum(len(c[0][2]) for c in write.call_args_list) == 2500
+
+    def test_completed_table_skipped(self):
+        done = Checkpoint("table", "registration", None, 2500, True)
+        _, written, stats, _, prepare = self._run({"registration": done})
+        assert written == []
+        assert "registration" not in stats
+        prepare.assert_not_called()
+
+    def test_interrupted_table_continues_after_last_key(self):
+        partial = Checkpoint("table", "registration", 1500, 1500, False)
+        db, written, stats, _, prepare = self._run({"registration": partial})
+
+        prepare.assert_called_once()
+        assert prepare.call_args[0][3] == "id"
+        assert [r[0] for r in written] == list(range(1501, 2501))
+        assert stats["registration"]["inserted"] == 2500
+        pages = [sql for sql, _ in db.queries if "ORDER BY id" in sql]
+        assert all(" WHERE id > %s" in sql for sql in pages)
+
+    def test_progress_journaled_every_checkpoint_rows(self):
+        with patch("migration_core.CHECKPOINT_ROWS", 1000):
+            _, written, _, save, _ = self._run(journal=True)
+
+        assert len(written) == 2500
+        calls = [c[0][2:] + (c[1].get("completed", False),) for c in save.call_args_list]
+        # Page size is 250: checkpoints at 1000 and 2000 rows, then completion
+        assert calls == [
+            ("registration", 1000, 1000, False),
+            ("registration", 2000, 2000, False),
+            ("registration", None, 2500, True),
+        ]
+
+
+class TestPrepareResumedTable:
+    """Rows past the last checkpoint are removed before the load continues."""
+
+    def _prepare(self, key, last_key, kept=10):
+        cur = MagicMock()
+        cur.fetchone.return_value = (kept,)
+
+        @contextmanager
+        def fake_transaction(conn):
+            yield cur
+
+        with patch("checkpoint.transaction", fake_transaction):
+            resumable = prepare_resumed_table(
+                MagicMock(), "temp_staging", "registration", key,
+                Checkpoint("table", "registration", last_key, 10, False),
+            )
+        return cur, resumable
+
+    def test_rows_past_last_key_deleted(self):
+        cur, resumable = self._prepare("id", 42)
+        assert resumable
+        assert _executed(cur) == [
+            "DELETE FROM temp_staging.registration WHERE id > %s",
+            "SELECT COUNT(*) FROM temp_staging.registration WHERE id <= %s",
+        ]
+        assert cur.execute.call_args_list[0][0][1] == (42,)
+
+    def test_lost_rows_reload_from_start(self):
+        # A PostgreSQL crash emptied the UNLOGGED temp table
+        cur, resumable = self._prepare("id", 42, kept=0)
+        assert not resumable
+        assert _executed(cur)[-1] == "TRUNCATE temp_staging.registration"
+
+    def test_table_without_key_truncated(self):
+        cur, resumable = self._prepare(None, None)
+        assert not resumable
+        assert _executed(cur) == ["TRUNCATE temp_staging.registration"]
+
+
+class TestJournal:
+    """Stale entries, skipped phases and clearing of the journal."""
+
+    def test_emptied_temp_table_discards_phases(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        # company: table exists but is empty; degree: table is missing
+        cur.fetchone.side_effect = [("temp_staging.company",), (False,), (None,)]
+        journal = {
+            "table": {
+                "company": Checkpoint("table", "company", None, 10, True),
+                "degree": Checkpoint("table", "degree", None, 0, True),
+            },
+            "phase": {"migrate": Checkpoint("phase", "migrate", None, 0, True)},
+        }
+        assert prune_stale_checkpoints(conn, _cfg(), journal) == {"table": {}, "phase": {}}
+
+    def test_resume_skips_completed_phases(self):
+        entries = {
+            "table": {},
+            "phase": {"migrate": Checkpoint("phase", "migrate", None, 0, True)},
+        }
+        with patch("checkpoint.ensure_checkpoint_table"), patch(
+            "checkpoint.load_checkpoints", return_value=entries
+        ), patch("checkpoint.prune_stale_checkpoints", side_effect=lambda c, cfg, j: j), patch(
+            "checkpoint.reset_checkpoints"
+        ) as reset:
+            journal = CycleJournal(MagicMock(), _cfg(), enabled=True, resume=True)
+            reset.assert_not_called()
+            assert journal.skip("migrate")
+            assert not journal.skip("cleanup")
+
+    def test_new_cycle_clears_journal(self):
+        with patch("checkpoint.ensure_checkpoint_table"), patch(
+            "checkpoint.reset_checkpoints"
+        ) as reset, patch("checkpoint.load_checkpoints") as load:
+            journal = CycleJournal(MagicMock(), _cfg(), enabled=True, resume=False)
+        reset.assert_called_once()
+        load.assert_not_called()
+        assert not journal.skip("migrate")
+
+    def test_failed_phase_stops_recording(self):
+        with patch("checkpoint.ensure_checkpoint_table"), patch(
+            "checkpoint.reset_checkpoints"
+        ) as reset, patch("checkpoint.complete_phase") as complete:
+            journal = CycleJournal(MagicMock(), _cfg(), enabled=True, resume=False)
+            journal.complete("migrate", success=False)
+            journal.complete("cleanup")
+            journal.close()
+        complete.assert_not_called()
+        # Only the reset of the new cycle: the journal is kept for --resume
+        reset.assert_called_once()
+
+    def test_dry_run_touches_nothing(self):
+        conn = MagicMock()
+        journal = CycleJournal(conn, _cfg(), enabled=False, resume=True)
+        journal.complete("migrate")
+        journal.close()
+        assert journal.incomplete_tables(["company"]) == []
+        conn.cursor.assert_not_called()
+
+
+class TestIncompleteCycle:
+    """A table not fully loaded stops the cycle, which --resume then completes."""
+
+    TABLES = ["company", "billing_line"]
+
+    def _cycle(self, store: dict, resume: bool, loads: dict):
+        """Runs _run_cycle_steps over a journal kept in ``store``."""
+        def fake_run_migration(ma_conn, pg_conn, cfg, tables, mode, checkpoints, journal):
+            calls["checkpoints"] = dict(checkpoints)
+            for table in tables:
+                if table in checkpoints and checkpoints[table].completed:
+                    continue
+                store["table"][table] = loads[table]
+            return {}
+
+        def fake_complete_phase(conn, cfg, phase):
+            store["phase"][phase] = Checkpoint("phase", phase, None, 0, True)
+
+        @contextmanager
+        def fake_connection(_cfg):
+            yield MagicMock()
+
+        calls: dict = {}
+        args = argparse.Namespace(
+            step="full", dry_run=False, resume=resume, tables=self.TABLES, keep_temp=False
+        )
+        cfg = _cfg()
+        cfg.api_enabled = False
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(t,) for t in self.TABLES]
+        ma_conn = MagicMock()
+        ma_conn.cursor.return_value.__enter__.return_value = cursor
+
+        @contextmanager
+        def fake_mariadb(_cfg):
+            yield ma_conn
+
+        with patch("migrate.mariadb_connection", fake_mariadb), patch(
+            "migrate.postgres_connection", fake_connection
+        ), patch("migrate.ma_execute"), patch("migrate.create_temp_schema"), patch(
+            "migrate.create_temp_tables"
+        ) as create, patch("migrate.run_migration", fake_run_migration), patch(
+            "migrate.build_temp_indexes"
+        ), patch("migrate.run_cleanup"), patch("migrate.sync_tables", return_value={}) as sync, patch(
+            "migrate.run_staging_cleanup"
+        ), patch("migrate._log_sync_stats"), patch("migrate.analyze_tables"), patch(
+            "migrate.drop_temp_schema"
+        ) as drop, patch("checkpoint.ensure_checkpoint_table"), patch(
+            "checkpoint.reset_checkpoints",
+            side_effect=lambda c, cfg: [store["table"].clear(), store["phase"].clear()],
+        ), patch(
+            "checkpoint.load_checkpoints",
+            side_effect=lambda c, cfg: {k: dict(v) for k, v in store.items()},
+        ), patch("checkpoint.prune_stale_checkpoints", side_effect=lambda c, cfg, j: j), patch(
+            "checkpoint.complete_phase", side_effect=fake_complete_phase
+        ):
+            completed = _run_cycle_steps(args, cfg, MagicMock(), MagicMock())
+        calls.update(create=create, sync=sync, drop=drop, completed=completed)
+        return calls
+
+    def test_incomplete_table_stops_then_resumes(self):
+        store: dict = {"table": {}, "phase": {}}
+        partial = Checkpoint("table", "billing_line", 1500, 1500, False)
+        first = self._cycle(store, resume=False, loads={
+            "company": Checkpoint("table", "company", None, 10, True),
+            "billing_line": partial,
+        })
+
+        # Nothing past the migrate step: the temp tables are kept for --resume
+        assert not first["completed"]
+        first["sync"].assert_not_called()
+        first["drop"].assert_not_called()
+        assert store["phase"] == {}
+        assert store["table"]["billing_line"] == partial
+
+        second = self._cycle(store, resume=True, loads={
+            "billing_line": Checkpoint("table", "billing_line", None, 2500, True),
+        })
+
+        assert second["completed"]
+        assert second["checkpoints"]["billing_line"] == partial
+        second["create"].assert_called_once_with(ANY, ANY, [])
+        second["sync"].assert_called_once()
+        second["drop"].assert_called_once()
+        # The cycle went through: the journal is cleared
+        assert store == {"table": {}, "phase": {}}
+
+
+class TestLoaderCommit:
+    """A checkpoint commits the rows buffered by the COPY loader."""
+
+    def test_copy_loader_flushes_then_commits(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        loader = CopyLoader(conn, _cfg(), "temp_staging", "registration", ["id", "status"], 100)
+        loader.write([(1, "a"), (2, "b")])
+        loader.commit()
+
+        cur.copy_expert.assert_called_once()
+        conn.commit.assert_called_once()
+        cur.close.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of row conversion throughput on a registration-shaped batch.
+
+Compares the legacy per-cell path (convert_value + dict per row) with the
+per-table converter built by compile_row_converter. The batch size defaults
+to 1,000,000 rows and can be changed with BENCH_ROWS.
+
+Run with:
+    RUN_BENCHMARKS=1 pytest tests/test_converter_benchmark.py -s -m slow
+"""
+
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from database import compile_row_converter, convert_value, normalize_names
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(
+        os.getenv("RUN_BENCHMARKS") != "1",
+        reason="benchmark, set RUN_BENCHMARKS=1 to run",
+    ),
+]
+
+# Column layout of staging.registration (types as reported by information_schema)
+REGISTRATION_COLUMNS = [
+    ("id", "integer"),
+    ("apprentice_id", "integer"),
+    ("option_id", "integer"),
+    ("host_company_id", "integer"),
+    ("opco_address_id", "integer"),
+    ("status", "character varying"),
+    ("contract_type", "character varying"),
+    ("draft", "smallint"),
+    ("amount", "numeric"),
+    ("start_date", "date"),
+    ("end_date", "date"),
+    ("signature_date", "date"),
+    ("deleted_at", "timestamp without time zone"),
+    ("created_at", "timestamp without time zone"),
+    ("updated_at", "timestamp without time zone"),
+]
+
+
+def _synthetic_rows(count: int) -> list:
+    """Builds rows shaped like pymysql results for registration."""
+    created = datetime(2024, 1, 1, 8, 0)
+    rows = []
+    for i in range(count):
+        rows.append((
+            i + 1, i % 5000, i % 800, i % 3000, i % 40,
+            "validated" if i % 7 else "draft_double", "apprenticeship",
+            i % 2, Decimal("1250.50"),
+            date(2023, 9, 1), date(2025, 8, 31), date(2023, 7, 12),
+            None, created, created,
+        ))
+    return rows
+
+
+def _legacy_convert(rows, cols, types, table):
+    """Per-cell conversion as performed before compile_row_converter."""
+    out = []
+    for rec in rows:
+        d = {cols[i]: convert_value(rec[i], types[i]) for i in range(len(cols))}
+        if table == "apprentice":
+            d = normalize_names(d)
+        out.append(tuple(d[c] for c in cols))
+    return out
+
+
+def test_registration_conversion_throughput():
+    count = int(os.getenv("BENCH_ROWS", "1000000"))
+    rows = _synthetic_rows(count)
+    cols = [c for c, _ in REGISTRATION_COLUMNS]
+    types = [t for _, t in REGISTRATION_COLUMNS]
+
+    start = time.perf_counter()
+    before = _legacy_convert(rows, cols, types, "registration")
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    convert_rows = compile_row_converter(cols, types)
+    after = convert_rows(rows)
+    compiled_s = time.perf_counter() - start
+
+    assert after == before
+
+    legacy_rps = count / legacy_s
+    compiled_rps = count / compiled_s
+    print(
+        f"\n{count} rows: legacy {legacy_rps:,.0f} rows/s, "
+        f"compiled {compiled_rps:,.0f} rows/s ({compiled_rps / legacy_rps:.1f}x)"
+    )
+    assert compiled_rps > legacy_rps
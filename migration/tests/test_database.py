@@ -15,6 +15,9 @@ from database import (
     transaction,
     init_mariadb_metrics,
     get_mariadb_metrics,
+    compile_row_converter,
+    convert_value,
+    normalize_names,
 )
 from config import Config
 
@@ -166,5 +169,51 @@ class TestMetricsGlobals:
         assert metrics is None
 
 
+class TestCompileRowConverter:
+    """Tests for per-table compiled row converters."""
+
+    COLUMNS = ["id", "active", "amount", "first_name", "last_name", "start_date"]
+    TYPES = ["integer", "boolean", "numeric", "character varying", "text", "date"]
+
+    def _legacy(self, rows, normalize=False):
+        out = []
+        for rec in rows:
+            d = {
+                self.COLUMNS[i]: convert_value(rec[i], self.TYPES[i])
+                for i in range(len(self.COLUMNS))
+            }
+            if normalize:
+                d = normalize_names(d)
+            out.append(tuple(d[c] for c in self.COLUMNS))
+        return out
+
+    def test_matches_convert_value(self):
+        """Compiled converter gives the same tuples as convert_value."""
+        rows = [
+            ("1", 1, "12.5", "  jean  ", "dupont ", "2024-09-01"),
+            (2, 0, None, None, "", None),
+        ]
+        convert = compile_row_converter(self.COLUMNS, self.TYPES)
+        assert convert(rows) == self._legacy(rows)
+
+    def test_matches_normalize_names(self):
+        """Name normalization is applied like normalize_names."""
+        rows = [(1, 1, 3, "  marie-anne ", " durand", None), (2, 0, 1, "", None, None)]
+        convert = compile_row_converter(self.COLUMNS, self.TYPES, normalize=True)
+        assert convert(rows) == self._legacy(rows, normalize=True)
+        assert convert(rows)[0][3:5] == ("Marie-Anne", "DURAND")
+
+    def test_bad_value_kept_like_convert_value(self):
+        """A value that cannot be converted is kept unchanged."""
+        rows = [("abc", 1, "1.0", "a", "b", None)]
+        convert = compile_row_converter(self.COLUMNS, self.TYPES)
+        assert convert(rows) == [("abc", True, 1.0, "a", "b", None)]
+
+    def test_passthrough_types(self):
+        """Tables without convertible columns return plain tuples."""
+        convert = compile_row_converter(["d"], ["date"])
+        assert convert([["2024-01-01"]]) == [("2024-01-01",)]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
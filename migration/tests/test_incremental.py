@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental (delta) migration mode.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from cleanup import (
+    SNAPSHOT_CLEANUP_TASKS,
+    cleanup_unreferenced_training,
+    run_cleanup,
+    run_staging_cleanup,
+)
+from config import Config
+from incremental import (
+    delta_predicate,
+    is_incremental,
+    missing_keys,
+    watermark_column,
+)
+from migration_core import iter_table_batches, run_migration
+from sync import sync_tables
+from tests.test_migration_core import FakeMariaDB, no_extraction_filters  # noqa: F401
+
+
+def _cfg(mode: str = "incremental") -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.migration_mode = mode
+    cfg.extract_method = "keyset"
+    cfg.load_method = "insert"
+    cfg.migration_workers = 1
+    cfg.use_pg_pool = False
+    cfg.batch_size = 100
+    cfg.pg_schema = "staging"
+    cfg.temp_schema = "temp_staging"
+    return cfg
+
+
+class TestMissingKeys:
+    """Merge of two sorted key streams."""
+
+    def test_keys_only_in_target(self):
+        source = iter([1, 2, 4, 7, 9])
+        target = iter([1, 2, 3, 4, 5, 7, 8, 9, 10])
+        assert list(missing_keys(source, target)) == [3, 5, 8, 10]
+
+    def test_empty_source(self):
+        assert list(missing_keys(iter([]), iter([1, 2]))) == [1, 2]
+
+    def test_source_ahead_of_target(self):
+        assert list(missing_keys(iter([5, 6]), iter([1, 6]))) == [1]
+
+
+class TestWatermarkColumn:
+    """Choice of the tracked column."""
+
+    def test_updated_at_preferred(self):
+        assert watermark_column("registration", ["id", "updated_at"]) == "updated_at"
+
+    def test_key_fallback(self):
+        assert watermark_column("degree_level", ["id", "label"]) == "id"
+
+    def test_protected_tables_always_full(self):
+        assert watermark_column("company", ["id", "updated_at"]) is None
+
+    def test_pruned_tables_always_full(self):
+        assert watermark_column("training", ["id", "updated_at"]) is None
+        assert watermark_column("training_option", ["id"]) is None
+
+    def test_predicates(self):
+        assert delta_predicate("updated_at", "2024-01-01 00:00:00") == (
+            "(updated_at >= %s OR updated_at IS NULL)",
+            ("2024-01-01 00:00:00",),
+        )
+        assert delta_predicate("id", "42") == ("id > %s", ("42",))
+
+    def test_mode(self):
+        assert is_incremental(_cfg("incremental"))
+        assert not is_incremental(_cfg("full"))
+
+
+class TestFilteredExtraction:
+    """The delta condition is pushed into every extraction query."""
+
+    def _queries(self, method: str) -> list:
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        pages = [[(1, "a"), (2, "b")], [(3, "c")], []]
+        cur.fetchall.side_effect = pages
+        cur.fetchmany.side_effect = pages
+        cfg = _cfg()
+        cfg.extract_method = method
+        list(
+            iter_table_batches(
+                conn, cfg, "registration", ["id", "status"], 2, 1000,
+                "updated_at >= %s", ("2024-01-01",),
+            )
+        )
+        return [(c[0][0], c[0][1] if len(c[0]) > 1 else None) for c in cur.execute.call_args_list]
+
+    def test_keyset(self):
+        queries = self._queries("keyset")
+        assert queries[0] == (
+            "SELECT id, status FROM registration WHERE updated_at >= %s ORDER BY id LIMIT %s",
+            ("2024-01-01", 2),
+        )
+        assert queries[1] == (
+            "SELECT id, status FROM registration WHERE updated_at >= %s AND id > %s "
+            "ORDER BY id LIMIT %s",
+            ("2024-01-01", 2, 2),
+        )
+
+    def test_offset(self):
+        sql, params = self._queries("offset")[0]
+        assert sql == "SELECT id, status FROM registration WHERE updated_at >= %s LIMIT %s OFFSET %s"
+        assert params == ("2024-01-01", 2, 0)
+
+    def test_stream(self):
+        assert self._queries("stream") == [
+            ("SELECT id, status FROM registration WHERE updated_at >= %s", ("2024-01-01",))
+        ]
+
+
+class TestIncrementalRunMigration:
+    """run_migration in incremental mode."""
+
+    def _pg(self) -> MagicMock:
+        pg_cursor = MagicMock()
+        pg_cursor.fetchall.return_value = [("id", "integer"), ("status", "text")]
+        pg_cursor.fetchone.return_value = (50,)
+        pg_cursor.__enter__.return_value = pg_cursor
+        conn_pg = MagicMock()
+        conn_pg.cursor.return_value = pg_cursor
+        return conn_pg
+
+    def test_only_rows_after_mark_extracted(self):
+        db = FakeMariaDB(50)
+        with patch("migration_core.ensure_watermark_table") as ensure, patch(
+            "migration_core.get_watermark", return_value=40
+        ), patch("migration_core.store_pending_watermark") as store, patch(
+            "migration_core.record_delta_keys"
+        ) as record, patch("loader.execute_values"):
+            run_migration(db, self._pg(), _cfg(), ["registration"], mode="live")
+
+        ensure.assert_called_once()
+        select = [q for q in db.queries if q.startswith("SELECT id, status")]
+        assert select == ["SELECT id, status FROM registration WHERE id > %s"]
+        assert db.scanned == 10
+        store.assert_called_once()
+        assert store.call_args[0][2:] == ("registration", "id", "temp_staging")
+        record.assert_called_once()
+
+    def test_pruned_table_reloaded_with_delta_keys(self):
+        db = FakeMariaDB(50)
+        with patch("migration_core.ensure_watermark_table"), patch(
+            "migration_core.get_watermark"
+        ) as get_mark, patch("migration_core.store_pending_watermark") as store, patch(
+            "migration_core.record_delta_keys"
+        ) as record, patch("loader.execute_values"):
+            run_migration(db, self._pg(), _cfg(), ["training"], mode="live")
+
+        get_mark.assert_not_called()
+        store.assert_not_called()
+        assert db.scanned == 50
+        # Rows deleted in MariaDB are still removed from staging by sync
+        record.assert_called_once()
+
+    def test_failed_load_drops_pending_mark(self):
+        """A mark left pending by a failed sync is not promoted after a failed load."""
+        marks = {"value": 40, "pending": None}
+
+        def store(conn, cfg, table, column, schema):
+            marks["pending"] = 50
+
+        def clear(conn, cfg, table):
+            marks["pending"] = None
+
+        def commit(conn, cfg, table):
+            if marks["pending"] is not None:
+                marks["value"], marks["pending"] = marks["pending"], None
+
+        def cycle(write_error=None):
+            with patch("migration_core.ensure_watermark_table"), patch(
+                "migration_core.get_watermark", side_effect=lambda *a: marks["value"]
+            ), patch("migration_core.store_pending_watermark", store), patch(
+                "migration_core.clear_pending_watermark", clear
+            ), patch("migration_core.record_delta_keys"), patch(
+                "loader.execute_values", side_effect=write_error
+            ):
+                return run_migration(FakeMariaDB(50), self._pg(), _cfg(), ["registration"], "live")
+
+        # Cycle N loads the rows up to 50, then its sync fails
+        assert "registration" in cycle()
+        assert marks == {"value": 40, "pending": 50}
+        # Cycle N+1 loses its connection while loading, then sync runs
+        assert "registration" not in cycle(psycopg2.OperationalError("connection lost"))
+        commit(None, None, "registration")
+
+        # The rows after 40 are extracted again by the next cycle
+        assert marks == {"value": 40, "pending": None}
+
+    def test_full_mode_untouched(self):
+        db = FakeMariaDB(50)
+        with patch("migration_core.get_watermark") as get_mark, patch(
+            "migration_core.record_delta_keys"
+        ) as record, patch("loader.execute_values"):
+            run_migration(db, self._pg(), _cfg("full"), ["registration"], mode="live")
+
+        get_mark.assert_not_called()
+        record.assert_not_called()
+        assert "SELECT id, status FROM registration" in db.queries
+
+
+class TestIncrementalSync:
+    """sync_tables deletes only among delta keys in incremental mode."""
+
+    def _sync(self, mode: str, delta_table):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.__enter__.return_value = cur
+        cur.fetchone.return_value = (1, 1, 1)
+        # Range checksums of the main and temp tables (full mode)
+        cur.fetchall.side_effect = [[(0, 10, "a")], [(0, 10, "b")]]
+        cfg = _cfg(mode)
+        cfg.sync_chunk_size = 1000
+        with patch("sync.get_pg_columns", return_value=(["id", "status"], ["integer", "text"])), patch(
+            "sync.delta_keys_table", return_value=delta_table
+        ), patch("sync.commit_watermark") as commit:
+            sync_tables(conn, cfg, ["registration"])
+        sqls = [c[0][0] for c in cur.execute.call_args_list]
+        merges = [s for s in sqls if "INSERT INTO staging.registration" in s]
+        return merges, commit
+
+    def test_full_mode_deletes_within_changed_ranges(self):
+        merges, commit = self._sync("full", None)
+        assert len(merges) == 1
+        assert "s.id / 1000 = ANY(%(ranges)s)" in merges[0]
+        commit.assert_not_called()
+
+    def test_incremental_deletes_among_delta_keys(self):
+        merges, commit = self._sync("incremental", "temp_staging.registration_delta_keys")
+        assert len(merges) == 1
+        assert (
+            "EXISTS (SELECT 1 FROM temp_staging.registration_delta_keys k WHERE k.id = s.id)"
+            in merges[0]
+        )
+        assert "ANY(" not in merges[0]
+        commit.assert_called_once()
+
+    def test_incremental_without_delta_keys_never_deletes(self):
+        merges, _ = self._sync("incremental", None)
+        assert len(merges) == 1
+        assert "DELETE" not in merges[0]
+
+
+class TestIncrementalCleanup:
+    """Snapshot-wide cleanups run on staging after sync in incremental mode."""
+
+    def test_snapshot_tasks_skipped(self):
+        tasks = [(name, MagicMock()) for name in (
+            "cleanup_registration", "cleanup_obsolete_companies", "cleanup_unreferenced_dimensions",
+        )]
+        with patch("cleanup.CLEANUP_TASKS", tasks):
+            run_cleanup(MagicMock(), _cfg("incremental"))
+
+        ran = {name for name, fn in tasks if fn.called}
+        assert ran == {"cleanup_registration"}
+        assert ran.isdisjoint(SNAPSHOT_CLEANUP_TASKS)
+
+    def test_all_tasks_run_in_full_mode(self):
+        tasks = [(name, MagicMock()) for name in ("cleanup_registration", "cleanup_obsolete_companies")]
+        with patch("cleanup.CLEANUP_TASKS", tasks):
+            run_cleanup(MagicMock(), _cfg("full"))
+        assert all(fn.called for _, fn in tasks)
+
+    def test_snapshot_tasks_run_on_staging_after_incremental_sync(self):
+        tasks = [(name, MagicMock()) for name in (
+            "cleanup_registration", "cleanup_unreferenced_training", "cleanup_unreferenced_dimensions",
+        )]
+        conn = MagicMock()
+        cfg = _cfg("incremental")
+        with patch("cleanup.CLEANUP_TASKS", tasks):
+            run_staging_cleanup(conn, cfg)
+
+        registration, training, dimensions = (fn for _, fn in tasks)
+        registration.assert_not_called()
+        training.assert_called_once_with(conn, cfg, schema="staging")
+        dimensions.assert_called_once_with(conn, cfg, schema="staging")
+
+    def test_no_staging_cleanup_in_full_mode(self):
+        tasks = [("cleanup_unreferenced_training", MagicMock())]
+        with patch("cleanup.CLEANUP_TASKS", tasks):
+            run_staging_cleanup(MagicMock(), _cfg("full"))
+        tasks[0][1].assert_not_called()
+
+    def test_staging_pruning_rechecks_condition(self):
+        cfg = _cfg("incremental")
+        cfg.batch_size = 100
+        with patch("cleanup.delete_orphans", return_value=0) as delete:
+            cleanup_unreferenced_training(MagicMock(), cfg, schema="staging")
+            cleanup_unreferenced_training(MagicMock(), cfg)
+
+        staging, temp = delete.call_args_list
+        assert staging[0][2] == "staging" and staging[1]["recheck"] is True
+        assert temp[0][2] == "temp_staging" and temp[1]["recheck"] is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the PostgreSQL bulk loaders.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from config import Config
+from loader import CopyLoader, InsertLoader, copy_text_value, make_loader
+
+
+def _cfg(load_method: str = "copy") -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.load_method = load_method
+    cfg.batch_size = 2
+    return cfg
+
+
+class TestCopyTextValue:
+    """Tests for COPY text format encoding."""
+
+    def test_null(self):
+        assert copy_text_value(None) == "\\N"
+
+    def test_scalars(self):
+        assert copy_text_value(True) == "t"
+        assert copy_text_value(False) == "f"
+        assert copy_text_value(42) == "42"
+        assert copy_text_value(Decimal("1.50")) == "1.50"
+        assert copy_text_value(date(2024, 9, 1)) == "2024-09-01"
+        assert copy_text_value(datetime(2024, 9, 1, 8, 30)) == "2024-09-01T08:30:00"
+
+    def test_special_characters_escaped(self):
+        assert copy_text_value("a\tb\nc\\d\re") == "a\\tb\\nc\\\\d\\re"
+
+    def test_literal_backslash_n_is_not_null(self):
+        assert copy_text_value("\\N") == "\\\\N"
+
+    def test_bytes(self):
+        assert copy_text_value(b"\x01\xff") == "\\\\x01ff"
+
+
+class TestCopyLoader:
+    """Tests for the COPY backend."""
+
+    def _loader(self, flush_rows: int = 3):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        payloads = []
+        cur.copy_expert.side_effect = lambda sql, buf: payloads.append(buf.read())
+        loader = CopyLoader(
+            conn, _cfg(), "temp_staging", "registration", ["id", "status"], flush_rows
+        )
+        return loader, conn, cur, payloads
+
+    def test_buffer_flushed_when_full_and_refilled(self):
+        loader, _, cur, payloads = self._loader(flush_rows=3)
+
+        loader.write([(1, "a"), (2, "b")])
+        assert cur.copy_expert.call_count == 0
+        loader.write([(3, None), (4, "d")])
+        assert cur.copy_expert.call_count == 1
+        loader.write([(5, "e")])
+        loader.finish()
+
+        assert cur.copy_expert.call_count == 2
+        assert payloads[0] == "1\ta\n2\tb\n3\t\\N\n4\td\n"
+        assert payloads[1] == "5\te\n"
+        assert loader.loaded == 5
+
+    def test_single_commit_per_table(self):
+        loader, conn, cur, _ = self._loader(flush_rows=1)
+        for i in range(5):
+            loader.write([(i, "x")])
+        loader.finish()
+
+        conn.commit.assert_called_once()
+        cur.close.assert_called_once()
+
+    def test_copy_statement_targets_table_columns(self):
+        loader, _, cur, _ = self._loader()
+        loader.write([(1, "a")])
+        loader.finish()
+
+        sql = cur.copy_expert.call_args[0][0]
+        assert sql == "COPY temp_staging.registration (id, status) FROM STDIN"
+
+    def test_abort_rolls_back(self):
+        loader, conn, cur, _ = self._loader()
+        loader.write([(1, "a")])
+        loader.abort()
+
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+        cur.copy_expert.assert_not_called()
+
+
+class TestInsertLoader:
+    """Tests for the execute_values fallback."""
+
+    def test_commits_every_batch(self):
+        conn = MagicMock()
+        loader = InsertLoader(conn, _cfg("insert"), "temp_staging", "city", ["id"])
+        with patch("loader.execute_values") as mock_ev:
+            loader.write([(1,), (2,), (3,)])
+            loader.finish()
+
+        assert mock_ev.call_count == 2
+        assert conn.commit.call_count == 2
+        assert loader.loaded == 3
+
+
+class TestMakeLoader:
+    """Tests for the loader factory."""
+
+    def test_copy_by_default(self):
+        assert isinstance(make_loader(MagicMock(), _cfg("copy"), "s", "t", ["id"]), CopyLoader)
+
+    def test_insert_fallback(self):
+        loader = make_loader(MagicMock(), _cfg("insert"), "s", "t", ["id"])
+        assert isinstance(loader, InsertLoader)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
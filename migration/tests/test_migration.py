@@ -12,7 +12,15 @@ from contextlib import contextmanager
 from config import Config
 from database import MariaDBMetrics
 from migrate import parse_args
-from sync import ensure_updated_at_trigger, ensure_company_indexes, analyze_tables
+from sync import (
+    ensure_updated_at_trigger,
+    ensure_company_indexes,
+    analyze_tables,
+    changed_range_ids,
+    merge_statement,
+    range_checksums,
+    sync_tables,
+)
 
 
 class TestConfig:
@@ -307,9 +315,11 @@ class TestIndexHelpers:
         cfg = Config()
         ensure_company_indexes(object(), cfg)
 
-        # We expect existence checks and create statements for 6 indexes (3 tables * 2 schemas)
+        # We expect existence checks and create statements for 7 indexes
+        # (3 tables * 2 schemas, plus the SIREN prefix index of staging)
         create_statements = [sql for sql in executed if "CREATE INDEX" in sql]
-        assert len(create_statements) == 6
+        assert len(create_statements) == 7
+        assert any("(left(siret, 9))" in sql for sql in create_statements)
         assert any("registration" in sql for sql in create_statements)
         assert any("billing" in sql for sql in create_statements)
 
@@ -409,6 +419,42 @@ class TestCleanupObsoleteCompanies:
         assert mock_conn.rollback.called
 
 
+class TestExtractionFilteredCleanup:
+    """Cleanups of rows already dropped by EXTRACTION_FILTERS are no-ops."""
+
+    def test_registry_covers_cleanup_rules(self):
+        from config import EXTRACTION_FILTERS
+
+        where, params = EXTRACTION_FILTERS["registration"]
+        for rule in ("apprentice_id IS NOT NULL", "option_id IS NOT NULL", "deleted_at IS NULL", "draft"):
+            assert rule in where
+        assert params == ("%double%", "2022-06-01")
+        assert EXTRACTION_FILTERS["apprentice"][1] == EXTRACTION_FILTERS["company"][1] == ("%temp%",)
+
+    def test_filtered_tables_not_cleaned(self):
+        from cleanup import cleanup_registration, cleanup_temp_apprentice_company
+
+        mock_conn = MagicMock()
+        cleanup_registration(mock_conn, Config())
+        cleanup_temp_apprentice_company(mock_conn, Config())
+        mock_conn.cursor.assert_not_called()
+
+    def test_unfiltered_tables_still_cleaned(self):
+        from cleanup import cleanup_temp_apprentice_company
+
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 0
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        filters = {"apprentice": ("discr NOT LIKE %s", ("%temp%",))}
+
+        with patch.dict("cleanup.EXTRACTION_FILTERS", filters, clear=True):
+            cleanup_temp_apprentice_company(mock_conn, Config())
+
+        sql = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert len(sql) == 1 and "company WHERE discr LIKE" in sql[0]
+
+
 class TestSyncCorrectedSirets:
     """Tests for sync_corrected_sirets function."""
 
@@ -434,6 +480,27 @@ class TestSyncCorrectedSirets:
         assert mock_cursor.execute.called
         assert mock_conn.commit.called
 
+    def test_sync_corrected_sirets_is_set_based(self):
+        """A fixed number of statements, whatever the number of corrected SIRETs."""
+        from cleanup import sync_corrected_sirets
+
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (250,)
+        mock_cursor.rowcount = 250
+
+        with patch("cleanup.ensure_company_indexes") as ensure:
+            sync_corrected_sirets(mock_conn, Config())
+
+        ensure.assert_called_once()
+        statements = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert len(statements) == 6
+        assert "ROW_NUMBER() OVER" in statements[2]
+        assert "PARTITION BY left(sc.siret, 9)" in statements[2]
+        assert not any("LIMIT 1" in sql for sql in statements)
+        mock_conn.commit.assert_called_once()
+
     def test_sync_corrected_sirets_no_corrections(self):
         """Test when there are no corrected SIRETs."""
         from cleanup import sync_corrected_sirets
@@ -509,6 +576,46 @@ class TestCleanupStagingUnreferencedCompanies:
         assert mock_conn.commit.called
 
 
+class TestDeleteOrphans:
+    """Orphan ids are computed once, then deleted by chunks."""
+
+    def _conn(self, ids):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [(i,) for i in ids]
+        mock_cursor.rowcount = 2
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        return mock_conn, mock_cursor
+
+    def test_single_scan_then_chunked_deletes(self):
+        from cleanup import delete_orphans
+
+        mock_conn, mock_cursor = self._conn([1, 2, 5, 9, 10])
+        deleted = delete_orphans(
+            mock_conn, "rule", "temp_staging", "company", "c", "c.discr LIKE '%temp%'", 2
+        )
+
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        assert len(statements) == 4
+        assert statements[0][0].startswith("SELECT c.id FROM temp_staging.company c WHERE")
+        assert [args[1] for args in statements[1:]] == [(1, 2, [1, 2]), (5, 9, [5, 9]), (10, 10, [10])]
+        assert all("LIKE" not in args[0] for args in statements[1:])
+        assert deleted == 6
+        assert mock_conn.commit.call_count == 4
+
+    def test_recheck_escapes_condition(self):
+        from cleanup import delete_orphans
+
+        mock_conn, mock_cursor = self._conn([3])
+        delete_orphans(
+            mock_conn, "rule", "staging", "company", "c", "c.discr LIKE '%temp%'", 10,
+            recheck=True,
+        )
+
+        delete_sql = mock_cursor.execute.call_args_list[1][0][0]
+        assert "AND (c.discr LIKE '%%temp%%')" in delete_sql
+
+
 class TestCleanupUnreferencedTraining:
     """Tests for cleanup_unreferenced_training function."""
 
@@ -622,5 +729,90 @@ class TestCleanupUnreferencedRncp:
         assert mock_conn.rollback.called
 
 
+class TestSyncRangeDiff:
+    """Tests for the checksum-based range diff of sync_tables."""
+
+    def test_changed_range_ids(self):
+        source = {0: (10, "a"), 1: (10, "b"), 2: (3, "c")}
+        target = {0: (10, "a"), 1: (10, "x"), 3: (1, "d")}
+        assert changed_range_ids(source, target) == [1, 2, 3]
+
+    def test_range_checksums_query(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [(0, 10, "abc"), (1, 4, "def")]
+
+        ranges = range_checksums(cur, "staging", "deadline", "id", ["id", "label"], 1000)
+
+        sql = cur.execute.call_args[0][0]
+        assert "id / 1000 AS range_id" in sql
+        assert "md5(ROW(id, label)::text)" in sql
+        assert ranges == {0: (10, "abc"), 1: (4, "def")}
+
+    def _sync(self, source_rows, target_rows, table="deadline"):
+        """Runs sync_tables on one table with the given range checksums."""
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.__enter__.return_value = cur
+        cur.fetchall.side_effect = [target_rows, source_rows]
+        # (inserts, updates, deletes) returned by the merge statement
+        cur.fetchone.return_value = (2, 3, 5)
+        cfg = MagicMock(spec=Config)
+        cfg.pg_schema = "staging"
+        cfg.temp_schema = "temp_staging"
+        cfg.sync_chunk_size = 1000
+        cfg.migration_mode = "full"
+        with patch("sync.get_pg_columns", return_value=(["id", "label"], ["integer", "text"])):
+            stats = sync_tables(conn, cfg, [table])
+        calls = [c[0] for c in cur.execute.call_args_list]
+        log_params = [c[1] for c in calls if "INSERT INTO staging.update_log" in c[0]][0]
+        return stats[table], calls, log_params
+
+    def test_unchanged_table_is_not_rewritten(self):
+        rows = [(0, 1000, "a"), (1, 500, "b")]
+        stats, calls, log_params = self._sync(rows, rows)
+
+        assert stats == {"inserts": 0, "updates": 0, "deletes": 0}
+        assert not any("INSERT INTO staging.deadline" in c[0] for c in calls)
+        assert not any("DELETE" in c[0] for c in calls)
+        assert not any("COUNT(*) FROM staging.deadline" in c[0] for c in calls)
+        # final_count is derived from the range counts
+        assert log_params[5] == 1500
+
+    def test_only_differing_ranges_are_synced(self):
+        stats, calls, log_params = self._sync(
+            [(0, 1000, "a"), (1, 502, "new")], [(0, 1000, "a"), (1, 500, "b")]
+        )
+
+        merge = [c for c in calls if "INSERT INTO staging.deadline" in c[0]]
+        assert len(merge) == 1
+        sql, params = merge[0]
+        assert "WHERE t.id / 1000 = ANY(%(ranges)s)" in sql
+        assert "s.id / 1000 = ANY(%(ranges)s)" in sql
+        assert params == {"ranges": [1]}
+        # Counts come from the RETURNING clause of the single statement
+        assert stats == {"inserts": 2, "updates": 3, "deletes": 5}
+        assert log_params[5] == 1500 + 2 - 5
+        assert not any("COUNT(*) FROM staging.deadline" in c[0] for c in calls)
+
+    def test_merge_statement_uses_anti_join(self):
+        cfg = MagicMock(spec=Config)
+        cfg.pg_schema = "staging"
+        cfg.temp_schema = "temp_staging"
+        sql = merge_statement(cfg, "deadline", "id", ["id", "label", "updated_at"], "", "true")
+
+        assert "NOT IN" not in sql
+        assert "NOT EXISTS (SELECT 1 FROM temp_staging.deadline t WHERE t.id = s.id)" in sql
+        assert "RETURNING (xmax = 0) AS inserted" in sql
+        assert "staging.deadline.updated_at < excluded.updated_at" in sql
+
+    def test_dimension_table_is_never_purged(self):
+        stats, calls, _ = self._sync(
+            [(0, 10, "new")], [(0, 10, "old")], table="degree_level"
+        )
+        merge = [c[0] for c in calls if "INSERT INTO staging.degree_level" in c[0]][0]
+        assert "DELETE" not in merge
+        assert "IS DISTINCT FROM" in merge
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Tests for the extraction strategies of migration_core.
+
+The benchmark tests use an in-memory MariaDB double that counts the rows the
+engine has to read for each page: LIMIT/OFFSET reads every row before the
+offset, while a keyset page is an index range seek. This makes the scaling
+behaviour of each strategy measurable without a real database.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from config import Config
+import migration_core
+from migration_core import combine_predicates, iter_table_batches, run_migration
+
+
+@pytest.fixture(autouse=True)
+def no_extraction_filters():
+    """The fake MariaDB tables lack the columns of the real extraction filters."""
+    with patch.dict("migration_core.EXTRACTION_FILTERS", clear=True):
+        yield
+
+
+class FakeMariaCursor:
+    """MariaDB cursor double serving rows from a list sorted by id."""
+
+    def __init__(self, db: "FakeMariaDB", unbuffered: bool = False) -> None:
+        self.db = db
+        self.unbuffered = unbuffered
+        self._rows: list = []
+        self._pos = 0
+
+    def __enter__(self) -> "FakeMariaCursor":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.db.open_cursors -= 1
+
+    def execute(self, sql: str, params=None) -> None:
+        self.db.queries.append(sql)
+        data = self.db.rows
+        if sql.startswith("SHOW COLUMNS"):
+            self._rows = [(c,) for c in self.db.columns]
+        elif sql.startswith("SELECT COUNT(*)"):
+            self._rows = [(len(data),)]
+        elif "OFFSET" in sql:
+            limit, offset = params
+            self.db.scanned += min(len(data), offset + limit)
+            self._rows = data[offset:offset + limit]
+        elif "WHERE id >" in sql:
+            # Keyset page, or unpaged delta extraction (WHERE id > mark)
+            last_id, limit = params if len(params) == 2 else (params[0], len(data))
+            start = next((i for i, r in enumerate(data) if r[0] > last_id), len(data))
+            self._rows = data[start:start + limit]
+            self.db.scanned += len(self._rows)
+        elif re.search(r"ORDER BY id LIMIT", sql):
+            self._rows = data[:params[0]]
+            self.db.scanned += len(self._rows)
+        else:
+            self._rows = list(data)
+            self.db.scanned += len(data)
+        self._pos = 0
+
+    def fetchall(self) -> list:
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchmany(self, size: int) -> list:
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+
+class FakeMariaDB:
+    """MariaDB connection double recording queries and scanned rows."""
+
+    def __init__(self, size: int) -> None:
+        self.columns = ["id", "status"]
+        self.rows = [(i, f"status_{i % 3}") for i in range(1, size + 1)]
+        self.queries: list = []
+        self.scanned = 0
+        self.open_cursors = 0
+        self.cursor_classes: list = []
+
+    def cursor(self, cursor_class=None) -> FakeMariaCursor:
+        self.open_cursors += 1
+        self.cursor_classes.append(cursor_class)
+        return FakeMariaCursor(self, unbuffered=cursor_class is not None)
+
+
+def _cfg(method: str) -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.extract_method = method
+    cfg.load_method = "insert"
+    cfg.migration_workers = 1
+    cfg.use_pg_pool = False
+    cfg.batch_size = 100
+    cfg.pg_schema = "staging"
+    cfg.temp_schema = "temp_staging"
+    return cfg
+
+
+def _drain(db: FakeMariaDB, method: str, batch_size: int) -> list:
+    batches = iter_table_batches(
+        db, _cfg(method), "registration", ["id", "status"], batch_size, len(db.rows)
+    )
+    return [row for batch in batches for row in batch]
+
+
+class TestIterTableBatches:
+    """Tests for the extraction strategies."""
+
+    @pytest.mark.parametrize("method", ["keyset", "stream", "offset"])
+    def test_all_rows_extracted_once(self, method):
+        """Every strategy returns each row exactly once, in key order."""
+        db = FakeMariaDB(2050)
+        rows = _drain(db, method, 500)
+        assert [r[0] for r in rows] == list(range(1, 2051))
+
+    def test_keyset_uses_primary_key_predicate(self):
+        """Keyset pages filter on the last key instead of an offset."""
+        db = FakeMariaDB(1000)
+        _drain(db, "keyset", 400)
+        assert not any("OFFSET" in q for q in db.queries)
+        assert sum("WHERE id > %s" in q for q in db.queries) == 2
+
+    def test_keyset_falls_back_without_key_column(self):
+        """Keyset extraction needs the key among the selected columns."""
+        db = FakeMariaDB(300)
+        batches = iter_table_batches(
+            db, _cfg("keyset"), "registration", ["status"], 100, 300
+        )
+        list(batches)
+        assert all("OFFSET" in q for q in db.queries)
+
+    def test_stream_issues_single_query_with_server_side_cursor(self):
+        """Streaming reads the whole table through one unbuffered query."""
+        import pymysql
+
+        db = FakeMariaDB(1000)
+        _drain(db, "stream", 100)
+        assert len(db.queries) == 1
+        assert db.cursor_classes == [pymysql.cursors.SSCursor]
+
+    def test_stream_cursor_closed_when_consumer_stops(self):
+        """Closing the generator early releases the server-side cursor."""
+        db = FakeMariaDB(1000)
+        batches = iter_table_batches(
+            db, _cfg("stream"), "registration", ["id", "status"], 100, 1000
+        )
+        next(batches)
+        batches.close()
+        assert db.open_cursors == 0
+
+
+class TestExtractionBenchmark:
+    """Rows read by the engine per extracted row as the table grows."""
+
+    SIZES = (10_000, 20_000, 40_000, 80_000)
+    BATCH = 1_000
+
+    def _read_amplification(self, method: str) -> list:
+        ratios = []
+        for size in self.SIZES:
+            db = FakeMariaDB(size)
+            _drain(db, method, self.BATCH)
+            ratios.append(db.scanned / size)
+        return ratios
+
+    def test_keyset_cost_per_row_is_flat(self):
+        """Keyset reads each row once whatever the table size."""
+        assert self._read_amplification("keyset") == [1.0] * len(self.SIZES)
+
+    def test_stream_cost_per_row_is_flat(self):
+        """Streaming reads each row once whatever the table size."""
+        assert self._read_amplification("stream") == [1.0] * len(self.SIZES)
+
+    def test_offset_cost_per_row_grows_with_table(self):
+        """LIMIT/OFFSET amplification grows linearly, i.e. quadratic total cost."""
+        ratios = self._read_amplification("offset")
+        assert ratios == sorted(ratios)
+        # Doubling the table roughly doubles the work per row
+        assert ratios[-1] / ratios[0] > 6
+
+
+class TestRunMigrationExtraction:
+    """run_migration feeds extracted batches straight to the writer."""
+
+    def test_large_table_rows_reach_writer(self):
+        db = FakeMariaDB(2500)
+        cfg = _cfg("keyset")
+
+        pg_cursor = MagicMock()
+        pg_cursor.fetchall.return_value = [("id", "integer"), ("status", "text")]
+        pg_cursor.fetchone.return_value = (2500,)
+        conn_pg = MagicMock()
+        conn_pg.cursor.return_value = pg_cursor
+        pg_cursor.__enter__.return_value = pg_cursor
+
+        written = []
+        with patch(
+            "loader.execute_values",
+            side_effect=lambda cur, sql, rows: written.extend(rows),
+        ):
+            stats = run_migration(db, conn_pg, cfg, ["registration"], mode="live")
+
+        assert len(written) == 2500
+        assert written[0] == (1, "status_1")
+        assert stats["registration"]["inserted"] == 2500
+        assert not any("OFFSET" in q for q in db.queries)
+
+    def test_copy_loader_commits_once_per_table(self):
+        db = FakeMariaDB(2500)
+        cfg = _cfg("keyset")
+        cfg.load_method = "copy"
+
+        pg_cursor = MagicMock()
+        pg_cursor.fetchall.return_value = [("id", "integer"), ("status", "text")]
+        pg_cursor.fetchone.return_value = (2500,)
+        conn_pg = MagicMock()
+        conn_pg.cursor.return_value = pg_cursor
+        pg_cursor.__enter__.return_value = pg_cursor
+
+        copied = []
+        pg_cursor.copy_expert.side_effect = lambda sql, buf: copied.extend(
+            buf.read().splitlines()
+        )
+        stats = run_migration(db, conn_pg, cfg, ["registration"], mode="live")
+
+        assert len(copied) == 2500
+        assert stats["registration"]["inserted"] == 2500
+        # One commit for the table load, one for the migration_table_log row
+        assert conn_pg.commit.call_count == 2
+
+
+class TestExtractionFilters:
+    """EXTRACTION_FILTERS are pushed down into the MariaDB SELECT."""
+
+    def _pg(self) -> MagicMock:
+        pg_cursor = MagicMock()
+        pg_cursor.fetchall.return_value = [("id", "integer"), ("status", "text")]
+        pg_cursor.fetchone.return_value = (50,)
+        pg_cursor.__enter__.return_value = pg_cursor
+        conn_pg = MagicMock()
+        conn_pg.cursor.return_value = pg_cursor
+        return conn_pg
+
+    def test_combine_predicates(self):
+        where, params = combine_predicates(("a = %s OR b", (1,)), ("", ()), ("c > %s", (2,)))
+        assert where == "(a = %s OR b) AND (c > %s)"
+        assert params == (1, 2)
+        assert combine_predicates(("", ()), ("id > %s", (3,))) == ("id > %s", (3,))
+
+    def test_filter_in_select(self):
+        db = FakeMariaDB(50)
+        filters = {"registration": ("status NOT LIKE %s", ("%double%",))}
+        with patch.dict("migration_core.EXTRACTION_FILTERS", filters), patch(
+            "loader.execute_values"
+        ):
+            run_migration(db, self._pg(), _cfg("keyset"), ["registration"], mode="live")
+
+        select = [q for q in db.queries if q.startswith("SELECT id, status")]
+        assert select == ["SELECT id, status FROM registration WHERE (status NOT LIKE %s)"]
+
+
+class TestParallelMigration:
+    """run_migration with MIGRATION_WORKERS > 1."""
+
+    TABLES = ["company", "apprentice", "registration", "deadline"]
+
+    def _pg(self, size: int) -> MagicMock:
+        pg_cursor = MagicMock()
+        pg_cursor.fetchall.return_value = [("id", "integer"), ("status", "text")]
+        pg_cursor.fetchone.return_value = (size,)
+        pg_cursor.__enter__.return_value = pg_cursor
+        conn_pg = MagicMock()
+        conn_pg.cursor.return_value = pg_cursor
+        return conn_pg
+
+    def _run(self, workers: int):
+        """Migrates TABLES and returns (stats, rows written, log rows)."""
+        cfg = _cfg("keyset")
+        cfg.migration_workers = workers
+        written = []
+        log_rows = []
+        lock = threading.Lock()
+        pg_conns = []
+
+        @contextmanager
+        def fake_maria(_cfg):
+            yield FakeMariaDB(250)
+
+        @contextmanager
+        def fake_pg(_cfg):
+            conn = self._pg(250)
+            pg_conns.append(conn)
+            yield conn
+
+        def fake_execute_values(cur, sql, rows):
+            with lock:
+                written.extend((sql.split()[2], r) for r in rows)
+
+        with patch("migration_core.mariadb_connection", fake_maria), patch(
+            "migration_core.postgres_connection", fake_pg
+        ), patch("loader.execute_values", side_effect=fake_execute_values):
+            main_pg = self._pg(250)
+            pg_conns.append(main_pg)
+            stats = run_migration(
+                FakeMariaDB(250), main_pg, cfg, self.TABLES, mode="live"
+            )
+
+        for conn in pg_conns:
+            for call in conn.cursor.return_value.execute.call_args_list:
+                if "migration_table_log" in call[0][0]:
+                    log_rows.append(call[0][1][:6])
+        return stats, written, log_rows
+
+    def test_same_stats_and_log_rows_as_sequential(self):
+        seq_stats, seq_written, seq_logs = self._run(workers=1)
+        par_stats, par_written, par_logs = self._run(workers=3)
+
+        strip = lambda st: {t: {k: v for k, v in s.items() if not k.endswith("_s")} for t, s in st.items()}
+        assert strip(par_stats) == strip(seq_stats)
+        # Statistics keep the TABLE_ORDER order whatever the completion order
+        assert list(par_stats) == ["company", "apprentice", "registration", "deadline"]
+        assert sorted(par_written) == sorted(seq_written)
+        assert sorted(par_logs) == sorted(seq_logs)
+        assert len(par_logs) == len(self.TABLES)
+
+    def _schedule(self, dependencies: dict, workers: int = 4) -> list:
+        """Runs a parallel migration with a stub table step and records events."""
+        events = []
+        lock = threading.Lock()
+
+        def fake_migrate_table(conn_maria, conn_pg, cfg, table, *args):
+            with lock:
+                events.append(("start", table))
+            time.sleep(0.05)
+            with lock:
+                events.append(("end", table))
+            return {"processed": 1, "inserted": 1, "final": 1, "time_s": 0.05}
+
+        @contextmanager
+        def fake_conn(_cfg):
+            yield MagicMock()
+
+        cfg = _cfg("keyset")
+        cfg.migration_workers = workers
+        with patch("migration_core._migrate_table", fake_migrate_table), patch(
+            "migration_core.mariadb_connection", fake_conn
+        ), patch("migration_core.postgres_connection", fake_conn), patch.dict(
+            migration_core.MIGRATION_DEPENDENCIES, dependencies, clear=True
+        ):
+            stats = run_migration(FakeMariaDB(10), MagicMock(), cfg, self.TABLES, "live")
+
+        assert set(stats) == set(self.TABLES)
+        return events
+
+    def test_independent_tables_run_concurrently(self):
+        events = self._schedule({})
+        # Every table starts before the first one ends
+        assert [e[0] for e in events[:4]] == ["start"] * 4
+
+    def test_dependencies_are_honored(self):
+        events = self._schedule({"registration": ("apprentice", "company")})
+        pos = {e: i for i, e in enumerate(events)}
+        assert pos[("start", "registration")] > pos[("end", "apprentice")]
+        assert pos[("start", "registration")] > pos[("end", "company")]
+
+    def test_dependency_cycle_is_rejected(self):
+        with pytest.raises(ValueError, match="Circular"):
+            self._schedule({"company": ("deadline",), "deadline": ("company",)})
+
+    def test_connection_failure_fails_only_its_table(self):
+        def fake_migrate_table(conn_maria, conn_pg, cfg, table, *args):
+            return {"processed": 1, "inserted": 1, "final": 1, "time_s": 0.0}
+
+        @contextmanager
+        def fake_maria(_cfg):
+            yield MagicMock()
+
+        @contextmanager
+        def fake_pg(_cfg):
+            # The first worker connection fails, e.g. the server is restarting
+            with lock:
+                fail = not opened
+                opened.append(True)
+            if fail:
+                raise psycopg2.OperationalError("connection refused")
+            yield MagicMock()
+
+        lock = threading.Lock()
+        opened: list = []
+        cfg = _cfg("keyset")
+        cfg.migration_workers = 2
+        with patch("migration_core._migrate_table", fake_migrate_table), patch(
+            "migration_core.mariadb_connection", fake_maria
+        ), patch("migration_core.postgres_connection", fake_pg), patch.dict(
+            migration_core.MIGRATION_DEPENDENCIES, {}, clear=True
+        ):
+            stats = run_migration(FakeMariaDB(10), MagicMock(), cfg, self.TABLES, "live")
+
+        # The other tables are still migrated and reported
+        assert len(stats) == len(self.TABLES) - 1
+
+    def test_workers_capped_by_pg_pool(self):
+        cfg = _cfg("keyset")
+        cfg.migration_workers = 8
+        cfg.use_pg_pool = True
+        cfg.pg_pool_max = 2
+        with patch("migration_core._migrate_table", return_value=None) as mock_table, patch(
+            "migration_core._migrate_tables_parallel"
+        ) as mock_parallel:
+            run_migration(FakeMariaDB(10), MagicMock(), cfg, self.TABLES, "live")
+
+        # A single pooled connection left for workers: sequential migration
+        mock_parallel.assert_not_called()
+        assert mock_table.call_count == len(self.TABLES)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -3,7 +3,16 @@
 Tests for OPCO enrichment Tabular API helpers.
 """
 
-from api_enrichment import get_opco_by_siret, get_opco_by_siren
+import io
+from unittest.mock import MagicMock, patch
+
+from api_enrichment import (
+    _iter_opco_csv_rows,
+    enrich_companies_with_opco_from_index,
+    get_opco_by_siret,
+    get_opco_by_siren,
+    refresh_opco_index,
+)
 
 
 class DummyResponse:
@@ -49,3 +58,94 @@ def test_get_opco_by_siren_prefers_most_common_and_uppercase_field():
 
     assert client.calls[0]["params"]["SIRET__contains"] == "123456789"
     assert opco == "OPCO 2I"
+
+
+class StreamedResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.raw = io.BytesIO(body)
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+OPCO_CSV = (
+    "\ufeffSIRET;OPCO_PROPRIETAIRE;OPCO_GESTION\n"
+    "49444152000017;OPCO2I;\n"
+    "49444152000025;;AKTO\n"
+    "not-a-siret;AKTO;\n"
+    "12345678900011;;\n"
+).encode("utf-8")
+
+
+def _opco_cfg():
+    cfg = MagicMock()
+    cfg.pg_schema = "staging"
+    cfg.opco_resource_id = "res-1"
+    return cfg
+
+
+def test_opco_csv_rows_are_normalized_and_filtered():
+    rows = list(_iter_opco_csv_rows(StreamedResponse(200, OPCO_CSV)))
+
+    assert rows == [
+        ("49444152000017", "494441520", "OPCO 2I"),
+        ("49444152000025", "494441520", "AKTO"),
+    ]
+
+
+def test_refresh_skipped_when_resource_unchanged():
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.return_value = ('"etag-1"', "Wed, 01 Jan 2025 00:00:00 GMT", 1200)
+    client = MagicMock()
+    response = StreamedResponse(304)
+    client.request.return_value = response
+
+    with patch("api_enrichment.ensure_opco_index_tables"), patch("api_enrichment.CopyLoader") as loader:
+        assert refresh_opco_index(conn, _opco_cfg(), client) == 1200
+
+    headers = client.request.call_args[1]["headers"]
+    assert headers["If-None-Match"] == '"etag-1"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert client.request.call_args[1]["stream"] is True
+    loader.assert_not_called()
+    assert response.closed
+
+
+def test_refresh_bulk_loads_resource_and_stores_etag():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.return_value = None
+    client = MagicMock()
+    client.request.return_value = StreamedResponse(200, OPCO_CSV, {"ETag": '"etag-2"'})
+
+    with patch("api_enrichment.ensure_opco_index_tables"), patch("api_enrichment.CopyLoader") as loader_cls:
+        loader = loader_cls.return_value
+        assert refresh_opco_index(conn, _opco_cfg(), client) == 2
+
+    written = [row for call in loader.write.call_args_list for row in call[0][0]]
+    assert len(written) == 2
+    statements = [c[0] for c in loader.cur.execute.call_args_list]
+    assert statements[0][0] == "TRUNCATE staging.opco_siret_ref"
+    assert statements[1][1] == ("res-1", '"etag-2"', None, 2)
+    loader.finish.assert_called_once()
+
+
+def test_enrichment_from_index_is_one_statement():
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.return_value = (10, 7)
+
+    with patch("api_enrichment.ensure_opco_table"), patch(
+        "api_enrichment.add_opco_fk_to_company", return_value=True
+    ):
+        stats = enrich_companies_with_opco_from_index(conn, _opco_cfg())
+
+    assert stats == {"total": 10, "updated": 7, "not_found": 3, "errors": 0}
+    sql = cur.execute.call_args[0][0]
+    assert "JOIN staging.opco_siret_ref r ON r.siret = t.siret" in sql
+    assert "ORDER BY t.id, COUNT(*) DESC" in sql
+    assert "c.opco_id IS NULL" in sql
+    assert cur.execute.call_count == 1
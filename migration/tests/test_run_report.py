@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for the run report and the PostgreSQL statement timings.
+"""
+
+import json
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import database
+from config import Config
+from database import PostgresMetrics, TimedCursor
+from run_report import RunReport, finish_run_report, get_run_report, start_run_report
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cfg(tmp_path) -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.pg_schema = "staging"
+    cfg.run_report_dir = str(tmp_path / "reports")
+    return cfg
+
+
+def _stats(rows: int, seconds: float) -> dict:
+    return {
+        "processed": rows, "inserted": rows, "final": rows, "time_s": seconds,
+        "extract_s": seconds / 2, "convert_s": seconds / 4, "load_s": seconds / 4,
+        "rows_per_s": rows / seconds,
+    }
+
+
+@pytest.fixture(autouse=True)
+def no_db_metrics():
+    with patch("run_report.get_mariadb_metrics", return_value=None), patch(
+        "run_report.get_postgres_metrics", return_value=None
+    ):
+        yield
+
+
+class TestRunReport:
+    """Phase wall times, table throughput and API latencies."""
+
+    def test_phases_and_tables(self):
+        clock = FakeClock()
+        report = RunReport("full", "full", clock=clock)
+        with report.phase("migrate"):
+            clock.now += 12
+        with report.phase("cleanup"):
+            clock.now += 3
+        report.add_tables({"company": _stats(1000, 4.0), "registration": _stats(3000, 8.0)})
+        report.add_api_metrics("company", {"requests": 5, "latency_percentiles_ms": {"p50": 80.0}})
+        report.finish(success=True)
+
+        data = report.as_dict()
+
+        assert data["duration_s"] == 15
+        assert data["phases_s"] == {"migrate": 12, "cleanup": 3}
+        assert data["table_phases_s"] == {"extract": 6.0, "convert": 3.0, "load": 3.0}
+        assert data["rows_total"] == 4000
+        assert data["tables"]["registration"]["rows_per_s"] == 375.0
+        assert data["api"]["company"]["latency_percentiles_ms"] == {"p50": 80.0}
+        assert data["success"] is True
+
+    def test_query_parameters_not_reported(self):
+        maria = MagicMock()
+        maria.summary.return_value = {"total_queries": 1, "slow_queries": [{"params": "12345678900011"}]}
+        pg = PostgresMetrics(slow_ms=0)
+        pg.record("UPDATE staging.company SET siret = %s WHERE id = %s", ("12345678900011", 1), 0.5)
+        with patch("run_report.get_mariadb_metrics", return_value=maria), patch(
+            "run_report.get_postgres_metrics", return_value=pg
+        ):
+            data = RunReport("full", "full").as_dict()
+
+        assert "slow_queries" not in data["mariadb"]
+        assert "12345678900011" not in json.dumps(data)
+        assert data["postgres"]["top_statements"][0]["count"] == 1
+
+    def test_json_files_pruned(self, tmp_path):
+        with patch("run_report.RUN_REPORTS_KEPT", 2):
+            for day in range(1, 5):
+                report = RunReport("full", "full")
+                report.started_at = report.started_at.replace(day=day)
+                report.write_json(str(tmp_path))
+
+        assert sorted(p.name[:12] for p in tmp_path.glob("run_*.json")) == [
+            f"run_{report.started_at:%Y%m}03", f"run_{report.started_at:%Y%m}04"
+        ]
+
+    def test_stored_in_metrics_table(self):
+        cur = MagicMock()
+
+        @contextmanager
+        def fake_transaction(conn):
+            yield cur
+
+        report = RunReport("sync", "incremental")
+        report.finish(success=False, error="connection lost")
+        cfg = MagicMock(spec=Config)
+        cfg.pg_schema = "staging"
+        with patch("run_report.transaction", fake_transaction):
+            report.store(MagicMock(), cfg)
+
+        create, insert = cur.execute.call_args_list
+        assert "CREATE TABLE IF NOT EXISTS staging.migration_run_metrics" in create[0][0]
+        params = insert[0][1]
+        assert params[2:5] == ("sync", "incremental", False)
+        assert json.loads(params[8])["error"] == "connection lost"
+
+    def test_failed_cycle_still_reported(self, tmp_path):
+        report = start_run_report("full", "full")
+        assert get_run_report() is report
+        with patch("run_report.postgres_connection", side_effect=RuntimeError("down")):
+            finish_run_report(report, _cfg(tmp_path), success=False, error="boom")
+
+        assert get_run_report() is None
+        written = json.loads(next((tmp_path / "reports").glob("run_*.json")).read_text())
+        assert written["success"] is False
+        assert written["error"] == "boom"
+
+    def test_dry_run_not_stored(self, tmp_path):
+        report = start_run_report("migrate", "full", dry_run=True)
+        with patch("run_report.postgres_connection") as connection:
+            finish_run_report(report, _cfg(tmp_path), success=True)
+        connection.assert_not_called()
+
+
+class TestPostgresMetrics:
+    """Statements grouped without their VALUES, timed by TimedCursor."""
+
+    def test_values_list_cut(self):
+        sql = b"INSERT INTO temp.company (id, siret) VALUES (1,'12345678900011'),(2,'98765432100015')"
+        assert PostgresMetrics.statement(sql) == "INSERT INTO temp.company (id, siret) VALUES ..."
+
+    def test_statements_grouped(self):
+        metrics = PostgresMetrics(slow_ms=10_000)
+        for page in range(3):
+            metrics.record(f"INSERT INTO t (a) VALUES ({page})", None, 0.1)
+        metrics.record("DELETE FROM t WHERE id = ANY(%s)", None, 0.5)
+
+        top = metrics.top_statements()
+
+        assert [e["count"] for e in top] == [1, 3]
+        assert top[0]["statement"] == "DELETE FROM t WHERE id = ANY(%s)"
+        assert metrics.summary()["by_op"]["INSERT"]["count"] == 3
+
+    def test_timed_cursor_records_when_enabled(self):
+        metrics = PostgresMetrics(slow_ms=10_000)
+        method = MagicMock(return_value="done")
+        with patch.object(database, "_pg_metrics", metrics):
+            assert TimedCursor._timed(None, method, "SELECT 1", None) == "done"
+        with patch.object(database, "_pg_metrics", None):
+            TimedCursor._timed(None, method, "SELECT 2", None)
+
+        assert metrics.total_queries == 1
+        assert method.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
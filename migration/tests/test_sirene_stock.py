@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the local SIRENE stock index.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from config import Config, parse_departements
+from sirene_stock import SireneStock, build_index, load_sirene_stock
+from siret_correction import search_company_by_name_and_city, validate_siret_with_api
+
+HEADER = (
+    "siren,nic,siret,etablissementSiege,codePostalEtablissement,"
+    "libelleCommuneEtablissement,codeCommuneEtablissement,"
+    "activitePrincipaleEtablissement,etatAdministratifEtablissement,"
+    "enseigne1Etablissement,denominationUsuelleEtablissement,denominationUniteLegale"
+)
+ROWS = [
+    # siret, siege, postal code, city, commune, naf, state, sign, usual name, legal name
+    ("73282932000074", "true", "63000", "CLERMONT-FERRAND", "63113", "62.01Z", "A", "", "", "BOULANGERIE DUPONT"),
+    ("44306184100047", "false", "63000", "CLERMONT-FERRAND", "63113", "47.11F", "A", "DUPONT FRERES", "", ""),
+    ("35600000000048", "true", "43000", "LE PUY-EN-VELAY", "43157", "53.10Z", "F", "", "", "BOULANGERIE FERMEE"),
+    ("55208131766522", "true", "75008", "PARIS 8", "75108", "70.10Z", "A", "", "", "BOULANGERIE DUPONT"),
+]
+
+
+def _write_stock(tmp_path, rows=ROWS, delimiter=","):
+    path = tmp_path / "StockEtablissement.csv"
+    lines = [HEADER.replace(",", delimiter)]
+    for siret, siege, postal, city, commune, naf, etat, sign, usual, legal in rows:
+        lines.append(delimiter.join(
+            [siret[:9], siret[9:], siret, siege, postal, city, commune, naf, etat, sign, usual, legal]
+        ))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def stock(tmp_path):
+    opened = SireneStock.open(_write_stock(tmp_path), str(tmp_path / "index"), ("63", "43"))
+    yield opened
+    opened.close()
+
+
+class TestIndex:
+    """Sorted SIRET array, departement filter and rebuild on change."""
+
+    def test_find_by_binary_search(self, stock):
+        assert len(stock) == 3
+        record = stock.find("44306184100047")
+        assert record["name"] == "DUPONT FRERES"
+        assert record["city_code"] == "63113"
+        assert record["is_siege"] is False
+        assert stock.find("73282932000074")["name"] == "BOULANGERIE DUPONT"
+        assert stock.find("00000000000000") is None
+        assert stock.find("abc") is None
+
+    def test_departements_filtered(self, stock):
+        assert stock.find("55208131766522") is None
+        assert stock.covers("63113")
+        assert not stock.covers("75108")
+        assert not stock.covers(None)
+
+    def test_semicolon_export_and_unfiltered_stock(self, tmp_path):
+        stock = SireneStock.open(_write_stock(tmp_path, delimiter=";"), str(tmp_path / "index"))
+        assert len(stock) == 4
+        assert stock.covers(None)
+        stock.close()
+
+    def test_rebuilt_only_when_source_changes(self, tmp_path):
+        source = _write_stock(tmp_path)
+        index = str(tmp_path / "index")
+        SireneStock.open(source, index).close()
+        with patch("sirene_stock.build_index", wraps=build_index) as build:
+            SireneStock.open(source, index).close()
+            build.assert_not_called()
+            _write_stock(tmp_path, ROWS[:2])
+            stock = SireneStock.open(source, index)
+            build.assert_called_once()
+        assert len(stock) == 2
+        stock.close()
+
+    def test_parquet_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            build_index(str(tmp_path / "stock.parquet"), str(tmp_path / "index"))
+
+    def test_search_by_name_and_city(self, stock):
+        results = stock.search("Boulangerie Dupont SARL", "Clermont-Ferrand")
+        assert [r["siret"] for r in results] == ["73282932000074", "44306184100047"]
+        assert results[0]["is_siege"] is True
+        assert stock.search("Dupont", "Riom") == []
+        assert stock.search("SA", None) == []
+
+
+class TestLocalValidation:
+    """The API is only called when the stock cannot tell."""
+
+    def test_found_locally(self, stock):
+        client = MagicMock()
+        result = validate_siret_with_api("73282932000074", "Boulangerie Dupont", "63113", client, stock)
+        assert result["name_match_score"] == 2
+        assert result["city_match_score"] == 2
+        assert result["code_naf"] == "62.01Z"
+        client.request.assert_not_called()
+
+    def test_closed_or_missing_in_covered_departement(self, stock):
+        client = MagicMock()
+        assert validate_siret_with_api("35600000000048", None, "43157", client, stock) is None
+        assert validate_siret_with_api("00000000000000", None, "63113", client, stock) is None
+        client.request.assert_not_called()
+
+    def test_api_fallback_outside_stock(self, stock):
+        client = MagicMock()
+        client.request.return_value = None
+        assert validate_siret_with_api("55208131766522", None, "75108", client, stock) is None
+        client.request.assert_called_once()
+
+    def test_search_falls_back_to_api(self, stock):
+        client = MagicMock()
+        client.request.return_value = None
+        local = search_company_by_name_and_city("Dupont", "Clermont-Ferrand", None, client, stock)
+        assert len(local) == 2
+        client.request.assert_not_called()
+        assert search_company_by_name_and_city("Martin", "Riom", None, client, stock) == []
+        client.request.assert_called_once()
+
+
+class TestConfiguration:
+    """SIRENE_STOCK_FILE and SIRENE_DEPARTEMENTS."""
+
+    def test_parse_departements(self):
+        assert parse_departements(" 03, 15,2a ,974") == ("03", "15", "2A", "974")
+        assert parse_departements("") == ()
+        with pytest.raises(ValueError):
+            parse_departements("Auvergne")
+
+    def test_disabled_without_file(self):
+        cfg = MagicMock(spec=Config)
+        cfg.sirene_stock_file = ""
+        assert load_sirene_stock(cfg) is None
+
+    def test_unreadable_stock_disabled(self, tmp_path):
+        cfg = MagicMock(spec=Config)
+        cfg.sirene_stock_file = str(tmp_path / "missing.csv")
+        cfg.sirene_index_dir = str(tmp_path / "index")
+        cfg.sirene_departements = "63"
+        assert load_sirene_stock(cfg) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
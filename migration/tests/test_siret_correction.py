@@ -21,6 +21,8 @@ from siret_correction import (
     generate_luhn_valid_candidates,
     _normalize_city_name,
     correct_invalid_siret,
+    correct_invalid_sirets_batch,
+    get_companies_info_from_mariadb,
     write_correction_report,
 )
 
@@ -130,6 +132,21 @@ class TestGenerateLuhnValidCandidates:
         assert generate_luhn_valid_candidates("123") == []
         assert generate_luhn_valid_candidates("ABCDEFGHIJKLMN") == []
 
+    def test_matches_exhaustive_search(self):
+        """The contribution table finds exactly the Luhn-valid single-digit changes."""
+        for siret in ("39539439700023", "12345678901234", "00000000000001"):
+            expected = [
+                siret[:pos] + digit + siret[pos + 1:]
+                for pos in range(14)
+                for digit in "0123456789"
+                if digit != siret[pos] and is_valid_luhn(siret[:pos] + digit + siret[pos + 1:])
+            ]
+            assert generate_luhn_valid_candidates(siret) == expected
+
+    def test_valid_siret_has_no_candidate(self):
+        """A single digit change always breaks a valid Luhn sum."""
+        assert generate_luhn_valid_candidates("73282932000074") == []
+
     def test_no_duplicates(self):
         """Test that returned candidates have no duplicates."""
         candidates = generate_luhn_valid_candidates("39539439700023", max_distance=2)
@@ -318,3 +335,59 @@ class TestIntegration:
             assert "corrected_siret" in result
             assert "hamming_distance" in result
             assert result["original_siret"] == invalid_siret
+
+
+class TestBatchCorrection:
+    """Batch corrector: one lookup query, shared pool, early stop."""
+
+    def _maria(self, rows):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = rows
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return conn, cursor
+
+    def test_company_info_in_one_query(self):
+        rows = [
+            ("39539439700023", "OLD NAME", "63113", "CLERMONT", 0),
+            ("39539439700023", "OFFICIAL NAME", "63113", "CLERMONT", 1),
+            ("12345678901234", None, None, None, 1),
+        ]
+        conn, cursor = self._maria(rows)
+
+        infos = get_companies_info_from_mariadb(conn, ["39539439700023", "12345678901234"])
+
+        assert cursor.execute.call_count == 1
+        sql, params = cursor.execute.call_args[0]
+        assert "IN (%s, %s)" in sql
+        assert params == ("39539439700023", "12345678901234")
+        assert infos == {
+            "39539439700023": {"name": "OFFICIAL NAME", "city_code": "63113", "city_name": "CLERMONT"}
+        }
+
+    @patch("siret_correction.search_company_by_name_and_city", return_value=[])
+    @patch("siret_correction.validate_siret_with_api")
+    def test_strong_match_stops_validation(self, mock_validate, mock_search):
+        invalid = "39539439700023"
+        candidates = generate_luhn_valid_candidates(invalid)
+
+        def validate(siret, name, city_code, api_client, stock=None):
+            return {"name": "ACME", "city": "CLERMONT", "name_match_score": 1, "city_match_score": 2}
+
+        mock_validate.side_effect = validate
+        conn, _ = self._maria([(invalid, "ACME", "63113", "CLERMONT", 1)])
+
+        corrections, uncorrected = correct_invalid_sirets_batch(
+            [invalid, "00000000000001"], conn, Mock(), workers=1
+        )
+
+        # The first candidate is a strong match: the others are not validated
+        validated = [c[0][0] for c in mock_validate.call_args_list]
+        assert validated.count(candidates[0]) == 1
+        assert not set(validated) & set(candidates[1:])
+        assert [c["corrected_siret"] for c in corrections] == [
+            candidates[0], generate_luhn_valid_candidates("00000000000001")[0]
+        ]
+        assert corrections[0]["expected_name"] == "ACME"
+        assert uncorrected == []
+
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the temporary table profiles and the post-load index build.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from config import Config
+from temp_tables import build_temp_indexes, create_temp_tables, temp_index_plan
+
+
+def _cfg(profile: str = "unlogged", workers: int = 2) -> MagicMock:
+    cfg = MagicMock(spec=Config)
+    cfg.pg_schema = "staging"
+    cfg.temp_schema = "temp_staging"
+    cfg.temp_table_profile = profile
+    cfg.temp_index_workers = workers
+    cfg.temp_index_maintenance_work_mem = "512MB"
+    cfg.use_pg_pool = False
+    cfg.pg_pool_max = 5
+    return cfg
+
+
+def _executed(cur: MagicMock) -> list:
+    return [" ".join(c[0][0].split()) for c in cur.execute.call_args_list]
+
+
+class TestCreateTempTables:
+    """UNLOGGED tables without indexes, or the legacy exact copy."""
+
+    def _create(self, profile):
+        cur = MagicMock()
+
+        @contextmanager
+        def fake_transaction(conn):
+            yield cur
+
+        with patch("temp_tables.transaction", fake_transaction):
+            create_temp_tables(MagicMock(), _cfg(profile), ["company"])
+        return _executed(cur)
+
+    def test_unlogged_profile(self):
+        create = [s for s in self._create("unlogged") if s.startswith("CREATE")][0]
+        assert "CREATE UNLOGGED TABLE IF NOT EXISTS temp_staging.company" in create
+        assert "INCLUDING DEFAULTS" in create
+        assert "INCLUDING ALL" not in create
+
+    def test_logged_profile(self):
+        create = [s for s in self._create("logged") if s.startswith("CREATE")][0]
+        assert "CREATE TABLE IF NOT EXISTS temp_staging.company" in create
+        assert "INCLUDING ALL" in create
+
+
+class TestBuildTempIndexes:
+    """Only the indexes used by cleanup and sync, built per table in parallel."""
+
+    def test_plan_key_first_then_cleanup_columns(self):
+        plan = dict(temp_index_plan(["registration", "degree", "unknown"]))
+        assert plan["registration"] == ["id", "host_company_id", "option_id", "apprentice_id"]
+        assert plan["degree"] == ["id"]
+        assert "unknown" not in plan
+
+    def test_indexes_built_on_separate_connections(self):
+        cursors = []
+
+        @contextmanager
+        def fake_connection(cfg):
+            conn = MagicMock()
+            cursors.append(conn.cursor.return_value)
+            yield conn
+
+        with patch("temp_tables.postgres_connection", fake_connection):
+            built = build_temp_indexes(_cfg(), ["company", "registration"])
+
+        assert built == 6
+        assert len(cursors) == 2
+        statements = [s for cur in cursors for s in _executed(cur)]
+        # Raised for each transaction only: pooled connections keep their default
+        for cur in cursors:
+            executed = _executed(cur)
+            for i, sql in enumerate(executed):
+                if sql.startswith(("CREATE INDEX", "ANALYZE")):
+                    assert executed[i - 1] == (
+                        "SELECT set_config('maintenance_work_mem', %s, true)"
+                    )
+        assert not any("false)" in s for s in statements)
+        assert "CREATE INDEX IF NOT EXISTS company_siret_idx ON temp_staging.company (siret)" in statements
+        assert "ANALYZE temp_staging.registration" in statements
+
+    def test_failed_index_fails_the_build(self):
+        @contextmanager
+        def fake_connection(cfg):
+            conn = MagicMock()
+            cur = conn.cursor.return_value
+
+            def execute(sql, params=None):
+                if "(siret)" in sql:
+                    raise RuntimeError("column does not exist")
+
+            cur.execute.side_effect = execute
+            yield conn
+
+        with patch("temp_tables.postgres_connection", fake_connection):
+            with pytest.raises(RuntimeError, match="company"):
+                build_temp_indexes(_cfg(), ["company", "registration"])
+
+    def test_connection_failure_fails_the_build(self):
+        with patch("temp_tables.postgres_connection", side_effect=RuntimeError("pool exhausted")):
+            with pytest.raises(RuntimeError, match="company, registration"):
+                build_temp_indexes(_cfg(), ["company", "registration"])
+
+    def test_workers_capped_by_pool(self):
+        cfg = _cfg(workers=8)
+        cfg.use_pg_pool = True
+        cfg.pg_pool_max = 3
+        with patch("temp_tables.postgres_connection"), patch(
+            "temp_tables.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as executor:
+            build_temp_indexes(cfg, ["company", "registration", "degree", "billing"])
+        assert executor.call_args[1]["max_workers"] == 2
+
+    def test_logged_profile_builds_nothing(self):
+        with patch("temp_tables.postgres_connection") as connection:
+            assert build_temp_indexes(_cfg("logged"), ["company"]) == 0
+        connection.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
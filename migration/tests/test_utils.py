@@ -4,12 +4,16 @@ Tests for utilities (logger, API, etc.).
 """
 
 import pytest
+import asyncio
 import logging
 import os
 from unittest.mock import Mock, patch
 
+import requests
+
 from logger import setup_logger, setup_db_logger
-from api_client import RateLimitedAPI
+from api_client import ApiMetrics, RateLimitedAPI, TokenBucket, parse_retry_after
+from config import parse_host_rates
 
 
 class TestLogger:
@@ -104,6 +108,153 @@ class TestAPIClientRetry:
         assert "https://" in adapters
 
 
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Tests for the per-host token bucket."""
+
+    def test_burst_then_spacing(self):
+        """Reservations beyond the burst are spaced at the rate."""
+        bucket = TokenBucket(rate=10, capacity=3, clock=FakeClock())
+
+        waits = [round(bucket.reserve(), 3) for _ in range(5)]
+
+        assert waits == [0.0, 0.0, 0.0, 0.1, 0.2]
+
+    def test_refill_is_capped(self):
+        """An idle bucket never holds more than its capacity."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+        bucket.reserve()
+        bucket.reserve()
+        clock.now += 60
+
+        waits = [round(bucket.reserve(), 3) for _ in range(3)]
+
+        assert waits == [0.0, 0.0, 0.1]
+
+    def test_pause_delays_every_caller(self):
+        """A pause (Retry-After) postpones the next reservations."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=5, clock=clock)
+        bucket.pause(2.0)
+
+        waits = [round(bucket.reserve(), 3) for _ in range(3)]
+
+        assert waits == [2.0, 2.1, 2.2]
+
+
+class TestRateLimitedAPIBuckets:
+    """Tests for per-host budgets, Retry-After and counters."""
+
+    def _response(self, status, headers=None):
+        response = Mock()
+        response.status_code = status
+        response.headers = headers or {}
+        return response
+
+    def test_one_bucket_per_host(self):
+        """Hosts get separate buckets, with optional rate overrides."""
+        client = RateLimitedAPI(5, host_rates={"siret2idcc.fabrique.social.gouv.fr": 2})
+
+        search = client.bucket("https://recherche-entreprises.api.gouv.fr/search")
+        idcc = client.bucket("https://siret2idcc.fabrique.social.gouv.fr/api/v2/1")
+
+        assert search is client.bucket("https://recherche-entreprises.api.gouv.fr/other")
+        assert search is not idcc
+        assert search.rate == 5
+        assert idcc.rate == 2
+
+    @patch("api_client.time.sleep")
+    def test_retry_after_pauses_and_retries(self, mock_sleep):
+        """A 429 pauses the host for Retry-After, then the request is retried."""
+        client = RateLimitedAPI(requests_per_second=5)
+        client.session = Mock()
+        client.session.request.side_effect = [
+            self._response(429, {"Retry-After": "3"}),
+            self._response(200),
+        ]
+
+        result = client.request("GET", "https://api.example.com/test")
+
+        assert result.status_code == 200
+        assert client.session.request.call_count == 2
+        assert mock_sleep.call_args_list[-1][0][0] >= 2.9
+        metrics = client.metrics.snapshot()
+        assert metrics["requests"] == 2
+        assert metrics["throttled_responses"] == 1
+        assert metrics["retries"] == 1
+        assert sum(metrics["latency_ms"].values()) == 2
+
+    @patch("api_client.time.sleep")
+    def test_gives_up_after_retries(self, mock_sleep):
+        """The last 429 is returned once retries are exhausted."""
+        client = RateLimitedAPI(requests_per_second=5, retries=1)
+        client.session = Mock()
+        client.session.request.return_value = self._response(429)
+
+        result = client.request("GET", "https://api.example.com/test")
+
+        assert result.status_code == 429
+        assert client.session.request.call_count == 2
+
+    @patch("api_client.time.sleep")
+    def test_request_error_does_not_sleep(self, mock_sleep):
+        """A transport error returns None without a fixed pause."""
+        client = RateLimitedAPI(requests_per_second=5)
+        client.session = Mock()
+        client.session.request.side_effect = requests.exceptions.ConnectionError("down")
+
+        assert client.request("GET", "https://api.example.com/test") is None
+        mock_sleep.assert_not_called()
+        assert client.metrics.snapshot()["errors"] == 1
+
+    def test_async_request(self, mock_api_session, mock_api_response):
+        """arequest shares the client and returns the response."""
+        client = RateLimitedAPI(requests_per_second=5)
+        client.session = mock_api_session
+
+        result = asyncio.run(client.arequest("GET", "https://api.example.com/test"))
+
+        assert result == mock_api_response
+        assert client.metrics.snapshot()["requests"] == 1
+
+    def test_latency_percentiles(self):
+        """Nearest-rank percentiles of the recorded latencies."""
+        metrics = ApiMetrics()
+        for ms in range(1, 101):
+            metrics.record_latency(ms / 1000)
+
+        percentiles = metrics.snapshot()["latency_percentiles_ms"]
+
+        assert percentiles == {"p50": 50.0, "p90": 90.0, "p95": 95.0, "p99": 99.0}
+        assert ApiMetrics().percentiles() == {}
+
+    def test_parse_retry_after(self):
+        """Retry-After accepts seconds and HTTP dates."""
+        assert parse_retry_after("7") == 7.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_parse_host_rates(self):
+        """API_HOST_RATES is parsed into a host to rate mapping."""
+        assert parse_host_rates("") == {}
+        assert parse_host_rates("a.gouv.fr=2, B.gouv.fr=0.5") == {"a.gouv.fr": 2.0, "b.gouv.fr": 0.5}
+        with pytest.raises(ValueError):
+            parse_host_rates("a.gouv.fr")
+        with pytest.raises(ValueError):
+            parse_host_rates("a.gouv.fr=0")
+
+
 class TestNormalizeParisCommune:
     """Tests for Paris arrondissement normalization."""
 
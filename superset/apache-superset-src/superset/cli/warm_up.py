@@ -0,0 +1,162 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import click
+from flask import current_app, Flask
+from flask.cli import with_appcontext
+
+from superset.utils import json
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_chart(
+    app: Flask,
+    chart_id: int,
+    dashboard_id: Optional[int],
+    extra_filters: Optional[str],
+    username: Optional[str],
+) -> dict[str, Any]:
+    """
+    Compute one chart in-process, in its own application context (and thus its
+    own database session), as the given user.
+    """
+    # pylint: disable=import-outside-toplevel
+    from superset import security_manager
+    from superset.commands.chart.exceptions import WarmUpCacheChartNotFoundError
+    from superset.commands.chart.warm_up_cache import ChartWarmUpCacheCommand
+    from superset.utils.core import override_user
+
+    with app.app_context():
+        user = security_manager.find_user(username=username) if username else None
+        if user is None:
+            return {
+                "chart_id": chart_id,
+                "viz_error": "No user to run the chart queries",
+                "viz_status": None,
+            }
+        with override_user(user):
+            try:
+                return ChartWarmUpCacheCommand(
+                    chart_id, dashboard_id, extra_filters
+                ).run()
+            except WarmUpCacheChartNotFoundError:
+                return {
+                    "chart_id": chart_id,
+                    "viz_error": "Chart not found",
+                    "viz_status": None,
+                }
+
+
+def warm_up_charts(
+    app: Flask, tasks: list[dict[str, Any]], workers: int
+) -> list[dict[str, Any]]:
+    """
+    Warm up the charts of cache warm-up tasks on a bounded thread pool.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(
+                warm_up_chart,
+                app,
+                task["payload"]["chart_id"],
+                task["payload"].get("dashboard_id"),
+                task["payload"].get("extra_filters"),
+                task["username"],
+            )
+            for task in tasks
+        ]
+        return [future.result() for future in futures]
+
+
+@click.command()
+@with_appcontext
+@click.option(
+    "--top-n",
+    "-n",
+    default=10,
+    show_default=True,
+    help="Number of most viewed dashboards to warm up",
+)
+@click.option(
+    "--since",
+    "-s",
+    default="7 days ago",
+    show_default=True,
+    help="Rank the dashboards by their views since this date",
+)
+@click.option(
+    "--workers",
+    "-w",
+    default=4,
+    show_default=True,
+    help="Number of charts computed in parallel",
+)
+@click.option(
+    "--username",
+    "-u",
+    default=None,
+    help="Run every chart query as this user instead of CACHE_WARMUP_EXECUTORS",
+)
+def warm_up_cache(
+    top_n: int, since: str, workers: int, username: Optional[str]
+) -> None:
+    """Warm up the chart cache of the most viewed dashboards, without Celery"""
+    # pylint: disable=import-outside-toplevel
+    from superset.tasks.cache import TopNDashboardsStrategy
+    from superset.views.utils import get_dashboard_extra_filters
+
+    tasks = TopNDashboardsStrategy(top_n=top_n, since=since).get_tasks()
+    # The dashboard only changes the query of a chart through its default
+    # filters: a chart shown on several dashboards with the same filters has one
+    # cache key, so it is computed once
+    unique: dict[tuple[int, str], dict[str, Any]] = {}
+    for task in tasks:
+        payload = task["payload"]
+        dashboard_id = payload.get("dashboard_id")
+        filters = (
+            get_dashboard_extra_filters(payload["chart_id"], dashboard_id)
+            if dashboard_id
+            else []
+        )
+        payload["extra_filters"] = json.dumps(filters, sort_keys=True)
+        if username:
+            task["username"] = username
+        unique.setdefault((payload["chart_id"], payload["extra_filters"]), task)
+
+    click.secho(
+        f"Warming up {len(unique)} charts of the {top_n} most viewed dashboards",
+        fg="green",
+    )
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    results = warm_up_charts(app, list(unique.values()), workers)
+
+    failed = [result for result in results if result["viz_error"]]
+    for result in failed:
+        logger.warning(
+            "Chart %s was not warmed up: %s", result["chart_id"], result["viz_error"]
+        )
+    click.secho(
+        f"Warmed up {len(results) - len(failed)} charts, {len(failed)} failed",
+        fg="red" if failed else "green",
+    )
+    if results and len(failed) == len(results):
+        sys.exit(1)
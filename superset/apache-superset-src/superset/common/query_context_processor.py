@@ -20,6 +20,7 @@ import copy
 import logging
 import re
 from datetime import datetime
+from functools import partial
 from typing import Any, cast, ClassVar, TYPE_CHECKING, TypedDict
 
 import numpy as np
@@ -33,6 +34,7 @@ from superset.common.db_query_status import QueryStatus
 from superset.common.query_actions import get_query_results
 from superset.common.utils import dataframe_utils
 from superset.common.utils.query_cache_manager import QueryCacheManager
+from superset.common.utils.single_flight import single_flight
 from superset.common.utils.time_range_utils import (
     get_since_until_from_query_object,
     get_since_until_from_time_range,
@@ -125,6 +127,53 @@ class QueryContextProcessor:
     cache_type: ClassVar[str] = "df"
     enforce_numerical_metrics: ClassVar[bool] = True
 
+    def _load_query_result(
+        self,
+        query_obj: QueryObject,
+        cache: QueryCacheManager,
+        cache_key: str,
+        force_query: bool,
+    ) -> QueryCacheManager:
+        """Runs the query and stores its result in the data cache"""
+        try:
+            if invalid_columns := [
+                col
+                for col in get_column_names_from_columns(query_obj.columns)
+                + get_column_names_from_metrics(query_obj.metrics or [])
+                if (
+                    col not in self._qc_datasource.column_names
+                    and col != DTTM_ALIAS
+                )
+            ]:
+                raise QueryObjectValidationError(
+                    _(
+                        "Columns missing in dataset: %(invalid_columns)s",
+                        invalid_columns=invalid_columns,
+                    )
+                )
+
+            query_result = self.get_query_result(query_obj)
+            annotation_data = self.get_annotation_data(query_obj)
+            cache.set_query_result(
+                key=cache_key,
+                query_result=query_result,
+                annotation_data=annotation_data,
+                force_query=force_query,
+                timeout=self.get_cache_timeout(),
+                datasource_uid=self._qc_datasource.uid,
+                region=CacheRegion.DATA,
+            )
+        except QueryObjectValidationError as ex:
+            cache.error_message = str(ex)
+            cache.status = QueryStatus.FAILED
+        return cache
+
+    @staticmethod
+    def _get_loaded_cache(cache_key: str) -> QueryCacheManager | None:
+        """Returns the cached result of a query, if any"""
+        cache = QueryCacheManager.get(key=cache_key, region=CacheRegion.DATA)
+        return cache if cache.is_loaded else None
+
     def get_df_payload(
         self, query_obj: QueryObject, force_cached: bool | None = False
     ) -> dict[str, Any]:
@@ -145,37 +194,21 @@ class QueryContextProcessor:
         )
 
         if query_obj and cache_key and not cache.is_loaded:
-            try:
-                if invalid_columns := [
-                    col
-                    for col in get_column_names_from_columns(query_obj.columns)
-                    + get_column_names_from_metrics(query_obj.metrics or [])
-                    if (
-                        col not in self._qc_datasource.column_names
-                        and col != DTTM_ALIAS
-                    )
-                ]:
-                    raise QueryObjectValidationError(
-                        _(
-                            "Columns missing in dataset: %(invalid_columns)s",
-                            invalid_columns=invalid_columns,
-                        )
-                    )
-
-                query_result = self.get_query_result(query_obj)
-                annotation_data = self.get_annotation_data(query_obj)
-                cache.set_query_result(
-                    key=cache_key,
-                    query_result=query_result,
-                    annotation_data=annotation_data,
-                    force_query=force_query,
-                    timeout=self.get_cache_timeout(),
-                    datasource_uid=self._qc_datasource.uid,
-                    region=CacheRegion.DATA,
+            if force_query or not current_app.config["DATA_CACHE_SINGLE_FLIGHT"]:
+                self._load_query_result(query_obj, cache, cache_key, force_query)
+            else:
+                # Concurrent misses of the same key run the query only once
+                cache = single_flight(
+                    cache_key,
+                    compute=partial(
+                        self._load_query_result,
+                        query_obj,
+                        cache,
+                        cache_key,
+                        force_query,
+                    ),
+                    reload=partial(self._get_loaded_cache, cache_key),
                 )
-            except QueryObjectValidationError as ex:
-                cache.error_message = str(ex)
-                cache.status = QueryStatus.FAILED
 
         # the N-dimensional DataFrame has converted into flat DataFrame
         # by `flatten operator`, "comma" in the column is escaped by `escape_separator`
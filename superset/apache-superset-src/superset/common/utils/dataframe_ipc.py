@@ -0,0 +1,155 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+Arrow IPC serialization of the DataFrames stored in the data cache.
+
+Pickled object-dtype frames hold one Python object per cell, which makes them
+large and slow to load. An Arrow IPC stream stores each string column as one
+contiguous buffer, low-cardinality string columns can be dictionary-encoded,
+and the stream buffers can be compressed.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pandas import DataFrame, Series
+
+# Schema metadata listing the columns dictionary-encoded by ``serialize_df``, so
+# that they are decoded on read instead of coming back as pandas categoricals
+DICTIONARY_ENCODED_KEY = b"superset:dictionary_encoded"
+
+
+def _dictionary_encode(table: pa.Table, max_ratio: float) -> pa.Table:
+    if not table.num_rows:
+        return table
+
+    encoded: list[int] = []
+    for index, field in enumerate(table.schema):
+        if not _is_text(field.type):
+            continue
+        column = table.column(index)
+        if pc.count_distinct(column).as_py() <= max_ratio * table.num_rows:
+            table = table.set_column(index, field.name, column.dictionary_encode())
+            encoded.append(index)
+
+    if not encoded:
+        return table
+    metadata = {
+        **(table.schema.metadata or {}),
+        DICTIONARY_ENCODED_KEY: json.dumps(encoded).encode(),
+    }
+    # A stream carries one dictionary per column: share it across the chunks
+    return table.replace_schema_metadata(metadata).unify_dictionaries()
+
+
+def _is_text(type_: pa.DataType) -> bool:
+    return pa.types.is_string(type_) or pa.types.is_large_string(type_)
+
+
+def _take_object_columns(
+    table: pa.Table,
+) -> tuple[pa.Table, dict[int, pa.ChunkedArray]]:
+    """
+    Set aside the columns that pandas held as objects but that Arrow would bring
+    back with another dtype, e.g. integers with nulls as floats or timestamps as
+    ``datetime64``, which overflows outside of its range. ``SupersetResultSet``
+    builds such columns on purpose (``integer_object_nulls``,
+    ``timestamp_as_object``), so a cache hit must return them unchanged.
+    """
+    pandas_metadata = table.schema.pandas_metadata or {}
+    index_fields = {
+        name
+        for name in pandas_metadata.get("index_columns", [])
+        if isinstance(name, str)
+    }
+    objects: dict[int, pa.ChunkedArray] = {}
+    # Data columns come first in the schema, in the order of the DataFrame
+    for index, column in enumerate(pandas_metadata.get("columns", [])):
+        field = table.schema.field(index)
+        if (
+            column["field_name"] in index_fields
+            or column["numpy_type"] != "object"
+            or _is_text(field.type)
+        ):
+            continue
+        objects[index] = table.column(index)
+        # Converted separately below: skip it in the DataFrame conversion
+        table = table.set_column(index, field.name, pa.nulls(table.num_rows))
+    return table, objects
+
+
+def serialize_df(
+    df: DataFrame,
+    compression: str | None = None,
+    dictionary_ratio: float = 0.0,
+) -> bytes:
+    """
+    Serialize a DataFrame, including its index and dtypes, to an Arrow IPC stream.
+
+    :param df: The DataFrame to serialize
+    :param compression: The buffer compression, ``"zstd"``, ``"lz4"`` or ``None``
+    :param dictionary_ratio: String columns whose distinct values are at most
+        this ratio of the rows are dictionary-encoded
+    :returns: The IPC stream
+    :raises pyarrow.ArrowException: If a column cannot be converted to Arrow,
+        e.g. an object column mixing numbers and strings
+    """
+    table = pa.Table.from_pandas(df)
+    if dictionary_ratio > 0:
+        table = _dictionary_encode(table, dictionary_ratio)
+
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize_df(payload: bytes) -> DataFrame:
+    """
+    Read back a DataFrame serialized by ``serialize_df``, with the same dtypes.
+
+    The stream is read in place from ``payload``, without copying it, and the
+    Arrow memory of each column is released once it is converted. Numeric
+    columns are not converted zero-copy (``split_blocks``): the resulting NumPy
+    arrays would be read-only, and post-processing modifies frames in place.
+
+    :param payload: The IPC stream
+    :returns: The DataFrame
+    """
+    with pa.ipc.open_stream(pa.py_buffer(payload)) as reader:
+        table = reader.read_all()
+
+    metadata = table.schema.metadata or {}
+    if encoded := set(json.loads(metadata.get(DICTIONARY_ENCODED_KEY, b"[]"))):
+        schema = pa.schema(
+            [
+                field.with_type(field.type.value_type) if index in encoded else field
+                for index, field in enumerate(table.schema)
+            ],
+            metadata=metadata,
+        )
+        table = table.cast(schema)
+
+    table, objects = _take_object_columns(table)
+    df = table.to_pandas(self_destruct=True)
+    for index, column in objects.items():
+        df.isetitem(index, Series(column.to_pylist(), dtype=object).to_numpy())
+    return df
@@ -22,8 +22,10 @@ from typing import Any
 from flask import current_app
 from flask_caching import Cache
 from pandas import DataFrame
+from pyarrow import ArrowException
 
 from superset.common.db_query_status import QueryStatus
+from superset.common.utils.dataframe_ipc import deserialize_df, serialize_df
 from superset.constants import CacheRegion
 from superset.exceptions import CacheLoadError
 from superset.extensions import cache_manager
@@ -41,6 +43,29 @@ _cache: dict[CacheRegion, Cache] = {
 }
 
 
+def _cached_df(df: DataFrame) -> dict[str, Any]:
+    """
+    Return the cache value entries of a DataFrame: an Arrow IPC stream when
+    ``DATA_CACHE_ARROW_SERIALIZATION`` is enabled and the frame converts to
+    Arrow, the DataFrame itself otherwise
+    """
+    config = current_app.config
+    if not config["DATA_CACHE_ARROW_SERIALIZATION"]:
+        return {"df": df}
+    try:
+        payload = serialize_df(
+            df,
+            compression=config["DATA_CACHE_ARROW_COMPRESSION"],
+            dictionary_ratio=config["DATA_CACHE_ARROW_DICTIONARY_RATIO"],
+        )
+    except Exception:  # pylint: disable=broad-except
+        logger.debug("DataFrame cached without Arrow serialization", exc_info=True)
+        config["STATS_LOGGER"].incr("df_arrow_serialization_failed")
+        return {"df": df}
+    config["STATS_LOGGER"].gauge("df_arrow_payload_bytes", len(payload))
+    return {"df_arrow": payload}
+
+
 class QueryCacheManager:
     """
     Class for manage query-cache getting and setting
@@ -118,7 +143,6 @@ class QueryCacheManager:
                 self.is_loaded = True
 
             value = {
-                "df": self.df,
                 "query": self.query,
                 "applied_template_filters": self.applied_template_filters,
                 "applied_filter_columns": self.applied_filter_columns,
@@ -129,7 +153,7 @@ class QueryCacheManager:
             if self.is_loaded and key and self.status != QueryStatus.FAILED:
                 self.set(
                     key=key,
-                    value=value,
+                    value={**_cached_df(self.df), **value},
                     timeout=timeout,
                     datasource_uid=datasource_uid,
                     region=region,
@@ -160,7 +184,11 @@ class QueryCacheManager:
             logger.debug("Cache key: %s", key)
             current_app.config["STATS_LOGGER"].incr("loading_from_cache")
             try:
-                query_cache.df = cache_value["df"]
+                query_cache.df = (
+                    deserialize_df(cache_value["df_arrow"])
+                    if "df_arrow" in cache_value
+                    else cache_value["df"]
+                )
                 query_cache.query = cache_value["query"]
                 query_cache.annotation_data = cache_value.get("annotation_data", {})
                 query_cache.applied_template_filters = cache_value.get(
@@ -181,7 +209,7 @@ class QueryCacheManager:
                 )
                 query_cache.cache_value = cache_value
                 current_app.config["STATS_LOGGER"].incr("loaded_from_cache")
-            except KeyError as ex:
+            except (KeyError, ArrowException) as ex:
                 logger.exception(ex)
                 logger.error(
                     "Error reading cache: %s",
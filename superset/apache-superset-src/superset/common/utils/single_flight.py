@@ -0,0 +1,136 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+Single-flight execution of identical chart queries.
+
+When a popular dashboard opens on a cold cache, several requests miss the same
+cache key at once. Only one of them (the leader) runs the query; the others wait
+for it and then read the result from the cache:
+
+- within a process, followers wait on the leader's in-flight future;
+- across processes, the leader holds a ``KeyValueDistributedLock`` on the cache
+  key, and the leaders of other processes poll the cache while the lock is held,
+  at most until its lease runs out.
+
+A follower that still finds no cached result (the leader failed, or the result
+was not cacheable) runs the query itself.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional, TypeVar
+
+from flask import current_app
+
+from superset.distributed_lock import KeyValueDistributedLock, LOCK_EXPIRATION
+from superset.exceptions import CreateKeyValueDistributedLockFailedException
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAMESPACE = "chart_data_query"
+
+# Seconds between two cache reads of a follower waiting for another process
+POLL_INTERVAL = 0.25
+
+T = TypeVar("T")
+
+_inflight: dict[str, Future[bool]] = {}
+_inflight_lock = threading.Lock()
+
+
+def _stats_incr(name: str) -> None:
+    current_app.config["STATS_LOGGER"].incr(f"single_flight.{name}")
+
+
+def _lock_held(key: str) -> bool:
+    # pylint: disable=import-outside-toplevel
+    from superset.commands.distributed_lock.get import GetDistributedLock
+
+    lock = GetDistributedLock(namespace=LOCK_NAMESPACE, params={"cache_key": key})
+    return lock.run() is not None
+
+
+def _wait_for_other_process(
+    key: str, reload: Callable[[], Optional[T]], timeout: float
+) -> Optional[T]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        if (value := reload()) is not None:
+            return value
+        if not _lock_held(key):
+            # The other process is done (the result may have been cached right
+            # before the lock was released), failed or died: stop waiting
+            return reload()
+    return None
+
+
+def _lead(key: str, compute: Callable[[], T], reload: Callable[[], Optional[T]]) -> T:
+    try:
+        with KeyValueDistributedLock(LOCK_NAMESPACE, cache_key=key):
+            return compute()
+    except CreateKeyValueDistributedLockFailedException:
+        pass
+
+    # Another process runs the same query
+    _stats_incr("wait_process")
+    value = _wait_for_other_process(key, reload, LOCK_EXPIRATION.total_seconds())
+    if value is not None:
+        _stats_incr("shared")
+        return value
+    return compute()
+
+
+def single_flight(
+    key: str, compute: Callable[[], T], reload: Callable[[], Optional[T]]
+) -> T:
+    """
+    Run ``compute`` once for concurrent callers of the same key.
+
+    :param key: The query cache key
+    :param compute: Runs the query and stores its result in the cache
+    :param reload: Reads the cached result, ``None`` when there is none
+    :returns: The result of ``compute``, or the cached result of another caller
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if future is None:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        _stats_incr("wait_thread")
+        try:
+            future.result(timeout=LOCK_EXPIRATION.total_seconds())
+        except FutureTimeoutError:
+            logger.debug("Timed out waiting for the query of key %s", key)
+        if (value := reload()) is not None:
+            _stats_incr("shared")
+            return value
+        return compute()
+
+    try:
+        return _lead(key, compute, reload)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        # Followers reload from the cache whatever the outcome
+        future.set_result(True)
@@ -32,6 +32,7 @@ import os
 import re
 import sys
 from collections import OrderedDict
+from collections.abc import Hashable
 from contextlib import contextmanager
 from datetime import timedelta
 from email.mime.multipart import MIMEMultipart
@@ -890,6 +891,33 @@ CACHE_CONFIG: CacheConfig = {"CACHE_TYPE": "NullCache"}
 # Cache for datasource metadata and query results
 DATA_CACHE_CONFIG: CacheConfig = {"CACHE_TYPE": "NullCache"}
 
+# A function that returns a version of the data read by a dataset, mixed into the
+# cache keys of its chart queries. Cached results are then refreshed as soon as
+# the data changes instead of when the cache timeout runs out, which allows long
+# data cache timeouts. Returning None leaves the cache keys unchanged.
+#
+# from superset.utils.data_version import pg_stat_data_version
+# DATA_VERSION_FUNC = pg_stat_data_version
+DATA_VERSION_FUNC: Callable[[SqlaTable], Hashable | None] | None = None
+
+# Run a chart query only once when concurrent requests miss the same data cache
+# key (e.g. a popular dashboard opened on a cold cache): the other requests wait
+# for it and read its result from the data cache. Requests of the same process
+# wait on an in-memory future, requests of other processes poll the cache while
+# the first one holds a KeyValueDistributedLock on the key.
+DATA_CACHE_SINGLE_FLIGHT = False
+
+# Store the DataFrames of cached query results as Arrow IPC streams instead of
+# pickling them. Streams are smaller and faster to load, above all for text
+# columns: string columns where distinct values are at most
+# DATA_CACHE_ARROW_DICTIONARY_RATIO of the rows are dictionary-encoded, and the
+# buffers are compressed with DATA_CACHE_ARROW_COMPRESSION ("zstd", "lz4" or None).
+# Entries cached in either format are read back, and frames Arrow cannot convert
+# are still pickled.
+DATA_CACHE_ARROW_SERIALIZATION = False
+DATA_CACHE_ARROW_COMPRESSION: Literal["zstd", "lz4"] | None = "zstd"
+DATA_CACHE_ARROW_DICTIONARY_RATIO = 0.5
+
 # Cache for dashboard filter state. `CACHE_TYPE` defaults to `SupersetMetastoreCache`
 # that stores the values in the key-value table in the Superset metastore, as it's
 # required for Superset to operate correctly, but can be replaced by any
@@ -1914,6 +1914,10 @@ class SqlaTable(
         For virtual datasets, RLS predicates are included in the cache key to ensure
         users with different RLS rules get different cached results.
 
+        When ``DATA_VERSION_FUNC`` is set, the version of the data it returns is
+        included too, so that results cached before a data load are not served
+        after it.
+
         :param query_obj: query object to analyze
         :return: The extra cache keys
         """
@@ -1936,7 +1940,14 @@ class SqlaTable(
             # Add each predicate as a separate cache key component
             extra_cache_keys.extend(rls_predicates)
 
-        return list(set(extra_cache_keys))
+        extra_cache_keys = list(set(extra_cache_keys))
+
+        # Invalidate cached results when the underlying data changes
+        if data_version_func := current_app.config["DATA_VERSION_FUNC"]:
+            if (data_version := data_version_func(self)) is not None:
+                extra_cache_keys.append(data_version)
+
+        return extra_cache_keys
 
     @property
     def quote_identifier(self) -> Callable[[str], str]:
@@ -0,0 +1,256 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+A flask-caching backend stored in a local SQLite file.
+
+Every gunicorn worker of a host opens the same file, so a value cached by one
+worker is served to all the others, without running a cache service. The file
+is bounded both in entries (``CACHE_THRESHOLD``) and in bytes
+(``CACHE_MAX_BYTES``); the least recently read entries are evicted first.
+"""
+
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from flask import Flask
+from flask_caching import BaseCache
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two updates of the last access time of an entry: reads
+# stay read-only most of the time, at the cost of a coarser LRU order
+ACCESS_RESOLUTION = 60
+
+# Share of the limits kept after an eviction, so that eviction does not run
+# again on the very next write
+EVICTION_TARGET = 0.9
+
+# Writes of a process between two checks of the limits: checking them scans
+# the whole table
+EVICTION_INTERVAL = 100
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class SupersetSQLiteCache(BaseCache):
+    """
+    Shared, size-bounded LRU cache stored in a SQLite file.
+
+    Connections are opened per thread and per process: SQLite connections
+    cannot be shared across threads or inherited through ``fork``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        default_timeout: int = 300,
+        threshold: int = 500,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        super().__init__(default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # Writes of this process since the last check of the limits
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._written_bytes = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_accessed "
+                "ON cache_entries (accessed)"
+            )
+
+    @classmethod
+    def factory(
+        cls, app: Flask, config: dict[str, Any], args: list[Any], kwargs: dict[str, Any]
+    ) -> BaseCache:
+        cache_dir = config.get("CACHE_DIR") or os.path.join(
+            app.config["DATA_DIR"], "cache"
+        )
+        # One file per cache region, named after its key prefix
+        prefix = config.get("CACHE_KEY_PREFIX") or "cache"
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", prefix).strip("._") or "cache"
+        kwargs.update(
+            path=os.path.join(cache_dir, f"{name}.sqlite3"),
+            threshold=config.get("CACHE_THRESHOLD") or 500,
+            max_bytes=config.get("CACHE_MAX_BYTES") or DEFAULT_MAX_BYTES,
+        )
+        return cls(*args, **kwargs)
+
+    def _connect(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != pid:
+            # Autocommit: every statement is its own short write transaction
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def _expiry(self, timeout: Optional[int]) -> Optional[float]:
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout > 0 else None
+
+    def get(self, key: str) -> Any:
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires, accessed FROM cache_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires, accessed = row
+            now = time.time()
+            if expires is not None and expires <= now:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE key = ? AND expires <= ?",
+                    (key, now),
+                )
+                return None
+            if now - accessed > ACCESS_RESOLUTION:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key)
+                )
+            return pickle.loads(value)  # noqa: S301
+        except (sqlite3.Error, pickle.PickleError, EOFError, AttributeError):
+            logger.warning("Error reading the SQLite cache", exc_info=True)
+            return None
+
+    def _write(self, key: str, value: Any, timeout: Optional[int], verb: str) -> bool:
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        cursor = conn.execute(
+            f"{verb} INTO cache_entries (key, value, size, expires, accessed) "  # noqa: S608
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload), self._expiry(timeout), time.time()),
+        )
+        if self._should_evict(len(payload)):
+            self._evict(conn)
+        return cursor.rowcount == 1
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        try:
+            return self._write(key, value, timeout, "INSERT OR REPLACE")
+        except (sqlite3.Error, pickle.PickleError, TypeError):
+            logger.warning("Error writing the SQLite cache", exc_info=True)
+            return False
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        try:
+            self._connect().execute(
+                "DELETE FROM cache_entries WHERE key = ? AND expires <= ?",
+                (key, time.time()),
+            )
+            return self._write(key, value, timeout, "INSERT OR IGNORE")
+        except (sqlite3.Error, pickle.PickleError, TypeError):
+            logger.warning("Error writing the SQLite cache", exc_info=True)
+            return False
+
+    def _should_evict(self, size: int) -> bool:
+        """
+        Check the limits every ``EVICTION_INTERVAL`` writes, or sooner once the
+        writes since the last check could fill the room left by an eviction.
+        """
+        with self._lock:
+            self._writes += 1
+            self._written_bytes += size
+            if self._writes < min(
+                EVICTION_INTERVAL,
+                self.threshold - int(self.threshold * EVICTION_TARGET),
+            ) and self._written_bytes < self.max_bytes - int(
+                self.max_bytes * EVICTION_TARGET
+            ):
+                return False
+            self._writes = self._written_bytes = 0
+            return True
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()
+        if count <= self.threshold and total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM cache_entries WHERE expires <= ?", (time.time(),))
+        # Keep the most recently read entries within both limits
+        conn.execute(
+            """
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM (
+                    SELECT key,
+                           ROW_NUMBER() OVER (ORDER BY accessed DESC) AS position,
+                           SUM(size) OVER (ORDER BY accessed DESC, key) AS running
+                    FROM cache_entries
+                ) WHERE position > ? OR running > ?
+            )
+            """,
+            (
+                int(self.threshold * EVICTION_TARGET),
+                int(self.max_bytes * EVICTION_TARGET),
+            ),
+        )
+
+    def delete(self, key: str) -> bool:
+        try:
+            cursor = self._connect().execute(
+                "DELETE FROM cache_entries WHERE key = ?", (key,)
+            )
+            return cursor.rowcount == 1
+        except sqlite3.Error:
+            logger.warning("Error deleting from the SQLite cache", exc_info=True)
+            return False
+
+    def has(self, key: str) -> bool:
+        try:
+            row = self._connect().execute(
+                "SELECT 1 FROM cache_entries WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            return row is not None
+        except sqlite3.Error:
+            return False
+
+    def clear(self) -> bool:
+        try:
+            self._connect().execute("DELETE FROM cache_entries")
+            return True
+        except sqlite3.Error:
+            logger.warning("Error clearing the SQLite cache", exc_info=True)
+            return False
@@ -26,6 +26,7 @@ from superset.utils.core import DatasourceType
 logger = logging.getLogger(__name__)
 
 CACHE_IMPORT_PATH = "superset.extensions.metastore_cache.SupersetMetastoreCache"
+SQLITE_CACHE_IMPORT_PATH = "superset.extensions.sqlite_cache.SupersetSQLiteCache"
 
 
 class ExploreFormDataCache(Cache):
@@ -79,6 +80,16 @@ class CacheManager:
             cache_config.update(
                 {"CACHE_TYPE": cache_type, "CACHE_KEY_PREFIX": cache_key_prefix}
             )
+        elif cache_type == "SupersetSQLiteCache":
+            # One SQLite file per region, shared by the workers of the host
+            cache_config.update(
+                {
+                    "CACHE_TYPE": SQLITE_CACHE_IMPORT_PATH,
+                    "CACHE_KEY_PREFIX": cache_config.get(
+                        "CACHE_KEY_PREFIX", cache_config_key
+                    ),
+                }
+            )
 
         if cache_type is not None and "CACHE_DEFAULT_TIMEOUT" not in cache_config:
             default_timeout = app.config.get("CACHE_DEFAULT_TIMEOUT")
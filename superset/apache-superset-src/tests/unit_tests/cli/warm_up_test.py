@@ -0,0 +1,94 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=import-outside-toplevel, unused-argument
+import threading
+
+from click.testing import CliRunner
+from flask import Flask
+from pytest_mock import MockerFixture
+
+from superset.cli.warm_up import warm_up_cache, warm_up_charts
+from superset.utils import json
+
+
+def _task(chart_id: int, dashboard_id: int, username: str = "admin") -> dict:
+    return {
+        "payload": {"chart_id": chart_id, "dashboard_id": dashboard_id},
+        "username": username,
+    }
+
+
+def test_warm_up_charts_on_bounded_pool(mocker: MockerFixture, app: Flask) -> None:
+    """
+    Test that every task is computed, by at most ``workers`` threads.
+    """
+    threads = set()
+
+    def fake_warm_up(app, chart_id, dashboard_id, extra_filters, username):
+        threads.add(threading.get_ident())
+        return {"chart_id": chart_id, "viz_error": None, "viz_status": "success"}
+
+    mocker.patch("superset.cli.warm_up.warm_up_chart", side_effect=fake_warm_up)
+    results = warm_up_charts(app, [_task(i, 1) for i in range(10)], workers=2)
+
+    assert [result["chart_id"] for result in results] == list(range(10))
+    assert len(threads) <= 2
+
+
+def test_warm_up_cache_command(mocker: MockerFixture, app_context: None) -> None:
+    """
+    Test that the command warms each chart once per set of dashboard filters.
+    """
+    strategy = mocker.patch("superset.tasks.cache.TopNDashboardsStrategy")
+    strategy.return_value.get_tasks.return_value = [
+        _task(1, 10, None),
+        _task(2, 10, None),
+        _task(1, 11, None),
+        _task(2, 11, None),
+    ]
+    # Dashboard 11 has a default filter that applies to chart 2 only
+    filters = {(2, 11): [{"col": "region", "op": "IN", "val": ["ARA"]}]}
+    mocker.patch(
+        "superset.views.utils.get_dashboard_extra_filters",
+        side_effect=lambda chart_id, dashboard_id: filters.get(
+            (chart_id, dashboard_id), []
+        ),
+    )
+    warm_up = mocker.patch(
+        "superset.cli.warm_up.warm_up_charts",
+        return_value=[
+            {"chart_id": 1, "viz_error": None, "viz_status": "success"},
+            {"chart_id": 2, "viz_error": "timeout", "viz_status": None},
+        ],
+    )
+
+    result = CliRunner().invoke(
+        warm_up_cache, ["--top-n", "3", "--workers", "8", "--username", "admin"]
+    )
+
+    assert result.exit_code == 0
+    strategy.assert_called_once_with(top_n=3, since="7 days ago")
+    tasks = warm_up.call_args[0][1]
+    assert [
+        (task["payload"]["chart_id"], task["payload"]["dashboard_id"])
+        for task in tasks
+    ] == [(1, 10), (2, 10), (2, 11)]
+    assert json.loads(tasks[2]["payload"]["extra_filters"]) == filters[(2, 11)]
+    assert "Warming up 3 charts" in result.output
+    assert {task["username"] for task in tasks} == {"admin"}
+    assert warm_up.call_args[0][2] == 8
+    assert "1 failed" in result.output
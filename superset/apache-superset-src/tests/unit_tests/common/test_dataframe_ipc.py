@@ -0,0 +1,196 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=import-outside-toplevel, unused-argument
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+import pandas as pd
+import pytest
+from flask import Flask
+from pytest_mock import MockerFixture
+
+from superset.common.db_query_status import QueryStatus
+from superset.common.utils import query_cache_manager
+from superset.common.utils.dataframe_ipc import deserialize_df, serialize_df
+from superset.common.utils.query_cache_manager import QueryCacheManager
+from superset.constants import CacheRegion
+from superset.models.helpers import QueryResult
+
+
+def _df(rows: int = 1000) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "region": ["Auvergne-Rhône-Alpes", "Île-de-France", None, "Bretagne"]
+            * (rows // 4),
+            "siren": [str(i) for i in range(rows)],
+            "count": range(rows),
+            "ratio": [i / 3 for i in range(rows)],
+            "created": pd.date_range("2024-01-01", periods=rows, freq="h"),
+        }
+    )
+
+
+@pytest.mark.parametrize("compression", [None, "zstd", "lz4"])
+def test_round_trip(compression: str | None) -> None:
+    """
+    Test that a DataFrame is read back unchanged, whatever the compression.
+    """
+    df = _df()
+    payload = serialize_df(df, compression=compression, dictionary_ratio=0.5)
+
+    pd.testing.assert_frame_equal(deserialize_df(payload), df)
+
+
+def test_object_columns() -> None:
+    """
+    Test that object columns built by ``SupersetResultSet`` keep their dtype and
+    values: integers with nulls, timestamps outside of the ``datetime64[ns]``
+    range and mixed values.
+    """
+    df = pd.DataFrame(
+        {
+            "null_ints": pd.Series([1, None, 3], dtype=object),
+            "ints": pd.Series([1, 2, 3], dtype=object),
+            "dates": pd.Series(
+                [datetime(1500, 1, 1), None, datetime(2500, 12, 31)], dtype=object
+            ),
+            "mixed": pd.Series([True, None, False], dtype=object),
+            "decimals": pd.Series([Decimal("1.5"), None, Decimal("2")], dtype=object),
+            "dttm": pd.to_datetime(["2024-01-01", None, "2024-01-03"]),
+            "text": ["Bretagne", "Bretagne", None],
+        }
+    )
+    result = deserialize_df(serialize_df(df, compression="zstd", dictionary_ratio=1))
+
+    pd.testing.assert_series_equal(result.dtypes, df.dtypes)
+    pd.testing.assert_frame_equal(result, df)
+    assert result["null_ints"].tolist() == [1, None, 3]
+    assert result["dates"].tolist() == df["dates"].tolist()
+
+
+def test_dictionary_encoding() -> None:
+    """
+    Test that low-cardinality text is dictionary-encoded, but read back as text.
+    """
+    df = _df()
+    plain = serialize_df(df)
+    encoded = serialize_df(df, dictionary_ratio=0.5)
+
+    assert len(encoded) < len(plain)
+    result = deserialize_df(encoded)
+    assert result["region"].dtype == object
+    # Only low-cardinality columns are encoded, categorical columns are kept
+    df["category"] = pd.Categorical(["a", "b"] * 500)
+    result = deserialize_df(serialize_df(df, dictionary_ratio=0.5))
+    assert result["siren"].dtype == object
+    assert isinstance(result["category"].dtype, pd.CategoricalDtype)
+
+
+def test_writable() -> None:
+    """
+    Test that the frames read back can be modified in place by post-processing.
+    """
+    df = deserialize_df(serialize_df(_df(), compression="zstd"))
+
+    df.replace([1.0], 0, inplace=True)
+    df.loc[0, "count"] = 5
+    assert df["count"][0] == 5
+
+
+def test_empty_frame() -> None:
+    """
+    Test that a query without rows keeps its columns.
+    """
+    df = _df().iloc[:0]
+    result = deserialize_df(serialize_df(df, dictionary_ratio=0.5))
+
+    assert list(result.columns) == list(df.columns)
+    assert result.empty
+
+
+def _query_result(df: pd.DataFrame) -> QueryResult:
+    return QueryResult(
+        df=df, query="SELECT 1", duration=timedelta(0), status=QueryStatus.SUCCESS
+    )
+
+
+def test_query_cache_manager_arrow(mocker: MockerFixture, app: Flask) -> None:
+    """
+    Test that cached query results are stored as Arrow IPC streams and that the
+    payload size is reported.
+    """
+    mocker.patch.dict(
+        app.config,
+        {
+            "DATA_CACHE_ARROW_SERIALIZATION": True,
+            "DATA_CACHE_ARROW_COMPRESSION": "zstd",
+            "DATA_CACHE_ARROW_DICTIONARY_RATIO": 0.5,
+        },
+    )
+    stats_logger = mocker.MagicMock()
+    mocker.patch.dict(app.config, {"STATS_LOGGER": stats_logger})
+    stored: dict[str, Any] = {}
+    set_and_log_cache = mocker.patch.object(
+        query_cache_manager,
+        "set_and_log_cache",
+        side_effect=lambda cache, key, value, *args: stored.update({key: value}),
+    )
+    cache = mocker.MagicMock()
+    cache.get.side_effect = lambda key: {**stored[key], "dttm": None}
+    mocker.patch.dict(query_cache_manager._cache, {CacheRegion.DATA: cache})
+
+    df = _df()
+    QueryCacheManager().set_query_result(
+        key="key", query_result=_query_result(df), region=CacheRegion.DATA
+    )
+
+    set_and_log_cache.assert_called_once()
+    assert "df" not in stored["key"]
+    payload = stored["key"]["df_arrow"]
+    stats_logger.gauge.assert_called_once_with("df_arrow_payload_bytes", len(payload))
+    loaded = QueryCacheManager.get(key="key", region=CacheRegion.DATA)
+    assert loaded.is_loaded
+    pd.testing.assert_frame_equal(loaded.df, df)
+
+
+def test_query_cache_manager_pickle_fallback(
+    mocker: MockerFixture, app: Flask
+) -> None:
+    """
+    Test that frames Arrow cannot convert, and entries cached before the switch,
+    are still stored and read as DataFrames.
+    """
+    mocker.patch.dict(app.config, {"DATA_CACHE_ARROW_SERIALIZATION": True})
+    stored: dict[str, Any] = {}
+    mocker.patch.object(
+        query_cache_manager,
+        "set_and_log_cache",
+        side_effect=lambda cache, key, value, *args: stored.update({key: value}),
+    )
+    cache = mocker.MagicMock()
+    cache.get.side_effect = lambda key: {**stored[key], "dttm": None}
+    mocker.patch.dict(query_cache_manager._cache, {CacheRegion.DATA: cache})
+
+    df = pd.DataFrame({"mixed": [1, "un", 2.5]})
+    QueryCacheManager().set_query_result(
+        key="key", query_result=_query_result(df), region=CacheRegion.DATA
+    )
+
+    assert stored["key"]["df"] is df
+    loaded = QueryCacheManager.get(key="key", region=CacheRegion.DATA)
+    pd.testing.assert_frame_equal(loaded.df, df)
@@ -0,0 +1,119 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=import-outside-toplevel, unused-argument
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from flask import Flask
+from pytest_mock import MockerFixture
+
+from superset.common.utils import single_flight as module
+from superset.common.utils.single_flight import single_flight
+from superset.exceptions import CreateKeyValueDistributedLockFailedException
+
+
+@contextmanager
+def _free_lock(namespace: str, **kwargs: Any):
+    yield "key"
+
+
+@contextmanager
+def _taken_lock(namespace: str, **kwargs: Any):
+    raise CreateKeyValueDistributedLockFailedException("Lock already taken")
+    yield  # pylint: disable=unreachable
+
+
+def test_concurrent_misses_run_once(mocker: MockerFixture, app: Flask) -> None:
+    """
+    Test that threads missing the same key share the result of a single run.
+    """
+    mocker.patch.object(module, "KeyValueDistributedLock", _free_lock)
+    cache: dict[str, str] = {}
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def compute() -> str:
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        cache["key"] = "result"
+        return "result"
+
+    results: list[Optional[str]] = []
+
+    def request() -> None:
+        with app.app_context():
+            results.append(single_flight("key", compute, lambda: cache.get("key")))
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(runs) == 1
+    assert results == ["result"] * 5
+    assert module._inflight == {}
+
+
+def test_follower_runs_query_when_leader_fails(
+    mocker: MockerFixture, app_context: None
+) -> None:
+    """
+    Test that the caller computes when no cached result shows up.
+    """
+    mocker.patch.object(module, "KeyValueDistributedLock", _taken_lock)
+    mocker.patch.object(module, "_wait_for_other_process", return_value=None)
+
+    assert single_flight("key", lambda: "computed", lambda: None) == "computed"
+
+
+def test_other_process_result_shared(mocker: MockerFixture, app_context: None) -> None:
+    """
+    Test that a process waits for the query run by another process.
+    """
+    mocker.patch.object(module, "KeyValueDistributedLock", _taken_lock)
+    mocker.patch.object(module, "POLL_INTERVAL", 0)
+    mocker.patch.object(module, "_lock_held", return_value=True)
+    reads = iter([None, None, "cached"])
+    compute = mocker.MagicMock()
+
+    assert single_flight("key", compute, lambda: next(reads)) == "cached"
+    compute.assert_not_called()
+
+
+def test_other_process_failure_stops_wait(
+    mocker: MockerFixture, app_context: None
+) -> None:
+    """
+    Test that a process stops waiting as soon as the lock of a failed query run
+    by another process is released, instead of waiting for the lock lease.
+    """
+    mocker.patch.object(module, "KeyValueDistributedLock", _taken_lock)
+    mocker.patch.object(module, "POLL_INTERVAL", 0)
+    lock_held = mocker.patch.object(module, "_lock_held", side_effect=[True, False])
+    reload = mocker.MagicMock(return_value=None)
+
+    assert single_flight("key", lambda: "computed", reload) == "computed"
+    assert lock_held.call_count == 2
+    # Two polls, and a last read once the lock is gone
+    assert reload.call_count == 3
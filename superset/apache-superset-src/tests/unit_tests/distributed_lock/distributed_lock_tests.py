@@ -99,3 +99,17 @@ def test_key_value_distributed_lock_expired() -> None:
                 assert _get_lock(MAIN_KEY, session) is None
 
         assert _get_lock(MAIN_KEY, session) is None
+
+
+def test_key_value_distributed_lock_released_on_error() -> None:
+    """
+    Test that the lock is released when the body raises.
+    """
+    session = _get_other_session()
+
+    with freeze_time("2021-01-01"):
+        with pytest.raises(ValueError):
+            with KeyValueDistributedLock("ns", a=1, b=2):
+                raise ValueError("query failed")
+
+        assert _get_lock(MAIN_KEY, session) is None
@@ -0,0 +1,124 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=import-outside-toplevel
+
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from superset.extensions.sqlite_cache import EVICTION_INTERVAL, SupersetSQLiteCache
+
+
+def test_values_shared_between_instances(tmp_path: Path) -> None:
+    """
+    Test that two cache instances (two workers) see the same entries.
+    """
+    path = str(tmp_path / "data.sqlite3")
+    first = SupersetSQLiteCache(path)
+    second = SupersetSQLiteCache(path)
+
+    assert first.set("chart", {"rows": [1, 2]})
+    assert second.get("chart") == {"rows": [1, 2]}
+    assert second.has("chart")
+    assert second.delete("chart")
+    assert first.get("chart") is None
+
+
+def test_add_and_expiry(tmp_path: Path) -> None:
+    """
+    Test that ``add`` keeps live entries and that expired entries are misses.
+    """
+    cache = SupersetSQLiteCache(str(tmp_path / "data.sqlite3"))
+
+    assert cache.add("key", 1)
+    assert not cache.add("key", 2)
+    assert cache.get("key") == 1
+
+    cache.set("old", 1, timeout=1)
+    cache._connect().execute("UPDATE cache_entries SET expires = 0")
+    assert cache.get("old") is None
+    assert not cache.has("old")
+    assert cache.add("old", 2)
+
+
+def test_least_recently_read_evicted(tmp_path: Path) -> None:
+    """
+    Test that the entry count and byte size limits evict the oldest reads.
+    """
+    cache = SupersetSQLiteCache(str(tmp_path / "data.sqlite3"), threshold=10)
+    for i in range(10):
+        cache.set(f"key{i}", i)
+    # key0 was read more recently than the others
+    cache._connect().execute(
+        "UPDATE cache_entries SET accessed = accessed + 3600 WHERE key = 'key0'"
+    )
+    cache.set("key10", 10)
+
+    assert cache.get("key0") == 0
+    assert cache.get("key10") == 10
+    assert cache.get("key1") is None
+    count = cache._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+    assert count[0] <= 10
+
+    small = SupersetSQLiteCache(str(tmp_path / "small.sqlite3"), max_bytes=1000)
+    for i in range(50):
+        small.set(f"key{i}", "x" * 100)
+    total = small._connect().execute("SELECT SUM(size) FROM cache_entries").fetchone()
+    assert total[0] <= 1000
+
+
+def test_limits_checked_every_interval(tmp_path: Path, mocker: MockerFixture) -> None:
+    """
+    Test that a large cache does not scan its entries on every write.
+    """
+    cache = SupersetSQLiteCache(
+        str(tmp_path / "data.sqlite3"), threshold=100000, max_bytes=10**9
+    )
+    evict = mocker.spy(cache, "_evict")
+    for i in range(EVICTION_INTERVAL * 2 + 1):
+        cache.set(f"key{i}", i)
+    assert evict.call_count == 2
+
+    # Large payloads are checked as soon as they could fill the room left
+    cache.max_bytes = 10000
+    cache.set("large", "x" * 2000)
+    assert evict.call_count == 3
+
+
+def test_factory_names_file_after_region(tmp_path: Path, app_context: None) -> None:
+    """
+    Test that each cache region gets its own file in ``CACHE_DIR``.
+    """
+    from flask import current_app
+
+    cache = SupersetSQLiteCache.factory(
+        current_app,
+        {
+            "CACHE_DIR": str(tmp_path),
+            "CACHE_KEY_PREFIX": "DATA_CACHE_CONFIG",
+            "CACHE_THRESHOLD": 20,
+            "CACHE_MAX_BYTES": 4096,
+        },
+        [],
+        {"default_timeout": 60},
+    )
+
+    assert isinstance(cache, SupersetSQLiteCache)
+    assert cache.path == str(tmp_path / "DATA_CACHE_CONFIG.sqlite3")
+    assert cache.threshold == 20
+    assert cache.max_bytes == 4096
+    assert cache.default_timeout == 60
@@ -0,0 +1,98 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=import-outside-toplevel, redefined-outer-name
+
+from collections.abc import Iterator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from superset.sql.parse import Table
+from superset.utils import data_version
+from superset.utils.data_version import dataset_tables, pg_stat_data_version
+
+
+@pytest.fixture(autouse=True)
+def clear_versions() -> Iterator[None]:
+    data_version._versions.clear()
+    yield
+    data_version._versions.clear()
+
+
+def _datasource(mocker: MockerFixture, counters: tuple[int, int, int]) -> MagicMock:
+    datasource = mocker.MagicMock()
+    datasource.is_virtual = False
+    datasource.table_name = "company"
+    datasource.schema = "staging"
+    datasource.catalog = None
+    datasource.database.id = 1
+    datasource.database.backend = "postgresql"
+    conn = datasource.database.get_raw_connection.return_value.__enter__.return_value
+    conn.cursor.return_value.fetchone.return_value = counters
+    return datasource
+
+
+def test_dataset_tables_virtual(mocker: MockerFixture) -> None:
+    """
+    Test that a virtual dataset reads the tables of its SQL.
+    """
+    datasource = mocker.MagicMock()
+    datasource.is_virtual = True
+    datasource.sql = (
+        "SELECT * FROM staging.registration r JOIN staging.company c ON c.id = r.id"
+    )
+    datasource.database.db_engine_spec.engine = "postgresql"
+
+    assert dataset_tables(datasource) == {
+        Table("registration", "staging"),
+        Table("company", "staging"),
+    }
+
+
+def test_version_changes_with_the_data(mocker: MockerFixture) -> None:
+    """
+    Test that the version follows the table write counters, within the TTL.
+    """
+    datasource = _datasource(mocker, (120, 100, 1))
+    conn = datasource.database.get_raw_connection.return_value.__enter__.return_value
+    cursor = conn.cursor.return_value
+
+    assert pg_stat_data_version(datasource) == "data_version:120:100"
+    assert cursor.execute.call_args[0][1] == (["staging.company"],)
+
+    # Reused within the TTL
+    cursor.fetchone.return_value = (300, 100, 1)
+    assert pg_stat_data_version(datasource) == "data_version:120:100"
+
+    mocker.patch.object(data_version, "DATA_VERSION_TTL", 0)
+    assert pg_stat_data_version(datasource) == "data_version:300:100"
+
+
+def test_no_version(mocker: MockerFixture) -> None:
+    """
+    Test that cache keys are left unchanged when no version is available.
+    """
+    datasource = _datasource(mocker, (0, 0, 0))
+    assert pg_stat_data_version(datasource) is None
+
+    datasource.database.backend = "mysql"
+    assert pg_stat_data_version(datasource) is None
+
+    datasource = _datasource(mocker, (1, 1, 1))
+    datasource.database.get_raw_connection.side_effect = Exception("down")
+    assert pg_stat_data_version(datasource) is None
@@ -895,26 +895,61 @@ DISABLE_DATASET_SOURCE_EDIT = True  # Prevent users from editing dataset sources
 
 CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
 
+# Shared SQLite cache: gunicorn runs 4 workers, each with its own memory, so a
+# per-process SimpleCache missed 3 times out of 4 and lost the filter states
+# saved by another worker. All workers open the same files on the
+# superset_home volume (one file per cache region, LRU-evicted when full).
+CACHE_DIR = os.environ.get("SUPERSET_CACHE_DIR", "/app/superset_home/cache")
+CACHE_MAX_MB = int(os.environ.get("SUPERSET_CACHE_MAX_MB", "1024"))
+
+
+def _shared_cache_config(prefix, timeout, share):
+    """Build the configuration of a cache region stored in the shared SQLite cache."""
+    return {
+        "CACHE_TYPE": "SupersetSQLiteCache",
+        "CACHE_DEFAULT_TIMEOUT": timeout,
+        "CACHE_NO_NULL_WARNING": True,
+        "CACHE_KEY_PREFIX": prefix,
+        "CACHE_DIR": CACHE_DIR,
+        "CACHE_THRESHOLD": 100000,
+        "CACHE_MAX_BYTES": int(CACHE_MAX_MB * share) * 1024 * 1024,
+    }
+
+
+# Metadata cache (datasets, dashboards)
+CACHE_CONFIG = _shared_cache_config("superset_metadata", 300, 0.05)
+
 # Filter state cache
-FILTER_STATE_CACHE_CONFIG = {
-    "CACHE_TYPE": "SimpleCache",
-    "CACHE_DEFAULT_TIMEOUT": 300,
-    "CACHE_NO_NULL_WARNING": True,
-}
+FILTER_STATE_CACHE_CONFIG = _shared_cache_config("superset_filter_state", 300, 0.05)
 
 # Explore form data cache
-EXPLORE_FORM_DATA_CACHE_CONFIG = {
-    "CACHE_TYPE": "SimpleCache",
-    "CACHE_DEFAULT_TIMEOUT": 300,
-    "CACHE_NO_NULL_WARNING": True,
-}
+EXPLORE_FORM_DATA_CACHE_CONFIG = _shared_cache_config("superset_explore_form_data", 300, 0.05)
 
-# Data cache (for chart queries)
-DATA_CACHE_CONFIG = {
-    "CACHE_TYPE": "SimpleCache",
-    "CACHE_DEFAULT_TIMEOUT": 300,
-    "CACHE_NO_NULL_WARNING": True,
-}
+# Data cache (for chart queries). Results are kept for a day: the data version
+# below changes the cache keys as soon as the nightly migration rewrites the
+# staging tables, so charts never serve the data of the previous load.
+DATA_CACHE_CONFIG = _shared_cache_config("superset_data", 86400, 0.85)
+
+
+def DATA_VERSION_FUNC(datasource):  # noqa: N802
+    """Version the chart cache keys with the write counters of the dataset tables."""
+    # Imported here: superset_config is loaded while superset itself is importing
+    from superset.utils.data_version import pg_stat_data_version
+
+    return pg_stat_data_version(datasource)
+
+
+# Identical chart queries that miss the cache at the same time (a dashboard
+# opened by several users right after the nightly load) run only once: the
+# other requests, in any gunicorn worker, wait and read the cached result.
+DATA_CACHE_SINGLE_FLIGHT = True
+
+# Chart results are cached as zstd-compressed Arrow IPC streams instead of
+# pickled DataFrames: the low-cardinality French text columns are stored once
+# per distinct value, which cuts the bytes written to and read from the shared
+# SQLite cache.
+DATA_CACHE_ARROW_SERIALIZATION = True
+DATA_CACHE_ARROW_COMPRESSION = "zstd"
 
 # =============================================================================
 # TRANSLATION FIX 6.0.0 - Workaround for issue #35569
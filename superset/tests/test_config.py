@@ -185,5 +185,61 @@ class TestConfigEnvironmentIsolation:
             assert config_module.BABEL_DEFAULT_LOCALE == "fr"
 
 
+class TestCacheConfig:
+    """Tests for the shared cache regions."""
+
+    def test_regions_use_shared_sqlite_cache(self):
+        """Test that every region uses the shared cache, one file prefix each."""
+        import config.superset_config as config_module
+
+        regions = [
+            config_module.CACHE_CONFIG,
+            config_module.DATA_CACHE_CONFIG,
+            config_module.FILTER_STATE_CACHE_CONFIG,
+            config_module.EXPLORE_FORM_DATA_CACHE_CONFIG,
+        ]
+        assert all(r["CACHE_TYPE"] == "SupersetSQLiteCache" for r in regions)
+        assert len({r["CACHE_KEY_PREFIX"] for r in regions}) == len(regions)
+        assert all(r["CACHE_DIR"] == config_module.CACHE_DIR for r in regions)
+
+    def test_cache_size_from_environment(self):
+        """Test that SUPERSET_CACHE_MAX_MB bounds the cache files."""
+        with patch.dict(os.environ, {"SUPERSET_CACHE_MAX_MB": "100"}):
+            import importlib
+            import config.superset_config as config_module
+            importlib.reload(config_module)
+
+            total = sum(
+                r["CACHE_MAX_BYTES"]
+                for r in (
+                    config_module.CACHE_CONFIG,
+                    config_module.DATA_CACHE_CONFIG,
+                    config_module.FILTER_STATE_CACHE_CONFIG,
+                    config_module.EXPLORE_FORM_DATA_CACHE_CONFIG,
+                )
+            )
+            assert total <= 100 * 1024 * 1024
+
+    def test_data_cache_versioned_by_data(self):
+        """Test that chart results are kept a day and versioned by the data."""
+        import config.superset_config as config_module
+
+        assert config_module.DATA_CACHE_CONFIG["CACHE_DEFAULT_TIMEOUT"] == 86400
+        assert callable(config_module.DATA_VERSION_FUNC)
+
+    def test_data_cache_single_flight(self):
+        """Test that concurrent identical chart queries run only once."""
+        import config.superset_config as config_module
+
+        assert config_module.DATA_CACHE_SINGLE_FLIGHT is True
+
+    def test_data_cache_arrow_serialization(self):
+        """Test that chart results are cached as compressed Arrow streams."""
+        import config.superset_config as config_module
+
+        assert config_module.DATA_CACHE_ARROW_SERIALIZATION is True
+        assert config_module.DATA_CACHE_ARROW_COMPRESSION == "zstd"
+
+
 if __name__ == "__main__":
     pytest.main([__file__])